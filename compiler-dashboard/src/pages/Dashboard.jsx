@@ -34,12 +34,13 @@ export default function Dashboard() {
     try {
       setLoading(true)
       
-      // Fetch projects
-      const projectsResponse = await apiCall('/projects')
+      // Fetch the five most recent projects and the total count
+      const projectsResponse = await apiCall('/projects?limit=5&count=true&fields=id,name,description,language,container_status')
       if (projectsResponse.ok) {
         const projects = await projectsResponse.json()
-        setStats(prev => ({ ...prev, projects: projects.length }))
-        setRecentProjects(projects.slice(0, 5))
+        const total = parseInt(projectsResponse.headers.get('X-Total-Count'), 10)
+        setStats(prev => ({ ...prev, projects: Number.isNaN(total) ? projects.length : total }))
+        setRecentProjects(projects)
       }
 
       // Fetch containers
@@ -1,21 +1,9 @@
-# C/C++ Runtime Environment
+# C/C++ Runtime Environment (minimal: compilers only, see Dockerfile.cpp.full)
 FROM gcc:latest
 
 # Set working directory
 WORKDIR /workspace
 
-# Install system dependencies
-RUN apt-get update && apt-get install -y \
-    git \
-    curl \
-    vim \
-    nano \
-    cmake \
-    make \
-    gdb \
-    valgrind \
-    && rm -rf /var/lib/apt/lists/*
-
 # Create a non-root user
 RUN useradd -m -s /bin/bash coderunner
 USER coderunner
@@ -26,4 +14,3 @@ ENV CXX=g++
 
 # Default command
 CMD ["/bin/bash"]
-
@@ -1,19 +1,11 @@
-# Go Runtime Environment
+# Go Runtime Environment (minimal: toolchain only, see Dockerfile.go.full)
 FROM golang:1.21-alpine
 
 # Set working directory
 WORKDIR /workspace
 
-# Install system dependencies
-RUN apk add --no-cache \
-    git \
-    curl \
-    vim \
-    nano \
-    bash
-
 # Create a non-root user
-RUN adduser -D -s /bin/bash coderunner
+RUN adduser -D -s /bin/sh coderunner
 USER coderunner
 
 # Set environment variables
@@ -22,5 +14,4 @@ ENV GOCACHE=/tmp/.cache/go-build
 ENV PATH=$GOPATH/bin:$PATH
 
 # Default command
-CMD ["/bin/bash"]
-
+CMD ["/bin/sh"]
@@ -1,19 +1,9 @@
-# Java Runtime Environment
+# Java Runtime Environment (minimal: JDK only, see Dockerfile.java.full)
 FROM openjdk:17-slim
 
 # Set working directory
 WORKDIR /workspace
 
-# Install system dependencies
-RUN apt-get update && apt-get install -y \
-    git \
-    curl \
-    vim \
-    nano \
-    maven \
-    gradle \
-    && rm -rf /var/lib/apt/lists/*
-
 # Create a non-root user
 RUN useradd -m -s /bin/bash coderunner
 USER coderunner
@@ -25,4 +15,3 @@ ENV CLASSPATH=/workspace
 
 # Default command
 CMD ["/bin/bash"]
-
@@ -11,20 +11,24 @@ from src.models.user import db
 from src.models.project import Project, ExecutionResult
 from src.routes.user import user_bp
 from src.routes.projects import projects_bp
-from src.routes.execution import execution_bp
+from src.routes.execution import execution_bp, execution_queue
 from src.routes.containers import containers_bp
 from src.routes.github import github_bp
 from src.routes.terminal import terminal_bp, register_terminal_events, start_cleanup_thread
 from src.routes.auth import auth_bp, check_if_token_revoked
 from src.routes.health import health_bp
+from src.models.output_stream import attach_socketio
+from src.models.container_lifecycle import container_lifecycle
+from src.models.container_state import container_state
+from src.models.container_reaper import container_reaper
 from src.utils.logging_config import setup_logging, setup_request_logging
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
 app.config['JWT_SECRET_KEY'] = 'jwt-secret-string'  # Change this in production
 
-# Enable CORS for all routes
-CORS(app)
+# Enable CORS for all routes (paging headers readable by the dashboard)
+CORS(app, expose_headers=['X-Next-Cursor', 'X-Total-Count', 'Link', 'Content-Range', 'Accept-Ranges'])
 
 # Initialize JWT
 jwt = JWTManager(app)
@@ -55,9 +59,24 @@ db.init_app(app)
 with app.app_context():
     db.create_all()
 
+# Recover orphaned executions; queue workers start in each serving process
+execution_queue.init_app(app)
+
+# Pause and stop idle project containers (sweep thread starts in each serving process)
+container_lifecycle.init_app(app)
+
+# Follow Docker events to serve container states without a round trip
+container_state.init_app(app)
+
+# Periodically remove orphaned containers, workspaces and volumes
+container_reaper.init_app(app)
+
 # Register terminal WebSocket events
 register_terminal_events(socketio)
 
+# Push live execution output to subscribed Socket.IO clients
+attach_socketio(socketio)
+
 # Start terminal session cleanup thread
 start_cleanup_thread()
 
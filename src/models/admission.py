@@ -0,0 +1,247 @@
+"""
+Admission Control Module
+Admits container starts against the CPU and memory the node has left
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+
+# Left for the host and the server itself
+ADMISSION_RESERVED_CPU = float(os.getenv('ADMISSION_RESERVED_CPU', '0.5'))
+ADMISSION_RESERVED_MEMORY = os.getenv('ADMISSION_RESERVED_MEMORY', '512m')
+
+# Overcommit ratios (cpu:memory) per tier: ADMISSION_OVERCOMMIT="pool=4:1.2,project=2:1"
+# wins over the defaults. Sandboxes mostly idle between runs, so CPU is overcommitted;
+# memory overcommit ends in OOM kills, so it is not by default
+ADMISSION_CPU_OVERCOMMIT = float(os.getenv('ADMISSION_CPU_OVERCOMMIT', '2'))
+ADMISSION_MEMORY_OVERCOMMIT = float(os.getenv('ADMISSION_MEMORY_OVERCOMMIT', '1'))
+ADMISSION_OVERCOMMIT = os.getenv('ADMISSION_OVERCOMMIT', '')
+
+# Seconds a start waits in line for capacity, per tier (0 rejects right away)
+ADMISSION_WAIT = {
+    'project': float(os.getenv('ADMISSION_PROJECT_WAIT', '30')),
+    'pool': float(os.getenv('ADMISSION_POOL_WAIT', '5')),
+    'bench': 0.0
+}
+
+# How long node totals and the fallback container list are trusted
+ADMISSION_INFO_TTL = float(os.getenv('ADMISSION_INFO_TTL', '300'))
+ADMISSION_LIST_TTL = float(os.getenv('ADMISSION_LIST_TTL', '2'))
+
+# Waiters re-check capacity at least this often (other processes release without telling us)
+ADMISSION_POLL_INTERVAL = 0.5
+
+MEMORY_UNITS = {'b': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a container does not fit in the node's remaining capacity"""
+
+    def __init__(self, message: str, retry_after: int = 5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_cpu(value) -> float:
+    """CPU count from '1', '0.5' or a number"""
+    try:
+        cpu = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid cpu_limit: {value}')
+    if cpu <= 0:
+        raise ValueError('cpu_limit must be a positive number of CPUs')
+    return cpu
+
+
+def parse_memory(value) -> int:
+    """Bytes from docker-style sizes such as '512m', '1g' or a number of bytes"""
+    text = str(value).strip().lower().rstrip('b') or '0'
+    unit = text[-1] if text[-1] in MEMORY_UNITS else 'b'
+    number = text[:-1] if unit != 'b' else text
+    try:
+        size = int(float(number) * MEMORY_UNITS[unit])
+    except ValueError:
+        raise ValueError(f'Invalid memory size: {value}')
+    if size <= 0:
+        raise ValueError('memory_limit must be a positive size such as 512m')
+    return size
+
+
+def _parse_overcommit(spec: str) -> Dict[str, Tuple[float, float]]:
+    """Parse a "tier=cpu:memory,..." overcommit specification"""
+    ratios = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        try:
+            tier, values = item.split('=', 1)
+            cpu, memory = (float(value) for value in values.split(':', 1))
+            ratios[tier.strip()] = (max(cpu, 0.1), max(memory, 0.1))
+        except ValueError:
+            logger.warning(f"Ignoring invalid overcommit entry: {item}")
+    return ratios
+
+
+class AdmissionController:
+    def __init__(self, container_manager, enabled: bool = ADMISSION_ENABLED):
+        """Reservations are read from the labels of running and paused containers, so every
+        process sees the same node usage; starts admitted here but not yet visible in Docker
+        are held as pending reservations"""
+        self.container_manager = container_manager
+        self.enabled = enabled
+        self.ratios = _parse_overcommit(ADMISSION_OVERCOMMIT)
+        self.reserved_memory = parse_memory(ADMISSION_RESERVED_MEMORY)
+        self._cond = threading.Condition()
+        self._pending = {}  # container ID -> (cpu, memory)
+        self._waiters = deque()
+        self._capacity = None
+        self._capacity_at = 0.0
+        self._listed = None
+        self._listed_at = 0.0
+        self.counters = {'admitted': 0, 'queued': 0, 'rejected': 0}
+
+    def ratio(self, tier: str) -> Tuple[float, float]:
+        return self.ratios.get(tier, (ADMISSION_CPU_OVERCOMMIT, ADMISSION_MEMORY_OVERCOMMIT))
+
+    def capacity(self) -> Optional[Dict]:
+        """CPUs and memory bytes of the node from get_system_info, minus the host reserve"""
+        if self._capacity is None or time.monotonic() - self._capacity_at > ADMISSION_INFO_TTL:
+            info = self.container_manager.get_system_info()
+            if 'error' in info or not info.get('cpus') or not info.get('memory_total'):
+                return self._capacity
+            self._capacity = {
+                'cpu': max(info['cpus'] - ADMISSION_RESERVED_CPU, 0.5),
+                'memory': max(info['memory_total'] - self.reserved_memory, 256 * 1024 ** 2)
+            }
+            self._capacity_at = time.monotonic()
+        return self._capacity
+
+    def _containers(self):
+        """(id, state, labels) of containers, from the state cache or a label-filtered list"""
+        from src.models.container_manager import LABEL_MANAGED
+        cache = self.container_manager.state_cache
+        entries = cache.list(all_containers=True) if cache is not None else None
+        if entries is not None:
+            # The cache may hold the containers of several engines
+            host = self.container_manager.host
+            return [
+                (entry['id'], entry['status'], entry.get('labels') or {})
+                for entry in entries if entry.get('host') == host
+            ]
+
+        if self._listed is None or time.monotonic() - self._listed_at > ADMISSION_LIST_TTL:
+            items = self.container_manager.client.api.containers(
+                filters={'label': f'{LABEL_MANAGED}=true', 'status': ['running', 'paused']}
+            )
+            self._listed = [(item['Id'], item.get('State'), item.get('Labels') or {}) for item in items]
+            self._listed_at = time.monotonic()
+        return self._listed
+
+    def usage(self, exclude: Optional[str] = None) -> Dict:
+        """Reserved CPUs and memory: running containers hold both, paused ones only memory"""
+        from src.models.container_manager import LABEL_CPU, LABEL_MEMORY
+        cpu, memory = 0.0, 0
+        for container_id, state, labels in self._containers():
+            if container_id == exclude or container_id in self._pending or state not in ('running', 'paused'):
+                continue
+            try:
+                memory += int(labels.get(LABEL_MEMORY, 0))
+                if state == 'running':
+                    cpu += float(labels.get(LABEL_CPU, 0))
+            except ValueError:
+                continue
+        for container_id, (pending_cpu, pending_memory) in self._pending.items():
+            if container_id != exclude:
+                cpu += pending_cpu
+                memory += pending_memory
+        return {'cpu': round(cpu, 3), 'memory': memory}
+
+    def check_request(self, cpu_limit, memory_limit):
+        """Reject limits that could never fit on this node (ValueError for the API)"""
+        cpu, memory = parse_cpu(cpu_limit), parse_memory(memory_limit)
+        capacity = self.capacity() if self.enabled else None
+        if capacity and cpu > capacity['cpu']:
+            raise ValueError(f"cpu_limit {cpu:g} exceeds the node's {capacity['cpu']:g} available CPUs")
+        if capacity and memory > capacity['memory']:
+            raise ValueError(f"memory_limit {memory_limit} exceeds the node's available memory")
+        return cpu, memory
+
+    def _fits(self, container_id: str, cpu: float, memory: int, tier: str) -> bool:
+        capacity = self.capacity()
+        if capacity is None:
+            return True  # node totals unknown: fail open
+        cpu_ratio, memory_ratio = self.ratio(tier)
+        used = self.usage(exclude=container_id)
+        return (used['cpu'] + cpu <= capacity['cpu'] * cpu_ratio
+                and used['memory'] + memory <= capacity['memory'] * memory_ratio)
+
+    def admit(self, container_id: str, cpu: float, memory: int, tier: str = 'project',
+              timeout: Optional[float] = None):
+        """Reserve capacity for starting a container, waiting in line up to timeout
+        (the tier's ADMISSION_WAIT by default). Raises AdmissionRejected"""
+        if not self.enabled:
+            return
+        timeout = ADMISSION_WAIT.get(tier, 0.0) if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        token = object()
+
+        with self._cond:
+            self._waiters.append(token)
+            queued = False
+            try:
+                while True:
+                    # First come, first served: only the head of the line may take capacity
+                    if self._waiters[0] is token and self._fits(container_id, cpu, memory, tier):
+                        self._pending[container_id] = (cpu, memory)
+                        self.counters['admitted'] += 1
+                        return
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counters['rejected'] += 1
+                        raise AdmissionRejected(
+                            f'Node at capacity: no room for {cpu:g} CPU / {memory // 1024 ** 2} MB '
+                            f'({tier}), retry later'
+                        )
+                    if not queued:
+                        queued = True
+                        self.counters['queued'] += 1
+                    self._cond.wait(min(remaining, ADMISSION_POLL_INTERVAL))
+            finally:
+                self._waiters.remove(token)
+                self._cond.notify_all()
+
+    def release(self, container_id: str):
+        """Drop a pending reservation once the container is visible to usage() (or failed to start)"""
+        with self._cond:
+            if self._pending.pop(container_id, None) is not None:
+                self._listed = None
+                self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        capacity = self.capacity() if self.enabled else None
+        with self._cond:
+            waiting = len(self._waiters)
+            pending = len(self._pending)
+        try:
+            usage = self.usage() if self.enabled else None
+        except Exception as e:
+            usage = {'error': str(e)}
+        return {
+            'enabled': self.enabled,
+            'capacity': capacity,
+            'usage': usage,
+            'overcommit': {
+                tier: self.ratio(tier) for tier in sorted(set(ADMISSION_WAIT) | set(self.ratios))
+            },
+            'waiting': waiting,
+            'pending': pending,
+            'counters': dict(self.counters)
+        }
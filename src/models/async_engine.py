@@ -0,0 +1,363 @@
+"""
+Async Execution Engine Module
+Runs container execs on an asyncio event loop speaking the Docker Engine API directly
+"""
+
+import os
+import json
+import queue
+import shlex
+import codecs
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Same variable the docker CLI and docker-py read (unix:// or tcp://)
+DOCKER_HOST = os.getenv('DOCKER_HOST', 'unix:///var/run/docker.sock')
+DOCKER_API_VERSION = os.getenv('DOCKER_API_VERSION', 'v1.41')
+
+# Concurrent execs multiplexed by one process, and their default wall clock limit
+ASYNC_ENGINE_MAX_CONCURRENCY = int(os.getenv('ASYNC_ENGINE_MAX_CONCURRENCY', '1000'))
+ASYNC_ENGINE_EXEC_TIMEOUT = float(os.getenv('ASYNC_ENGINE_EXEC_TIMEOUT', '300'))
+ASYNC_ENGINE_CONNECT_TIMEOUT = float(os.getenv('ASYNC_ENGINE_CONNECT_TIMEOUT', '10'))
+
+# Exit code reported for execs cut off by the timeout (as GNU timeout does)
+TIMEOUT_EXIT_CODE = 124
+
+# Stream ids of the multiplexed exec output framing
+STREAM_TYPES = {1: 'stdout', 2: 'stderr'}
+
+
+class DockerEngineError(Exception):
+    """Raised when the Docker Engine API answers with an error status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f'{status}: {message}')
+        self.status = status
+        self.message = message
+
+
+class AsyncDockerEngine:
+    def __init__(self, docker_host: str = DOCKER_HOST,
+                 max_concurrency: int = ASYNC_ENGINE_MAX_CONCURRENCY):
+        """Initialize the engine; the event loop thread is started on first use"""
+        self.docker_host = docker_host
+        self.max_concurrency = max_concurrency
+        self._loop = None
+        self._loop_pid = None
+        self._loop_lock = threading.Lock()
+        self._semaphore = None
+        self.counters = {'started': 0, 'completed': 0, 'timed_out': 0, 'cancelled': 0, 'failed': 0}
+        self.active = 0
+
+    # Event loop thread
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the event loop thread for the current process"""
+        if self._loop is None or self._loop_pid != os.getpid():
+            with self._loop_lock:
+                if self._loop is None or self._loop_pid != os.getpid():
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(target=self._run_loop, args=(loop,), daemon=True,
+                                              name='async-docker-engine')
+                    thread.start()
+                    self._loop = loop
+                    self._loop_pid = os.getpid()
+                    self._semaphore = None
+                    logger.info(f"Async Docker engine loop started for {self.docker_host}")
+        return self._loop
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def submit(self, coroutine) -> Future:
+        """Schedule a coroutine on the engine loop from any thread"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """Bounds concurrent execs; created lazily on the engine loop"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    # HTTP over the Docker socket
+
+    async def _connect(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if self.docker_host.startswith('unix://'):
+            connection = asyncio.open_unix_connection(self.docker_host[len('unix://'):], limit=2 ** 20)
+        elif self.docker_host.startswith('tcp://'):
+            host, _, port = self.docker_host[len('tcp://'):].rstrip('/').rpartition(':')
+            connection = asyncio.open_connection(host, int(port), limit=2 ** 20)
+        else:
+            raise ValueError(f'Unsupported DOCKER_HOST: {self.docker_host}')
+        return await asyncio.wait_for(connection, ASYNC_ENGINE_CONNECT_TIMEOUT)
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, method: str, path: str,
+                    payload: Optional[Dict] = None, upgrade: bool = False):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        lines = [
+            f'{method} /{DOCKER_API_VERSION}{path} HTTP/1.1',
+            'Host: docker',
+            f'Content-Length: {len(body)}'
+        ]
+        if payload is not None:
+            lines.append('Content-Type: application/json')
+        if upgrade:
+            lines.extend(['Connection: Upgrade', 'Upgrade: tcp'])
+        else:
+            lines.append('Connection: close')
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    @staticmethod
+    async def _read_head(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str]]:
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError('Docker closed the connection')
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return status, headers
+
+    @staticmethod
+    async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+        if 'content-length' in headers:
+            return await reader.readexactly(int(headers['content-length']))
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0].strip() or b'0', 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            return b''.join(chunks)
+
+        return await reader.read()
+
+    async def _request(self, method: str, path: str, payload: Optional[Dict] = None):
+        """Send one API request and return the decoded JSON body (or None)"""
+        reader, writer = await self._connect()
+        try:
+            await self._send(writer, method, path, payload)
+            status, headers = await self._read_head(reader)
+            body = await self._read_body(reader, headers)
+        finally:
+            writer.close()
+
+        data = None
+        if body and headers.get('content-type', '').startswith('application/json'):
+            data = json.loads(body)
+
+        if status >= 400:
+            message = data.get('message') if isinstance(data, dict) else body.decode('utf-8', 'replace')
+            raise DockerEngineError(status, message or 'error')
+        return data
+
+    # Exec API
+
+    async def ping(self) -> bool:
+        await self._request('GET', '/_ping')
+        return True
+
+    async def start_container(self, container_id: str):
+        await self._request('POST', f'/containers/{container_id}/start')
+
+    async def unpause_container(self, container_id: str):
+        await self._request('POST', f'/containers/{container_id}/unpause')
+
+    async def exec_create(self, container_id: str, command: Union[str, List[str]],
+                          working_dir: str = '/workspace',
+                          environment: Optional[Dict[str, str]] = None) -> str:
+        """Create an exec instance and return its ID"""
+        if isinstance(command, str):
+            command = shlex.split(command)
+        payload = {
+            'AttachStdin': False,
+            'AttachStdout': True,
+            'AttachStderr': True,
+            'Tty': False,
+            'Cmd': command,
+            'WorkingDir': working_dir
+        }
+        if environment:
+            payload['Env'] = [f'{key}={value}' for key, value in environment.items()]
+        data = await self._request('POST', f'/containers/{container_id}/exec', payload)
+        return data['Id']
+
+    async def exec_inspect(self, exec_id: str) -> Dict:
+        return await self._request('GET', f'/exec/{exec_id}/json')
+
+    async def exec_attach(self, exec_id: str) -> AsyncIterator[Tuple[str, bytes]]:
+        """Start an exec and yield (stream, bytes) frames of its multiplexed output.
+        Closing the generator closes the attach connection"""
+        reader, writer = await self._connect()
+        try:
+            await self._send(writer, 'POST', f'/exec/{exec_id}/start',
+                             {'Detach': False, 'Tty': False}, upgrade=True)
+            status, headers = await self._read_head(reader)
+            if status not in (101, 200):
+                body = await self._read_body(reader, headers)
+                raise DockerEngineError(status, body.decode('utf-8', 'replace'))
+
+            # 8 byte header: stream id, 3 padding bytes, big-endian payload size
+            while True:
+                try:
+                    header = await reader.readexactly(8)
+                except asyncio.IncompleteReadError:
+                    break
+                size = int.from_bytes(header[4:], 'big')
+                data = await reader.readexactly(size) if size else b''
+                yield STREAM_TYPES.get(header[0], 'stdout'), data
+        finally:
+            writer.close()
+
+    async def _exit_code(self, exec_id: str) -> int:
+        """Read the exit code, waiting briefly for Docker to record it"""
+        for _ in range(20):
+            info = await self.exec_inspect(exec_id)
+            if not info.get('Running') and info.get('ExitCode') is not None:
+                return info['ExitCode']
+            await asyncio.sleep(0.05)
+        return 1
+
+    async def stream(self, container_id: str, command: Union[str, List[str]],
+                     working_dir: str = '/workspace',
+                     timeout: Optional[float] = ASYNC_ENGINE_EXEC_TIMEOUT) -> AsyncIterator[Tuple[str, object]]:
+        """Run a command and yield ('stdout'|'stderr', text) frames, then ('exit', exit_code).
+        The output stops at the timeout and the exit code is TIMEOUT_EXIT_CODE"""
+        async with self.semaphore:
+            self.active += 1
+            self.counters['started'] += 1
+            try:
+                try:
+                    exec_id = await self.exec_create(container_id, command, working_dir)
+                except DockerEngineError as e:
+                    # Paused or stopped container: resume it and try once more, like execute_command does
+                    if e.status != 409:
+                        raise
+                    if 'paused' in str(e).lower():
+                        await self.unpause_container(container_id)
+                    else:
+                        await self.start_container(container_id)
+                    exec_id = await self.exec_create(container_id, command, working_dir)
+
+                decoders = {
+                    'stdout': codecs.getincrementaldecoder('utf-8')(errors='replace'),
+                    'stderr': codecs.getincrementaldecoder('utf-8')(errors='replace')
+                }
+                loop = asyncio.get_running_loop()
+                deadline = loop.time() + timeout if timeout else None
+                frames = self.exec_attach(exec_id)
+
+                try:
+                    while True:
+                        remaining = deadline - loop.time() if deadline else None
+                        if remaining is not None and remaining <= 0:
+                            raise asyncio.TimeoutError()
+                        try:
+                            stream, chunk = await asyncio.wait_for(frames.__anext__(), remaining)
+                        except StopAsyncIteration:
+                            break
+                        text = decoders[stream].decode(chunk)
+                        if text:
+                            yield stream, text
+                except asyncio.TimeoutError:
+                    self.counters['timed_out'] += 1
+                    logger.warning(f"Exec {exec_id} in {container_id} timed out after {timeout}s")
+                    yield 'stderr', f'\nExecution timed out after {timeout} seconds\n'
+                    yield 'exit', TIMEOUT_EXIT_CODE
+                    return
+                finally:
+                    await frames.aclose()
+
+                for stream, decoder in decoders.items():
+                    tail = decoder.decode(b'', final=True)
+                    if tail:
+                        yield stream, tail
+
+                self.counters['completed'] += 1
+                yield 'exit', await self._exit_code(exec_id)
+
+            except asyncio.CancelledError:
+                self.counters['cancelled'] += 1
+                raise
+            except Exception:
+                self.counters['failed'] += 1
+                raise
+            finally:
+                self.active -= 1
+
+    async def run(self, container_id: str, command: Union[str, List[str]],
+                  working_dir: str = '/workspace',
+                  timeout: Optional[float] = ASYNC_ENGINE_EXEC_TIMEOUT) -> Tuple[str, str, int]:
+        """Run a command and return (stdout, stderr, exit_code)"""
+        output = {'stdout': [], 'stderr': []}
+        exit_code = 1
+        async for stream, data in self.stream(container_id, command, working_dir, timeout):
+            if stream == 'exit':
+                exit_code = data
+            else:
+                output[stream].append(data)
+        return ''.join(output['stdout']), ''.join(output['stderr']), exit_code
+
+    # Blocking wrappers for the rest of the application
+
+    def execute(self, container_id: str, command: Union[str, List[str]],
+                working_dir: str = '/workspace',
+                timeout: Optional[float] = ASYNC_ENGINE_EXEC_TIMEOUT) -> Tuple[str, str, int]:
+        """Blocking equivalent of run(); only the calling thread waits, the exec runs on the loop"""
+        return self.submit(self.run(container_id, command, working_dir, timeout)).result()
+
+    def iter_stream(self, container_id: str, command: Union[str, List[str]],
+                    working_dir: str = '/workspace',
+                    timeout: Optional[float] = ASYNC_ENGINE_EXEC_TIMEOUT) -> Iterator[Tuple[str, object]]:
+        """Blocking iterator over stream(); closing it cancels the exec attach"""
+        frames = queue.Queue()
+
+        async def pump():
+            try:
+                async for frame in self.stream(container_id, command, working_dir, timeout):
+                    frames.put(frame)
+            except Exception as e:
+                logger.error(f"Async exec in container {container_id} failed: {e}")
+                frames.put(('stderr', str(e)))
+                frames.put(('exit', 1))
+            finally:
+                frames.put(None)
+
+        future = self.submit(pump())
+        try:
+            while True:
+                frame = frames.get()
+                if frame is None:
+                    break
+                yield frame
+        finally:
+            future.cancel()
+
+    def stats(self) -> Dict:
+        stats = dict(self.counters)
+        stats['active'] = self.active
+        stats['max_concurrency'] = self.max_concurrency
+        stats['docker_host'] = self.docker_host
+        return stats
+
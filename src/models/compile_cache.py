@@ -0,0 +1,162 @@
+"""
+Compile Cache Module
+Caches build artifacts of compiled languages on a host volume with LRU eviction
+"""
+
+import io
+import os
+import json
+import uuid
+import fnmatch
+import hashlib
+import tarfile
+import logging
+import threading
+from typing import List, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COMPILE_CACHE_DIR = os.getenv('COMPILE_CACHE_DIR', '/tmp/compiler-compile-cache')
+COMPILE_CACHE_MAX_BYTES = int(os.getenv('COMPILE_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+
+# Largest single artifact archive worth caching
+MAX_ARTIFACT_BYTES = int(os.getenv('COMPILE_CACHE_MAX_ARTIFACT_BYTES', str(64 * 1024 * 1024)))
+
+
+class CompileCache:
+    def __init__(self, root: str = COMPILE_CACHE_DIR, max_bytes: int = COMPILE_CACHE_MAX_BYTES):
+        """Initialize the cache; entries are tar archives named by key"""
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(language: str, image_digest: str, compile_command: str, source: str) -> str:
+        """Key on everything that can change the produced artifact"""
+        material = json.dumps({
+            'language': language,
+            'image': image_digest,
+            'command': compile_command,
+            'source': hashlib.sha256(source.encode('utf-8')).hexdigest()
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f'{key}.tar')
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Get an artifact archive and mark it recently used"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+            self.hits += 1
+            return data
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.error(f"Failed to read compile cache entry {key}: {e}")
+            self.misses += 1
+            return None
+
+    def put(self, key: str, data: bytes):
+        """Store an artifact archive, evicting least recently used entries over the cap"""
+        if len(data) > MAX_ARTIFACT_BYTES:
+            return
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            path = self._path(key)
+            temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+
+            with self._lock:
+                if self._size is None:
+                    self._size = self._scan_size()
+                else:
+                    self._size += len(data)
+                if self._size > self.max_bytes:
+                    self._evict()
+        except Exception as e:
+            logger.error(f"Failed to store compile cache entry {key}: {e}")
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.root):
+            if name.endswith('.tar'):
+                try:
+                    stat = os.stat(os.path.join(self.root, name))
+                    entries.append((stat.st_mtime, stat.st_size, name))
+                except FileNotFoundError:
+                    continue
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Remove oldest entries until the cache is at 90% of the cap; caller holds the lock"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+
+        for _, size, name in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(os.path.join(self.root, name))
+                total -= size
+                evicted += 1
+            except FileNotFoundError:
+                continue
+
+        self._size = total
+        logger.info(f"Evicted {evicted} compile cache entries ({total} bytes remain)")
+
+    def stats(self) -> dict:
+        with self._lock:
+            if self._size is None and os.path.isdir(self.root):
+                self._size = self._scan_size()
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'bytes': self._size or 0,
+                'max_bytes': self.max_bytes
+            }
+
+
+def collect_artifacts(container_manager, container_id: str, patterns: List[str],
+                      workspace: str = '/workspace') -> Optional[bytes]:
+    """Pack workspace files matching patterns into a tar archive relative to the workspace"""
+    source = io.BytesIO()
+    for chunk in container_manager.get_archive(container_id, workspace):
+        source.write(chunk)
+        if source.tell() > MAX_ARTIFACT_BYTES * 4:
+            return None
+    source.seek(0)
+
+    artifact = io.BytesIO()
+    count = 0
+    with tarfile.open(fileobj=source, mode='r') as archive, \
+            tarfile.open(fileobj=artifact, mode='w') as output:
+        for member in archive.getmembers():
+            parts = member.name.split('/', 1)
+            if not member.isfile() or len(parts) < 2:
+                continue
+            name = parts[1]
+            if any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+                data = archive.extractfile(member)
+                member.name = name
+                output.addfile(member, data)
+                count += 1
+
+    return artifact.getvalue() if count else None
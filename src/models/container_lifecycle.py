@@ -0,0 +1,228 @@
+"""
+Container Lifecycle Module
+Pauses idle project containers and stops long-idle ones, based on last activity
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import func, or_
+from src.models.project import Project, ExecutionResult, db
+from src.models.container_manager import get_container_manager
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Idle seconds before a project container is frozen, and before it is stopped
+CONTAINER_PAUSE_AFTER = float(os.getenv('CONTAINER_PAUSE_AFTER', '300'))
+CONTAINER_STOP_AFTER = float(os.getenv('CONTAINER_STOP_AFTER', '3600'))
+
+# Seconds between sweeps, and the most containers changed per sweep
+LIFECYCLE_INTERVAL = float(os.getenv('CONTAINER_LIFECYCLE_INTERVAL', '30'))
+LIFECYCLE_BATCH = int(os.getenv('CONTAINER_LIFECYCLE_BATCH', '50'))
+
+# Activity of one container is recorded (and its state checked) at most this often
+TOUCH_INTERVAL = float(os.getenv('CONTAINER_TOUCH_INTERVAL', '30'))
+
+# Project states in which the container no longer runs anything
+INACTIVE_STATES = ('stopped', 'deleted')
+
+
+class ContainerLifecycle:
+    def __init__(self, container_manager, app=None):
+        """Initialize the manager; the sweep thread starts lazily in each process"""
+        self.container_manager = container_manager
+        self.app = None
+        self._lock = threading.Lock()
+        self._touched = {}  # container ID -> last activity (datetime), not yet written
+        self._last_touch = {}  # container ID -> monotonic time of the last recorded touch
+        self._resumed = set()  # containers resumed since the last flush
+        self._pid = None
+        self.counters = {'paused': 0, 'stopped': 0, 'sweeps': 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.before_request(self.ensure_started)
+
+    def ensure_started(self):
+        """Start the sweep thread once per process"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._touched = {}
+            self._last_touch = {}
+            self._resumed = set()
+            threading.Thread(target=self._sweep_loop, daemon=True).start()
+        logger.info(f"Started container lifecycle thread (pid {self._pid})")
+
+    def touch(self, container_id: str, force: bool = False) -> bool:
+        """Record activity in a container. Returns True when the activity was recorded,
+        which happens at most once per TOUCH_INTERVAL unless forced; the sweep thread
+        writes it to the database"""
+        if not container_id:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_touch.get(container_id, float('-inf')) < TOUCH_INTERVAL:
+                return False
+            self._last_touch[container_id] = now
+            self._touched[container_id] = datetime.utcnow()
+        return True
+
+    def resume_container(self, container_id: str) -> bool:
+        """Thaw or start a container before it is used again and record the activity"""
+        if not self.container_manager.ensure_running(container_id):
+            return False
+        self.touch(container_id, force=True)
+        with self._lock:
+            self._resumed.add(container_id)
+        return True
+
+    def activity(self, container_id: str):
+        """Cheap hook for interactive use: resumes the container when the recorded activity
+        is stale, so a paused container thaws on the first keystroke after a pause"""
+        if self.touch(container_id):
+            self.resume_container(container_id)
+
+    def ensure_running(self, project: Project) -> bool:
+        """Resume a project's container and mark it running (the caller saves the project)"""
+        if not project.container_id or not self.resume_container(project.container_id):
+            return False
+        project.container_status = 'running'
+        project.last_activity_at = datetime.utcnow()
+        return True
+
+    def flush(self):
+        """Write recorded activity and resumed states to the projects table"""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+            resumed, self._resumed = self._resumed, set()
+        if not touched and not resumed:
+            return
+
+        try:
+            for container_id, moment in touched.items():
+                Project.query.filter(
+                    Project.container_id == container_id,
+                    or_(Project.last_activity_at.is_(None), Project.last_activity_at < moment)
+                ).update({'last_activity_at': moment}, synchronize_session=False)
+            if resumed:
+                Project.query.filter(
+                    Project.container_id.in_(resumed),
+                    Project.container_status.in_(('paused', 'stopped', 'created'))
+                ).update({'container_status': 'running'}, synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Failed to record container activity: {e}")
+            db.session.rollback()
+            # Keep the newest activity for the next attempt
+            with self._lock:
+                for container_id, moment in touched.items():
+                    self._touched[container_id] = max(moment, self._touched.get(container_id, moment))
+                self._resumed |= resumed
+
+    def sweep(self) -> Dict[str, int]:
+        """Pause containers idle for CONTAINER_PAUSE_AFTER, stop paused ones idle for
+        CONTAINER_STOP_AFTER. Projects with queued or running executions are left alone"""
+        self.flush()
+        now = datetime.utcnow()
+        pause_cutoff = now - timedelta(seconds=CONTAINER_PAUSE_AFTER)
+        stop_cutoff = now - timedelta(seconds=CONTAINER_STOP_AFTER)
+        idle_since = func.coalesce(Project.last_activity_at, Project.last_executed, Project.updated_at)
+        busy = db.session.query(ExecutionResult.project_id).filter(
+            ExecutionResult.status.in_(('pending', 'running'))
+        )
+
+        candidates = Project.query.filter(
+            Project.container_id.isnot(None),
+            Project.container_status.notin_(INACTIVE_STATES),
+            Project.id.notin_(busy),
+            or_(
+                (Project.container_status != 'paused') & (idle_since < pause_cutoff),
+                (Project.container_status == 'paused') & (idle_since < stop_cutoff)
+            )
+        ).limit(LIFECYCLE_BATCH).all()
+
+        result = {'paused': 0, 'stopped': 0}
+        for project in candidates:
+            state = self._transition(project)
+            if state in result:
+                result[state] += 1
+
+        if candidates:
+            db.session.commit()
+        self.counters['sweeps'] += 1
+        self.counters['paused'] += result['paused']
+        self.counters['stopped'] += result['stopped']
+        if result['paused'] or result['stopped']:
+            logger.info(f"Container lifecycle: paused {result['paused']}, stopped {result['stopped']}")
+        return result
+
+    def _transition(self, project: Project) -> Optional[str]:
+        """Move one idle container a step down: running -> paused -> stopped"""
+        container_id = project.container_id
+        status = self.container_manager.get_container_status(container_id)
+        if 'error' in status:
+            return None
+        state = status.get('status')
+
+        # A container resumed by this process since the flush above is in use again
+        with self._lock:
+            if container_id in self._touched:
+                return None
+
+        if state == 'running':
+            if project.container_status == 'paused':
+                # Resumed by another process whose activity is not written yet
+                project.container_status = 'running'
+                return None
+            if not self.container_manager.pause_container(container_id):
+                return None
+            project.container_status = 'paused'
+            return 'paused'
+
+        if state == 'paused':
+            # Thaw first so the processes can handle the stop signal
+            self.container_manager.unpause_container(container_id)
+            if not self.container_manager.stop_container(container_id):
+                return None
+            project.container_status = 'stopped'
+            return 'stopped'
+
+        # Exited or never started: record it so the project stops being a candidate
+        project.container_status = 'stopped'
+        return None
+
+    def _sweep_loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(LIFECYCLE_INTERVAL)
+            try:
+                with self.app.app_context():
+                    self.sweep()
+            except Exception as e:
+                logger.error(f"Container lifecycle sweep failed: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pending = len(self._touched)
+        return {
+            'pause_after': CONTAINER_PAUSE_AFTER,
+            'stop_after': CONTAINER_STOP_AFTER,
+            'interval': LIFECYCLE_INTERVAL,
+            'pending_activity': pending,
+            'counters': dict(self.counters)
+        }
+
+
+# Shared by the execution, terminal and container routes (bound to the app in src/main.py)
+container_lifecycle = ContainerLifecycle(get_container_manager())
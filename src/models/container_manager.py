@@ -6,70 +6,173 @@ Handles Docker container operations for code execution
 import docker
 import os
 import uuid
+import codecs
+import socket
 import logging
-from typing import Dict, List, Optional, Tuple
-from datetime import datetime
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from src.models.async_engine import AsyncDockerEngine
+from src.models.languages import LANGUAGES, DEFAULT_IMAGE_VARIANT, image_name as language_image
+from src.models.image_builder import ImageBuilder, BuildJob
+from src.models.admission import AdmissionController, AdmissionRejected, parse_cpu, parse_memory
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# HTTP connection pool to the Docker socket, shared by all threads of a process
+DOCKER_MAX_POOL_SIZE = int(os.getenv('DOCKER_MAX_POOL_SIZE', '10'))
+DOCKER_TIMEOUT = int(os.getenv('DOCKER_TIMEOUT', '60'))
+
+# How long a resolved image digest is trusted before asking Docker again
+IMAGE_DIGEST_TTL = float(os.getenv('IMAGE_DIGEST_TTL', '60'))
+
+# 'docker-py' runs execs with blocking calls; 'async' multiplexes them on an asyncio loop
+EXECUTION_BACKEND = os.getenv('EXECUTION_BACKEND', 'docker-py')
+
+# Host directories bind-mounted as /workspace, one per project or pooled sandbox
+WORKSPACE_PREFIX = os.getenv('WORKSPACE_PREFIX', '/tmp/compiler-workspace-')
+
+# Labels on everything the server creates, used by the reaper's filtered list and prune calls
+LABEL_MANAGED = 'compiler-server.managed'
+LABEL_KIND = 'compiler-server.kind'  # project, pool or bench
+LABEL_PROJECT = 'compiler-server.project-id'
+LABEL_WORKSPACE = 'compiler-server.workspace'
+LABEL_OWNER = 'compiler-server.owner'  # host:pid of the process owning a pooled sandbox
+LABEL_CPU = 'compiler-server.cpu'  # CPUs and memory bytes reserved, read by admission control
+LABEL_MEMORY = 'compiler-server.memory'
+
+
+def workspace_path(project_id: str) -> str:
+    """Host directory mounted as the workspace of a project's container"""
+    return f"{WORKSPACE_PREFIX}{project_id}"
+
+
+def managed_labels(kind: str, **extra) -> Dict[str, str]:
+    """Labels marking a container or volume as created by this server"""
+    labels = {LABEL_MANAGED: 'true', LABEL_KIND: kind}
+    labels.update({key: str(value) for key, value in extra.items() if value is not None})
+    return labels
+
+
 class ContainerManager:
-    def __init__(self):
-        """Initialize Docker client"""
+    def __init__(self, client=None, backend: str = EXECUTION_BACKEND,
+                 host: Optional[str] = None, docker_host: Optional[str] = None):
+        """Initialize the manager; the Docker client is created on first use.
+        host names the engine within a DockerCluster; docker_host is its endpoint
+        (the environment's DOCKER_HOST when not given)"""
+        self.host = host
+        self.docker_host = docker_host
+        self._client = client
+        self._client_pid = os.getpid() if client else None
+        self._client_lock = threading.Lock()
+        self._image_digests = {}
+        self.backend = backend
+        self._async_engine = None
+        # Event-fed ContainerStateCache (see container_state.py), registered by the cache itself
+        self.state_cache = None
+        # Admits starts and unpauses against the node's remaining CPU and memory
+        self.admission = AdmissionController(self)
+
+    @property
+    def client(self):
+        """Docker client for the current process (recreated after fork)"""
+        if self._client is None or self._client_pid != os.getpid():
+            with self._client_lock:
+                if self._client is None or self._client_pid != os.getpid():
+                    try:
+                        if self.docker_host:
+                            self._client = docker.DockerClient(
+                                base_url=self.docker_host,
+                                max_pool_size=DOCKER_MAX_POOL_SIZE,
+                                timeout=DOCKER_TIMEOUT
+                            )
+                        else:
+                            self._client = docker.from_env(
+                                max_pool_size=DOCKER_MAX_POOL_SIZE,
+                                timeout=DOCKER_TIMEOUT
+                            )
+                        self._client_pid = os.getpid()
+                        logger.info(f"Docker client initialized successfully ({self.docker_host or 'environment'})")
+                    except Exception as e:
+                        logger.error(f"Failed to initialize Docker client: {e}")
+                        raise
+        return self._client
+
+    @property
+    def async_engine(self) -> AsyncDockerEngine:
+        """Asyncio execution engine (its loop thread starts on first use)"""
+        if self._async_engine is None:
+            self._async_engine = AsyncDockerEngine(self.docker_host) if self.docker_host else AsyncDockerEngine()
+        return self._async_engine
+
+    @property
+    def managers(self) -> List['ContainerManager']:
+        """Per-engine managers (just this one; a DockerCluster has one per host)"""
+        return [self]
+
+    def host_of(self, container_id: str) -> Optional[str]:
+        """Name of the engine running a container (None outside a cluster)"""
+        return self.host
+
+    def _reset_after_fork(self):
+        """Drop connections inherited from the parent process"""
+        self._client = None
+        self._client_pid = None
+        self._client_lock = threading.Lock()
+        self._image_digests = {}
+        self._async_engine = None
+        self.admission = AdmissionController(self, self.admission.enabled)
+
+    def build_images(self, languages: Optional[List[str]] = None, force: bool = False,
+                     variants: Optional[List[str]] = None) -> Dict[str, bool]:
+        """Build language-specific Docker images in the calling thread, skipping unchanged ones.
+        The API runs the same builds as background jobs (see ImageBuilder.start)"""
+        builder = ImageBuilder(self)
+        return builder.run(BuildJob(languages or list(LANGUAGES), force=force, variants=variants))
+
+    def get_image_digest(self, image_name: str) -> Optional[str]:
+        """Get the ID of a local image, cached for IMAGE_DIGEST_TTL seconds"""
+        cached = self._image_digests.get(image_name)
+        if cached and time.monotonic() - cached[1] < IMAGE_DIGEST_TTL:
+            return cached[0]
         try:
-            self.client = docker.from_env()
-            logger.info("Docker client initialized successfully")
+            digest = self.client.images.get(image_name).id
+            self._image_digests[image_name] = (digest, time.monotonic())
+            return digest
         except Exception as e:
-            logger.error(f"Failed to initialize Docker client: {e}")
-            raise
+            logger.error(f"Failed to resolve image {image_name}: {e}")
+            return None
 
-    def build_images(self) -> Dict[str, bool]:
-        """Build all language-specific Docker images"""
-        results = {}
-        dockerfiles_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'dockerfiles')
-        
-        languages = {
-            'python': 'Dockerfile.python',
-            'nodejs': 'Dockerfile.nodejs', 
-            'java': 'Dockerfile.java',
-            'go': 'Dockerfile.go',
-            'rust': 'Dockerfile.rust',
-            'php': 'Dockerfile.php',
-            'cpp': 'Dockerfile.cpp'
-        }
-        
-        for lang, dockerfile in languages.items():
-            try:
-                dockerfile_path = os.path.join(dockerfiles_dir, dockerfile)
-                if os.path.exists(dockerfile_path):
-                    logger.info(f"Building image for {lang}...")
-                    image, logs = self.client.images.build(
-                        path=dockerfiles_dir,
-                        dockerfile=dockerfile,
-                        tag=f"compiler-server-{lang}:latest",
-                        rm=True
-                    )
-                    results[lang] = True
-                    logger.info(f"Successfully built image for {lang}")
-                else:
-                    logger.warning(f"Dockerfile not found for {lang}: {dockerfile_path}")
-                    results[lang] = False
-            except Exception as e:
-                logger.error(f"Failed to build image for {lang}: {e}")
-                results[lang] = False
-        
-        return results
+    def invalidate_image_digest(self, image_name: str):
+        """Forget a cached digest after the image was rebuilt"""
+        self._image_digests.pop(image_name, None)
 
     def create_container(self, language: str, project_id: str = None, 
-                        cpu_limit: str = "1", memory_limit: str = "512m") -> Tuple[str, bool]:
-        """Create a new container for the specified language"""
+                        cpu_limit: str = "1", memory_limit: str = "512m",
+                        variant: str = DEFAULT_IMAGE_VARIANT, kind: str = 'project',
+                        host: Optional[str] = None) -> Tuple[str, bool]:
+        """Create a new container for the specified language and image variant.
+        kind labels what it is for: 'project' or 'pool' (owned by this process).
+        host is a placement preference, only meaningful in a DockerCluster"""
         try:
             if not project_id:
                 project_id = str(uuid.uuid4())
             
             container_name = f"compiler-{language}-{project_id}"
-            image_name = f"compiler-server-{language}:latest"
+            image_name = language_image(language, variant)
+            workspace = workspace_path(project_id)
+            labels = managed_labels(
+                kind,
+                **{
+                    LABEL_WORKSPACE: workspace,
+                    LABEL_PROJECT: project_id if kind == 'project' else None,
+                    LABEL_OWNER: f"{socket.gethostname()}:{os.getpid()}" if kind == 'pool' else None,
+                    LABEL_CPU: parse_cpu(cpu_limit),
+                    LABEL_MEMORY: parse_memory(memory_limit)
+                }
+            )
             
             # Check if image exists
             try:
@@ -90,8 +193,9 @@ class ContainerManager:
                 cpu_quota=int(float(cpu_limit) * 100000),  # Convert to microseconds
                 cpu_period=100000,
                 network_disabled=False,  # Allow network access
+                labels=labels,
                 volumes={
-                    f"/tmp/compiler-workspace-{project_id}": {
+                    workspace: {
                         'bind': '/workspace',
                         'mode': 'rw'
                     }
@@ -106,21 +210,108 @@ class ContainerManager:
             return None, False
 
     def start_container(self, container_id: str) -> bool:
-        """Start a container"""
+        """Start a container once admission control finds room for it.
+        Raises AdmissionRejected when the node stays full"""
         try:
             container = self.client.containers.get(container_id)
-            container.start()
+            self._admitted(container, container.start)
             logger.info(f"Started container {container_id}")
             return True
+        except AdmissionRejected:
+            raise
         except Exception as e:
             logger.error(f"Failed to start container {container_id}: {e}")
             return False
 
+    def pause_container(self, container_id: str) -> bool:
+        """Freeze every process of a running container (cgroup freezer); memory stays allocated"""
+        try:
+            container = self.client.containers.get(container_id)
+            container.pause()
+            self._note_state(container.id, 'paused')
+            logger.info(f"Paused container {container_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to pause container {container_id}: {e}")
+            return False
+
+    def unpause_container(self, container_id: str) -> bool:
+        """Thaw a paused container"""
+        try:
+            container = self.client.containers.get(container_id)
+            container.unpause()
+            self._note_state(container.id, 'running')
+            logger.info(f"Unpaused container {container_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to unpause container {container_id}: {e}")
+            return False
+
+    def _note_state(self, container_id: str, state: Optional[str]):
+        """Update the state cache right away; the Docker event confirms it later"""
+        if self.state_cache is not None:
+            self.state_cache.set_state(container_id, state)
+
+    def _cached_state(self, container_id: str) -> Optional[str]:
+        return self.state_cache.get_state(container_id) if self.state_cache is not None else None
+
+    def _requested_resources(self, container) -> Tuple[float, int, str]:
+        """(CPUs, memory bytes, tier) a container reserves, from its labels or,
+        for containers created before the labels existed, its host config"""
+        labels = container.labels or {}
+        host_config = container.attrs.get('HostConfig') or {}
+        if LABEL_CPU in labels:
+            cpu = float(labels[LABEL_CPU])
+        elif host_config.get('NanoCpus'):
+            cpu = host_config['NanoCpus'] / 1e9
+        elif host_config.get('CpuQuota', 0) > 0:
+            cpu = host_config['CpuQuota'] / (host_config.get('CpuPeriod') or 100000)
+        else:
+            cpu = 1.0
+        memory = int(labels.get(LABEL_MEMORY) or host_config.get('Memory') or 0)
+        return cpu, memory, labels.get(LABEL_KIND, 'project')
+
+    def _admitted(self, container, action):
+        """Run a start or unpause under an admission reservation"""
+        cpu, memory, tier = self._requested_resources(container)
+        self.admission.admit(container.id, cpu, memory, tier)
+        try:
+            action()
+            self._note_state(container.id, 'running')
+        finally:
+            self.admission.release(container.id)
+
+    def _ensure_running(self, container):
+        """Unpause or start a container fetched with containers.get"""
+        if container.status == 'paused':
+            self._admitted(container, container.unpause)
+            logger.info(f"Unpaused container {container.id}")
+        elif container.status != 'running':
+            self._admitted(container, container.start)
+        else:
+            self._note_state(container.id, 'running')
+
+    def ensure_running(self, container_id: str) -> bool:
+        """Make a container runnable whatever state it was left in.
+        Raises AdmissionRejected when the node has no room to run it"""
+        try:
+            if self._cached_state(container_id) == 'running':
+                return True
+            self._ensure_running(self.client.containers.get(container_id))
+            return True
+        except AdmissionRejected as e:
+            logger.warning(f"Not resuming container {container_id}: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Failed to resume container {container_id}: {e}")
+            return False
+
     def stop_container(self, container_id: str) -> bool:
         """Stop a container"""
         try:
             container = self.client.containers.get(container_id)
             container.stop(timeout=10)
+            self._note_state(container.id, 'exited')
             logger.info(f"Stopped container {container_id}")
             return True
         except Exception as e:
@@ -132,33 +323,55 @@ class ContainerManager:
         try:
             container = self.client.containers.get(container_id)
             container.remove(force=True)
+            self._note_state(container.id, None)
             logger.info(f"Removed container {container_id}")
             return True
         except Exception as e:
             logger.error(f"Failed to remove container {container_id}: {e}")
             return False
 
-    def execute_command(self, container_id: str, command: str, 
+    def _exec_create(self, container_id: str, command: Union[str, List[str]], working_dir: str) -> str:
+        """Create an exec, resuming the container first unless it is known to be running.
+        A stale cache entry shows up as a 409 and is retried after resuming"""
+        if self._cached_state(container_id) != 'running':
+            self._ensure_running(self.client.containers.get(container_id))
+        
+        def create():
+            return self.client.api.exec_create(
+                container_id,
+                command,
+                workdir=working_dir,
+                stdout=True,
+                stderr=True,
+                tty=False
+            )['Id']
+        
+        try:
+            return create()
+        except docker.errors.APIError as e:
+            if e.status_code != 409:
+                raise
+            self._ensure_running(self.client.containers.get(container_id))
+            return create()
+
+    def execute_command(self, container_id: str, command: Union[str, List[str]], 
                        working_dir: str = "/workspace") -> Tuple[str, str, int]:
         """Execute a command in a container"""
         try:
-            container = self.client.containers.get(container_id)
+            if self.backend == 'async':
+                stdout, stderr, exit_code = self.async_engine.execute(container_id, command, working_dir)
+                logger.info(f"Executed command in container {container_id}: {command}")
+                return stdout, stderr, exit_code
             
-            # Ensure container is running
-            if container.status != 'running':
-                container.start()
+            # Ensure container is running (no round trip when the state cache knows it is)
+            exec_id = self._exec_create(container_id, command, working_dir)
             
             # Execute command
-            exec_result = container.exec_run(
-                command,
-                workdir=working_dir,
-                demux=True,
-                tty=False
-            )
+            output = self.client.api.exec_start(exec_id, demux=True)
             
-            stdout = exec_result.output[0].decode('utf-8') if exec_result.output[0] else ""
-            stderr = exec_result.output[1].decode('utf-8') if exec_result.output[1] else ""
-            exit_code = exec_result.exit_code
+            stdout = output[0].decode('utf-8') if output[0] else ""
+            stderr = output[1].decode('utf-8') if output[1] else ""
+            exit_code = self.client.api.exec_inspect(exec_id).get('ExitCode')
             
             logger.info(f"Executed command in container {container_id}: {command}")
             return stdout, stderr, exit_code
@@ -167,18 +380,112 @@ class ContainerManager:
             logger.error(f"Failed to execute command in container {container_id}: {e}")
             return "", str(e), 1
 
+    def stream_command(self, container_id: str, command: str,
+                       working_dir: str = "/workspace") -> Iterator[Tuple[str, object]]:
+        """Execute a command and yield ('stdout'|'stderr', text) frames as they
+        arrive, followed by a final ('exit', exit_code) frame"""
+        if self.backend == 'async':
+            yield from self.async_engine.iter_stream(container_id, command, working_dir)
+            return
+        
+        try:
+            # Ensure container is running (no round trip when the state cache knows it is)
+            exec_id = self._exec_create(container_id, command, working_dir)
+            output = self.client.api.exec_start(exec_id, stream=True, demux=True)
+            
+            # Incremental decoders so multi-byte characters split across chunks survive
+            decoders = {
+                'stdout': codecs.getincrementaldecoder('utf-8')(errors='replace'),
+                'stderr': codecs.getincrementaldecoder('utf-8')(errors='replace')
+            }
+            
+            for stdout_chunk, stderr_chunk in output:
+                for stream, chunk in (('stdout', stdout_chunk), ('stderr', stderr_chunk)):
+                    if chunk:
+                        text = decoders[stream].decode(chunk)
+                        if text:
+                            yield stream, text
+            
+            for stream, decoder in decoders.items():
+                tail = decoder.decode(b'', final=True)
+                if tail:
+                    yield stream, tail
+            
+            exit_code = self.client.api.exec_inspect(exec_id).get('ExitCode')
+            logger.info(f"Streamed command in container {container_id}: {command}")
+            yield 'exit', exit_code if exit_code is not None else 1
+            
+        except Exception as e:
+            logger.error(f"Failed to stream command in container {container_id}: {e}")
+            yield 'stderr', str(e)
+            yield 'exit', 1
+
+    def put_archive(self, container_id: str, path: str, data: bytes) -> bool:
+        """Extract a tar archive into a container directory"""
+        try:
+            container = self.client.containers.get(container_id)
+            success = container.put_archive(path, data)
+            logger.info(f"Uploaded {len(data)} byte archive to {container_id}:{path}")
+            return bool(success)
+        except Exception as e:
+            logger.error(f"Failed to upload archive to container {container_id}: {e}")
+            return False
+
+    def get_archive(self, container_id: str, path: str) -> Iterator[bytes]:
+        """Stream a tar archive of a container path"""
+        container = self.client.containers.get(container_id)
+        chunks, stat = container.get_archive(path)
+        logger.info(f"Downloading archive of {container_id}:{path} ({stat.get('size', 0)} bytes)")
+        return chunks
+
+    def open_shell(self, container_id: str, cols: int = 80, rows: int = 24,
+                   working_dir: str = "/workspace") -> Tuple[Optional[str], object]:
+        """Start a long-lived interactive shell on a PTY and return (exec_id, socket)"""
+        try:
+            exec_id = self.client.api.exec_create(
+                container_id,
+                ['/bin/sh', '-c', 'if command -v bash >/dev/null 2>&1; then exec bash -i; else exec sh -i; fi'],
+                stdin=True,
+                stdout=True,
+                stderr=True,
+                tty=True,
+                workdir=working_dir,
+                environment={'TERM': 'xterm-256color'}
+            )['Id']
+            sock = self.client.api.exec_start(exec_id, tty=True, socket=True)
+            self.resize_shell(exec_id, cols, rows)
+            
+            logger.info(f"Opened shell {exec_id} in container {container_id}")
+            return exec_id, sock
+            
+        except Exception as e:
+            logger.error(f"Failed to open shell in container {container_id}: {e}")
+            return None, None
+
+    def resize_shell(self, exec_id: str, cols: int, rows: int) -> bool:
+        """Resize the PTY of an interactive shell"""
+        try:
+            self.client.api.exec_resize(exec_id, height=rows, width=cols)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to resize shell {exec_id}: {e}")
+            return False
+
     def get_container_status(self, container_id: str) -> Dict:
-        """Get container status and information"""
+        """Get container status and information, from the state cache when it is in sync"""
         try:
+            cached = self.state_cache.get(container_id) if self.state_cache is not None else None
+            if cached:
+                return cached
+            
             container = self.client.containers.get(container_id)
-            container.reload()
             
             return {
                 'id': container.id,
                 'name': container.name,
                 'status': container.status,
                 'created': container.attrs['Created'],
-                'image': container.image.tags[0] if container.image.tags else 'unknown',
+                'image': container.attrs['Config'].get('Image') or 'unknown',
                 'ports': container.ports,
                 'labels': container.labels
             }
@@ -187,8 +494,15 @@ class ContainerManager:
             return {'error': str(e)}
 
     def list_containers(self, all_containers: bool = False) -> List[Dict]:
-        """List all containers"""
+        """List all containers, from the state cache when it is in sync"""
         try:
+            cached = self.state_cache.list(all_containers) if self.state_cache is not None else None
+            if cached is not None:
+                return [
+                    {key: entry[key] for key in ('id', 'name', 'status', 'image', 'created')}
+                    for entry in cached
+                ]
+            
             containers = self.client.containers.list(all=all_containers)
             result = []
             
@@ -207,30 +521,12 @@ class ContainerManager:
             return []
 
     def cleanup_old_containers(self, max_age_hours: int = 24) -> int:
-        """Clean up containers older than specified hours"""
+        """Remove orphaned containers and their workspaces (needs an app context, since
+        projects are cross-checked); returns the number of containers removed.
+        See ContainerReaper for the full report"""
+        from src.models.container_reaper import ContainerReaper
         try:
-            containers = self.client.containers.list(all=True)
-            cleaned = 0
-            
-            for container in containers:
-                # Check if container is from our compiler server
-                if 'compiler-' in container.name:
-                    created_time = datetime.fromisoformat(
-                        container.attrs['Created'].replace('Z', '+00:00')
-                    )
-                    age_hours = (datetime.now().astimezone() - created_time).total_seconds() / 3600
-                    
-                    if age_hours > max_age_hours:
-                        try:
-                            container.remove(force=True)
-                            cleaned += 1
-                            logger.info(f"Cleaned up old container: {container.name}")
-                        except Exception as e:
-                            logger.error(f"Failed to clean up container {container.name}: {e}")
-            
-            logger.info(f"Cleaned up {cleaned} old containers")
-            return cleaned
-            
+            return ContainerReaper(self).reap(max_age_hours)['containers_removed']
         except Exception as e:
             logger.error(f"Failed to cleanup old containers: {e}")
             return 0
@@ -253,3 +549,27 @@ class ContainerManager:
             logger.error(f"Failed to get system info: {e}")
             return {'error': str(e)}
 
+
+
+_container_manager = None
+_container_manager_lock = threading.Lock()
+
+def get_container_manager() -> ContainerManager:
+    """Get the process-wide container manager: a DockerCluster when DOCKER_HOSTS lists
+    engines, otherwise a manager for the environment's engine"""
+    global _container_manager
+    if _container_manager is None:
+        with _container_manager_lock:
+            if _container_manager is None:
+                from src.models.docker_cluster import DOCKER_HOSTS, DockerCluster, parse_hosts
+                hosts = parse_hosts(DOCKER_HOSTS)
+                _container_manager = DockerCluster(hosts) if hosts else ContainerManager()
+    return _container_manager
+
+def _after_fork_in_child():
+    global _container_manager_lock
+    _container_manager_lock = threading.Lock()
+    if _container_manager is not None:
+        _container_manager._reset_after_fork()
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
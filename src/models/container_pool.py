@@ -0,0 +1,341 @@
+"""
+Warm Container Pool Module
+Keeps pre-created, pre-started sandbox containers ready for quick executions
+"""
+
+import os
+import time
+import uuid
+import atexit
+import logging
+import threading
+from collections import deque
+from typing import Dict, Optional
+from src.models.languages import LANGUAGES, SUPPORTED_LANGUAGES
+from src.models.admission import AdmissionRejected
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Pool sizing: WARM_POOL_SIZES="python=2:8,java=0:2" wins over the language registry,
+# which wins over these defaults
+DEFAULT_MIN_SIZE = int(os.getenv('WARM_POOL_MIN_SIZE', '1'))
+DEFAULT_MAX_SIZE = int(os.getenv('WARM_POOL_MAX_SIZE', '4'))
+LEASE_TIMEOUT = float(os.getenv('WARM_POOL_LEASE_TIMEOUT', '5'))
+MAX_USES = int(os.getenv('WARM_POOL_MAX_USES', '50'))
+REFILL_INTERVAL = float(os.getenv('WARM_POOL_REFILL_INTERVAL', '2'))
+REFILL_BACKOFF = float(os.getenv('WARM_POOL_REFILL_BACKOFF', '60'))
+
+# Resets a sandbox between leases: kills every process but init (kill -1 spares PID 1 and the
+# shell itself), waits until none is left alive, then wipes the workspace and /tmp including
+# dotfiles. Exits non-zero when a process survives or a file can't be removed, so the
+# container is recycled instead of handed to the next tenant.
+# Fields after "pid (comm) " in /proc/<pid>/stat: $1 state, $2 ppid; the reset shell and
+# its own descendants (the pipeline counting processes) are not counted
+RESET_SCRIPT = """
+alive() {
+    cat /proc/[0-9]*/stat 2>/dev/null | awk -v self=$$ '
+        { pid = $1; sub(/^.*\\) /, ""); state[pid] = $1; parent[pid] = $2 }
+        END {
+            for (pid in state) {
+                if (pid == 1 || state[pid] == "Z") continue
+                p = pid
+                while (p + 0 > 1 && p != self) p = parent[p]
+                if (p != self) n++
+            }
+            print n + 0
+        }'
+}
+for attempt in 1 2 3 4 5; do
+    kill -KILL -1 2>/dev/null
+    [ "$(alive)" -eq 0 ] && break
+    [ "$attempt" -eq 5 ] && { echo "processes survived the reset" >&2; exit 1; }
+    sleep 1
+done
+rm -rf /workspace/* /workspace/.[!.]* /workspace/..?* /tmp/* /tmp/.[!.]* /tmp/..?*
+"""
+RESET_COMMAND = ['sh', '-c', RESET_SCRIPT]
+
+
+def _parse_sizes(spec: str) -> Dict[str, tuple]:
+    """Parse a "lang=min:max,..." pool size specification"""
+    sizes = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        try:
+            language, bounds = item.split('=', 1)
+            min_size, max_size = (int(value) for value in bounds.split(':', 1))
+            sizes[language.strip()] = (max(0, min_size), max(1, min_size, max_size))
+        except ValueError:
+            logger.warning(f"Ignoring invalid warm pool size entry: {item}")
+    return sizes
+
+
+class PooledContainer:
+    """A container handed out by the pool"""
+
+    def __init__(self, container_id: str, language: str, overflow: bool = False):
+        self.container_id = container_id
+        self.language = language
+        self.overflow = overflow
+        self.created_at = time.time()
+        self.uses = 0
+
+
+class LanguagePool:
+    """Idle containers and bookkeeping for a single language"""
+
+    def __init__(self, language: str, min_size: int, max_size: int):
+        self.language = language
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle = deque()
+        self.leased = 0
+        self.creating = 0
+        self.next_refill_at = 0.0
+
+    @property
+    def total(self) -> int:
+        return len(self.idle) + self.leased + self.creating
+
+
+class ContainerPool:
+    def __init__(self, container_manager, sizes: Optional[Dict[str, tuple]] = None):
+        """Initialize per-language pools; containers are created lazily"""
+        self.container_manager = container_manager
+        configured = _parse_sizes(os.getenv('WARM_POOL_SIZES', ''))
+        configured.update(sizes or {})
+
+        self._cond = threading.Condition()
+        self._pools = {}
+        self._stats = {}
+        for language in SUPPORTED_LANGUAGES:
+            spec = LANGUAGES[language]
+            registry_sizes = (
+                DEFAULT_MIN_SIZE if spec.pool_min is None else spec.pool_min,
+                DEFAULT_MAX_SIZE if spec.pool_max is None else spec.pool_max
+            )
+            min_size, max_size = configured.get(language, registry_sizes)
+            self._pools[language] = LanguagePool(language, min_size, max(min_size, max_size, 1))
+            self._stats[language] = {
+                'hits': 0,
+                'misses': 0,
+                'overflows': 0,
+                'recycled': 0,
+                'leases': 0,
+                'lease_wait_total': 0.0,
+                'lease_wait_max': 0.0
+            }
+
+        self._refill_event = threading.Event()
+        self._refill_thread = None
+        self._pid = None
+        atexit.register(self.shutdown)
+
+    def _ensure_started(self):
+        """Start the refill thread once per process (safe across forks)"""
+        if self._pid == os.getpid() and self._refill_thread and self._refill_thread.is_alive():
+            return
+        with self._cond:
+            if self._pid != os.getpid():
+                # Containers inherited from the parent process belong to the parent
+                for pool in self._pools.values():
+                    pool.idle.clear()
+                    pool.leased = 0
+                    pool.creating = 0
+                self._pid = os.getpid()
+            if not self._refill_thread or not self._refill_thread.is_alive():
+                self._refill_thread = threading.Thread(target=self._refill_loop, daemon=True)
+                self._refill_thread.start()
+                logger.info("Started warm container pool refill thread")
+
+    def _create_container(self, language: str) -> Optional[str]:
+        """Create and start a sandbox container"""
+        container_id, success = self.container_manager.create_container(
+            language=language,
+            project_id=f"pool-{uuid.uuid4().hex[:12]}",
+            cpu_limit=LANGUAGES[language].cpu_share,
+            memory_limit=LANGUAGES[language].memory_limit,
+            kind='pool'
+        )
+        if not success or not container_id:
+            return None
+        try:
+            started = self.container_manager.start_container(container_id)
+        except AdmissionRejected:
+            self.container_manager.remove_container(container_id)
+            raise
+        if not started:
+            self.container_manager.remove_container(container_id)
+            return None
+        return container_id
+
+    def _destroy(self, container_id: str):
+        self.container_manager.remove_container(container_id)
+
+    def lease(self, language: str, timeout: Optional[float] = None) -> Optional[PooledContainer]:
+        """Lease a running container, waiting up to timeout for a free one.
+        Raises AdmissionRejected when a new one would not fit on the node"""
+        if language not in self._pools:
+            return None
+        self._ensure_started()
+
+        started = time.monotonic()
+        deadline = started + (LEASE_TIMEOUT if timeout is None else timeout)
+        pool = self._pools[language]
+        overflow = False
+
+        with self._cond:
+            while True:
+                if pool.idle:
+                    entry = pool.idle.popleft()
+                    pool.leased += 1
+                    self._record_lease(language, started, hit=True)
+                    self._refill_event.set()
+                    return entry
+                if pool.total < pool.max_size:
+                    pool.creating += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    overflow = True
+                    break
+                self._cond.wait(remaining)
+
+        # Cold path: create a container outside the lock
+        rejected = None
+        try:
+            container_id = self._create_container(language)
+        except AdmissionRejected as e:
+            container_id, rejected = None, e
+
+        with self._cond:
+            if not overflow:
+                pool.creating -= 1
+            if not container_id:
+                self._cond.notify_all()
+                if rejected is not None:
+                    raise rejected
+                return None
+            if not overflow:
+                pool.leased += 1
+            else:
+                self._stats[language]['overflows'] += 1
+            self._record_lease(language, started, hit=False)
+
+        return PooledContainer(container_id, language, overflow=overflow)
+
+    def release(self, entry: PooledContainer, reusable: bool = True):
+        """Return a leased container; it is reset or recycled in the background"""
+        entry.uses += 1
+        thread = threading.Thread(target=self._reset_or_recycle, args=(entry, reusable), daemon=True)
+        thread.start()
+
+    def _reset_or_recycle(self, entry: PooledContainer, reusable: bool):
+        pool = self._pools[entry.language]
+        keep = reusable and not entry.overflow and entry.uses < MAX_USES
+
+        if keep:
+            try:
+                _, stderr, exit_code = self.container_manager.execute_command(
+                    entry.container_id, RESET_COMMAND, '/'
+                )
+                keep = exit_code == 0
+                if not keep:
+                    logger.warning(f"Reset of pooled container {entry.container_id} failed: {stderr.strip()}")
+            except Exception as e:
+                logger.warning(f"Failed to reset pooled container {entry.container_id}: {e}")
+                keep = False
+
+        with self._cond:
+            if not entry.overflow:
+                pool.leased -= 1
+            if keep:
+                pool.idle.append(entry)
+            else:
+                self._stats[entry.language]['recycled'] += 1
+            self._cond.notify_all()
+
+        if not keep:
+            self._destroy(entry.container_id)
+            self._refill_event.set()
+
+    def _record_lease(self, language: str, started: float, hit: bool):
+        """Record hit/miss and lease wait time; caller holds the lock"""
+        waited = time.monotonic() - started
+        stats = self._stats[language]
+        stats['hits' if hit else 'misses'] += 1
+        stats['leases'] += 1
+        stats['lease_wait_total'] += waited
+        stats['lease_wait_max'] = max(stats['lease_wait_max'], waited)
+
+    def _refill_loop(self):
+        while self._pid == os.getpid():
+            self._refill_event.wait(REFILL_INTERVAL)
+            self._refill_event.clear()
+            self._refill_once()
+
+    def _refill_once(self):
+        """Create missing containers so each pool has at least min_size idle"""
+        for language, pool in self._pools.items():
+            while True:
+                with self._cond:
+                    if (time.monotonic() < pool.next_refill_at
+                            or len(pool.idle) + pool.creating >= pool.min_size
+                            or pool.total >= pool.max_size):
+                        break
+                    pool.creating += 1
+
+                try:
+                    container_id = self._create_container(language)
+                except AdmissionRejected as e:
+                    logger.info(f"Warm pool refill for {language} not admitted: {e}")
+                    container_id = None
+
+                with self._cond:
+                    pool.creating -= 1
+                    if container_id:
+                        pool.idle.append(PooledContainer(container_id, language))
+                    else:
+                        pool.next_refill_at = time.monotonic() + REFILL_BACKOFF
+                        logger.warning(f"Warm pool refill failed for {language}, backing off")
+                    self._cond.notify_all()
+
+                if not container_id:
+                    break
+
+    def stats(self) -> Dict:
+        """Get pool sizes, hit/miss counts and lease wait times per language"""
+        with self._cond:
+            result = {}
+            for language, pool in self._pools.items():
+                stats = dict(self._stats[language])
+                leases = stats['leases']
+                lookups = stats['hits'] + stats['misses']
+                stats['lease_wait_avg'] = stats['lease_wait_total'] / leases if leases else 0.0
+                stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+                stats.update({
+                    'idle': len(pool.idle),
+                    'leased': pool.leased,
+                    'creating': pool.creating,
+                    'min_size': pool.min_size,
+                    'max_size': pool.max_size
+                })
+                result[language] = stats
+            return result
+
+    def shutdown(self):
+        """Remove idle containers owned by this process"""
+        if self._pid != os.getpid():
+            return
+        with self._cond:
+            idle = [entry for pool in self._pools.values() for entry in pool.idle]
+            for pool in self._pools.values():
+                pool.idle.clear()
+            self._pid = None
+        self._refill_event.set()
+        for entry in idle:
+            try:
+                self._destroy(entry.container_id)
+            except Exception as e:
+                logger.error(f"Failed to remove pooled container {entry.container_id}: {e}")
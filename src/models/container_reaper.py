@@ -0,0 +1,287 @@
+"""
+Container Reaper Module
+Removes orphaned containers, workspace directories and volumes, and expired execution output
+"""
+
+import os
+import glob
+import time
+import fcntl
+import shutil
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set
+from src.models.project import Project, ExecutionResult, db
+from src.models.container_manager import (
+    get_container_manager, workspace_path, WORKSPACE_PREFIX,
+    LABEL_MANAGED, LABEL_KIND, LABEL_PROJECT, LABEL_WORKSPACE, LABEL_OWNER
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds between scheduled reaps (0 disables the schedule)
+REAPER_INTERVAL = float(os.getenv('REAPER_INTERVAL', '3600'))
+
+# Orphans younger than this are left alone, so nothing half-created is reaped
+REAPER_MIN_AGE = float(os.getenv('REAPER_MIN_AGE', '600'))
+
+# Concurrent container removals
+REAPER_PARALLELISM = int(os.getenv('REAPER_PARALLELISM', '4'))
+
+# Held while reaping, so only one process per host reaps at a time
+REAPER_LOCK_FILE = os.getenv('REAPER_LOCK_FILE', '/tmp/compiler-reaper.lock')
+
+MANAGED_FILTER = f'{LABEL_MANAGED}=true'
+
+
+def directory_size(path: str) -> int:
+    """Bytes used by the files under a directory"""
+    total = 0
+    for root, dirs, files in os.walk(path, onerror=lambda e: None):
+        for name in files + dirs:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _owner_alive(owner: Optional[str]) -> bool:
+    """Whether the process owning a pooled sandbox still runs; owners on other hosts count as alive"""
+    host, _, pid = (owner or '').rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+class ContainerReaper:
+    def __init__(self, container_manager, app=None):
+        """Initialize the reaper; the schedule thread starts lazily in each process"""
+        self.container_manager = container_manager
+        self.app = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.last_report = None
+        self.totals = {
+            'runs': 0, 'containers_removed': 0, 'workspaces_removed': 0,
+            'volumes_removed': 0, 'output_days_removed': 0, 'reclaimed_bytes': 0
+        }
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        if REAPER_INTERVAL > 0:
+            app.before_request(self.ensure_started)
+
+    def ensure_started(self):
+        """Start the schedule thread once per process"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._schedule_loop, daemon=True).start()
+        logger.info(f"Started container reaper thread (pid {self._pid})")
+
+    def _schedule_loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(REAPER_INTERVAL)
+            try:
+                with self.app.app_context():
+                    self.reap()
+            except Exception as e:
+                logger.error(f"Scheduled reap failed: {e}")
+
+    def reap(self, max_age_hours: float = 24) -> Dict:
+        """Remove orphans and return what was reclaimed. Labelled containers are orphans when
+        their project is gone or uses another container, or when the process owning a pooled
+        sandbox exited; unlabelled compiler-* containers from older releases are removed once
+        older than max_age_hours unless a project still uses them"""
+        with open(REAPER_LOCK_FILE, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                logger.info("Another process is reaping, skipping")
+                return {'skipped': True, 'containers_removed': 0}
+            try:
+                return self._reap(max_age_hours)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _reap(self, max_age_hours: float) -> Dict:
+        started = time.time()
+        projects = dict(db.session.query(Project.id, Project.container_id).all())
+        live_containers = {container_id for container_id in projects.values() if container_id}
+
+        managed, legacy, removed = [], [], set()
+        removed_bytes = 0
+        pruned = {'count': 0, 'bytes': 0}
+        volumes = {'count': 0, 'bytes': 0}
+        for manager in self.container_manager.managers:
+            client = manager.client
+            host_managed = client.api.containers(all=True, filters={'label': MANAGED_FILTER}, size=True)
+            host_legacy = [
+                item for item in client.api.containers(all=True, filters={'name': 'compiler-'}, size=True)
+                if LABEL_MANAGED not in (item.get('Labels') or {})
+            ]
+            managed += host_managed
+            legacy += host_legacy
+
+            orphans = [item for item in host_managed if self._is_orphan(item, projects, started)]
+            orphans += [
+                item for item in host_legacy
+                if item['Id'] not in live_containers and started - item.get('Created', started) > max_age_hours * 3600
+            ]
+
+            # Stopped pooled and benchmark sandboxes are never reused: one prune per kind
+            for kind in ('pool', 'bench'):
+                try:
+                    result = client.containers.prune(filters={
+                        'label': [MANAGED_FILTER, f'{LABEL_KIND}={kind}'],
+                        'until': f'{int(REAPER_MIN_AGE)}s'
+                    })
+                    pruned['count'] += len(result.get('ContainersDeleted') or [])
+                    pruned['bytes'] += result.get('SpaceReclaimed') or 0
+                except Exception as e:
+                    logger.error(f"Failed to prune {kind} containers: {e}")
+
+            host_removed, host_bytes = self._remove_containers(client, orphans)
+            removed |= host_removed
+            removed_bytes += host_bytes
+
+            try:
+                result = client.volumes.prune(filters={'label': MANAGED_FILTER})
+                volumes['count'] += len(result.get('VolumesDeleted') or [])
+                volumes['bytes'] += result.get('SpaceReclaimed') or 0
+            except Exception as e:
+                logger.error(f"Failed to prune volumes: {e}")
+
+        # Workspaces still mounted by a remaining container or owned by a project are kept
+        remaining = [item for item in managed + legacy if item['Id'] not in removed]
+        keep = {workspace_path(project_id) for project_id in projects}
+        for item in remaining:
+            labels = item.get('Labels') or {}
+            if labels.get(LABEL_WORKSPACE):
+                keep.add(labels[LABEL_WORKSPACE])
+            keep.update(mount.get('Source') for mount in item.get('Mounts') or [])
+        workspaces, workspace_bytes = self._remove_workspaces(keep, started)
+
+        # Spilled execution output past its retention, a day of segments at a time
+        try:
+            output_days, output_bytes = ExecutionResult.prune_spilled_output()
+        except Exception as e:
+            logger.error(f"Failed to prune spilled execution output: {e}")
+            db.session.rollback()
+            output_days, output_bytes = [], 0
+
+        report = {
+            'containers_removed': len(removed) + pruned['count'],
+            'workspaces_removed': workspaces,
+            'volumes_removed': volumes['count'],
+            'output_days_removed': len(output_days),
+            'reclaimed_bytes': {
+                'containers': removed_bytes + pruned['bytes'],
+                'workspaces': workspace_bytes,
+                'volumes': volumes['bytes'],
+                'outputs': output_bytes,
+                'total': removed_bytes + pruned['bytes'] + workspace_bytes + volumes['bytes'] + output_bytes
+            },
+            'checked': {
+                'hosts': len(self.container_manager.managers),
+                'managed': len(managed), 'legacy': len(legacy), 'projects': len(projects)
+            },
+            'duration': round(time.time() - started, 2),
+            'finished_at': time.time()
+        }
+
+        with self._lock:
+            self.last_report = report
+            self.totals['runs'] += 1
+            self.totals['containers_removed'] += report['containers_removed']
+            self.totals['workspaces_removed'] += workspaces
+            self.totals['volumes_removed'] += volumes['count']
+            self.totals['output_days_removed'] += len(output_days)
+            self.totals['reclaimed_bytes'] += report['reclaimed_bytes']['total']
+
+        logger.info(
+            f"Reaped {report['containers_removed']} containers, {workspaces} workspaces and "
+            f"{volumes['count']} volumes, reclaiming {report['reclaimed_bytes']['total']} bytes"
+        )
+        return report
+
+    def _is_orphan(self, item: Dict, projects: Dict[str, Optional[str]], now: float) -> bool:
+        if now - item.get('Created', now) < REAPER_MIN_AGE:
+            return False
+        labels = item.get('Labels') or {}
+        kind = labels.get(LABEL_KIND)
+        if kind == 'project':
+            project_id = labels.get(LABEL_PROJECT)
+            # Gone, or replaced by a newer container
+            return project_id not in projects or projects[project_id] != item['Id']
+        if kind == 'pool':
+            return not _owner_alive(labels.get(LABEL_OWNER))
+        # Benchmark and unknown kinds are never meant to outlive their run
+        return item.get('State') != 'running' or kind == 'bench'
+
+    def _remove_containers(self, client, items: List[Dict]):
+        """Remove containers of one engine in parallel; returns (removed IDs, bytes of their writable layers)"""
+
+        def remove(item):
+            try:
+                client.api.remove_container(item['Id'], force=True, v=True)
+                return item
+            except Exception as e:
+                logger.error(f"Failed to remove container {item['Id'][:12]}: {e}")
+                return None
+
+        if not items:
+            return set(), 0
+        with ThreadPoolExecutor(max_workers=max(1, REAPER_PARALLELISM)) as executor:
+            removed = [item for item in executor.map(remove, items) if item]
+        for item in removed:
+            logger.info(f"Reaped container {(item.get('Names') or [item['Id'][:12]])[0].lstrip('/')}")
+        return {item['Id'] for item in removed}, sum(item.get('SizeRw') or 0 for item in removed)
+
+    def _remove_workspaces(self, keep: Set[str], now: float):
+        """Delete workspace directories nobody uses; returns (count, bytes)"""
+        removed, reclaimed = 0, 0
+        for path in glob.glob(f'{WORKSPACE_PREFIX}*'):
+            if path in keep or not os.path.isdir(path):
+                continue
+            try:
+                if now - os.stat(path).st_mtime < REAPER_MIN_AGE:
+                    continue
+                size = directory_size(path)
+                shutil.rmtree(path)
+                removed += 1
+                reclaimed += size
+            except OSError as e:
+                # Files written by the sandbox user may not be removable by the server
+                logger.error(f"Failed to remove workspace {path}: {e}")
+        return removed, reclaimed
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'interval': REAPER_INTERVAL,
+                'min_age': REAPER_MIN_AGE,
+                'totals': dict(self.totals),
+                'last_report': self.last_report
+            }
+
+
+# Scheduled reaping for the whole process (bound to the app in src/main.py)
+container_reaper = ContainerReaper(get_container_manager())
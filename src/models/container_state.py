@@ -0,0 +1,341 @@
+"""
+Container State Module
+Tracks container states from the Docker events stream and mirrors them onto projects
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+from src.models.project import Project, db
+from src.models.container_manager import get_container_manager
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds between batched writes of changed states to the projects table
+STATE_FLUSH_INTERVAL = float(os.getenv('CONTAINER_STATE_FLUSH_INTERVAL', '2'))
+
+# Seconds to wait before resubscribing after the events stream broke (doubles up to the max)
+STATE_RETRY_DELAY = float(os.getenv('CONTAINER_STATE_RETRY_DELAY', '1'))
+STATE_MAX_RETRY_DELAY = float(os.getenv('CONTAINER_STATE_MAX_RETRY_DELAY', '30'))
+
+# Container event actions and the state they leave the container in; None removes it
+EVENT_STATES = {
+    'create': 'created',
+    'start': 'running',
+    'restart': 'running',
+    'unpause': 'running',
+    'pause': 'paused',
+    'die': 'exited',
+    'stop': 'exited',
+    'destroy': None
+}
+
+# Docker state -> Project.container_status
+PROJECT_STATES = {
+    'created': 'created',
+    'running': 'running',
+    'restarting': 'running',
+    'paused': 'paused',
+    'exited': 'stopped',
+    'dead': 'stopped',
+    'removing': 'stopped',
+    None: 'deleted'
+}
+
+
+def _iso(timestamp) -> Optional[str]:
+    return datetime.utcfromtimestamp(timestamp).isoformat() + 'Z' if timestamp else None
+
+
+def _ports(ports: Optional[List[Dict]]) -> Dict:
+    """Published ports of a container list entry, in the shape of Container.ports"""
+    result = {}
+    for port in ports or []:
+        key = f"{port.get('PrivatePort')}/{port.get('Type', 'tcp')}"
+        binding = [{'HostIp': port.get('IP', ''), 'HostPort': str(port['PublicPort'])}] if port.get('PublicPort') else []
+        result[key] = ((result.get(key) or []) + binding) or None
+    return result
+
+
+class ContainerStateCache:
+    def __init__(self, container_manager, app=None):
+        """Initialize the cache and register it with the manager; the subscriber
+        thread starts lazily in each process"""
+        self.container_manager = container_manager
+        self.app = None
+        self._containers = {}  # container ID -> entry in the shape of get_container_status
+        self._changed = {}  # container ID -> state to write to its project (None: removed)
+        self._missing_check = False  # mark projects of vanished containers on the next flush
+        self._lock = threading.Lock()
+        self._pid = None
+        self._streams = {}  # host -> open events stream
+        self._synced = {}  # host -> whether its stream is following events
+        self.counters = {'events': 0, 'reconciles': 0, 'flushed': 0, 'hits': 0, 'misses': 0}
+        container_manager.state_cache = self
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.before_request(self.ensure_started)
+
+    @property
+    def synced(self) -> bool:
+        """Whether the events of every engine are being followed"""
+        return all(self._synced.get(manager.host) for manager in self.container_manager.managers)
+
+    def ensure_started(self):
+        """Start an event subscriber per engine and the flush thread once per process"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._containers = {}
+            self._changed = {}
+            self._missing_check = False
+            self._streams = {}
+            self._synced = {}
+            for manager in self.container_manager.managers:
+                threading.Thread(target=self._subscribe_loop, args=(manager,), daemon=True).start()
+            threading.Thread(target=self._flush_loop, daemon=True).start()
+        logger.info(f"Started container state tracking (pid {self._pid})")
+
+    def get(self, container_id: str) -> Optional[Dict]:
+        """Cached status of a container by full ID, unique ID prefix or name; None when
+        the cache cannot answer and Docker must be asked"""
+        if not self.synced or self._pid != os.getpid() or not container_id:
+            return None
+        with self._lock:
+            entry = self._containers.get(container_id)
+            if entry is None:
+                matches = [
+                    candidate for candidate in self._containers.values()
+                    if candidate['name'] == container_id.lstrip('/')
+                    or (len(container_id) >= 12 and candidate['id'].startswith(container_id))
+                ]
+                entry = matches[0] if len(matches) == 1 else None
+        if entry is None:
+            self.counters['misses'] += 1
+            return None
+        self.counters['hits'] += 1
+        return dict(entry)
+
+    def get_state(self, container_id: str) -> Optional[str]:
+        entry = self.get(container_id)
+        return entry['status'] if entry else None
+
+    def list(self, all_containers: bool = False) -> Optional[List[Dict]]:
+        """Cached container list, or None while the cache is not in sync"""
+        if not self.synced or self._pid != os.getpid():
+            return None
+        with self._lock:
+            entries = [dict(entry) for entry in self._containers.values()]
+        if not all_containers:
+            entries = [entry for entry in entries if entry['status'] == 'running']
+        return sorted(entries, key=lambda entry: entry['created'] or '', reverse=True)
+
+    def set_state(self, container_id: str, state: Optional[str]):
+        """Record a state change made by this process ahead of its event"""
+        with self._lock:
+            entry = self._containers.get(container_id)
+            if entry is None and state is not None:
+                return
+            if state is None:
+                self._containers.pop(container_id, None)
+            else:
+                entry['status'] = state
+            self._changed[container_id] = state
+
+    def reconcile(self, manager=None):
+        """Replace the cached containers of an engine (every engine by default) with a full
+        list and queue their project states. Once every engine is listed, projects whose
+        container is on none of them are recorded as deleted"""
+        if manager is None:
+            for manager in self.container_manager.managers:
+                self.reconcile(manager)
+            return
+        entries = {}
+        for item in manager.client.api.containers(all=True):
+            entries[item['Id']] = {
+                'id': item['Id'],
+                'name': (item.get('Names') or ['/'])[0].lstrip('/'),
+                'status': item.get('State'),
+                'created': _iso(item.get('Created')),
+                'image': item.get('Image') or 'unknown',
+                'ports': _ports(item.get('Ports')),
+                'labels': item.get('Labels') or {},
+                'host': manager.host
+            }
+        with self._lock:
+            self._containers = {
+                container_id: entry for container_id, entry in self._containers.items()
+                if entry.get('host') != manager.host
+            }
+            self._containers.update(entries)
+            self._changed.update({container_id: entry['status'] for container_id, entry in entries.items()})
+            self._missing_check = True
+        self.counters['reconciles'] += 1
+        logger.info(f"Reconciled container state cache: {len(entries)} containers"
+                    + (f" on {manager.host}" if manager.host else ''))
+
+    def _inspect(self, container_id: str, manager) -> Optional[Dict]:
+        try:
+            info = manager.client.api.inspect_container(container_id)
+        except Exception as e:
+            logger.debug(f"Could not inspect container {container_id}: {e}")
+            return None
+        config = info.get('Config') or {}
+        return {
+            'id': info['Id'],
+            'name': info.get('Name', '').lstrip('/'),
+            'status': (info.get('State') or {}).get('Status'),
+            'created': info.get('Created'),
+            'image': config.get('Image') or 'unknown',
+            'ports': (info.get('NetworkSettings') or {}).get('Ports') or {},
+            'labels': config.get('Labels') or {},
+            'host': manager.host
+        }
+
+    def apply_event(self, event: Dict, manager=None):
+        """Update the cache from one container event of an engine (the first one by default)"""
+        action = (event.get('Action') or event.get('status') or '').split(':')[0]
+        if event.get('Type', 'container') != 'container' or action not in EVENT_STATES:
+            return
+        container_id = (event.get('Actor') or {}).get('ID') or event.get('id')
+        if not container_id:
+            return
+        self.counters['events'] += 1
+        state = EVENT_STATES[action]
+
+        with self._lock:
+            known = container_id in self._containers
+        if state is not None and not known:
+            # New (or unseen) container: one inspect fills in name, image and labels
+            entry = self._inspect(container_id, manager or self.container_manager.managers[0])
+            if entry is None:
+                return
+            entry['status'] = state
+            with self._lock:
+                self._containers[container_id] = entry
+                self._changed[container_id] = state
+            return
+
+        self.set_state(container_id, state)
+
+    def _subscribe_loop(self, manager):
+        pid = os.getpid()
+        host = manager.host
+        delay = STATE_RETRY_DELAY
+        while self._pid == pid:
+            try:
+                since = int(time.time())
+                self.reconcile(manager)
+                self._streams[host] = manager.client.events(
+                    since=since, filters={'type': 'container'}, decode=True
+                )
+                self._synced[host] = True
+                delay = STATE_RETRY_DELAY
+                for event in self._streams[host]:
+                    self.apply_event(event, manager)
+                    if self._pid != pid:
+                        break
+                logger.warning(f"Docker events stream ended{f' ({host})' if host else ''}")
+            except Exception as e:
+                logger.error(f"Docker events subscription failed{f' ({host})' if host else ''}: {e}")
+            finally:
+                self._synced[host] = False
+                self._close_stream(host)
+            time.sleep(delay)
+            delay = min(delay * 2, STATE_MAX_RETRY_DELAY)
+
+    def _close_stream(self, host):
+        stream = self._streams.pop(host, None)
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def flush(self) -> int:
+        """Write changed states to the projects that own the containers, one UPDATE per state"""
+        with self._lock:
+            changed, self._changed = self._changed, {}
+            # Wait until every engine was listed, or containers of the others look deleted
+            missing_check = self._missing_check and self.synced
+            self._missing_check = self._missing_check and not missing_check
+            known = set(self._containers) if missing_check else None
+        if not changed and not missing_check:
+            return 0
+
+        by_status = {}
+        for container_id, state in changed.items():
+            by_status.setdefault(PROJECT_STATES.get(state, 'stopped'), []).append(container_id)
+
+        updated = 0
+        try:
+            for status, container_ids in by_status.items():
+                for start in range(0, len(container_ids), 500):
+                    updated += Project.query.filter(
+                        Project.container_id.in_(container_ids[start:start + 500]),
+                        Project.container_status != status
+                    ).update({'container_status': status}, synchronize_session=False)
+
+            if missing_check:
+                # After a full list, projects pointing at containers Docker no longer has
+                for project in Project.query.filter(
+                    Project.container_id.isnot(None),
+                    Project.container_status != 'deleted'
+                ).with_entities(Project.id, Project.container_id).all():
+                    if project.container_id not in known:
+                        updated += Project.query.filter_by(id=project.id).update(
+                            {'container_status': 'deleted'}, synchronize_session=False
+                        )
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Failed to write container states: {e}")
+            db.session.rollback()
+            with self._lock:
+                for container_id, state in changed.items():
+                    self._changed.setdefault(container_id, state)
+                self._missing_check = self._missing_check or missing_check
+            return 0
+
+        self.counters['flushed'] += updated
+        if updated:
+            logger.info(f"Updated container status of {updated} projects")
+        return updated
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(STATE_FLUSH_INTERVAL)
+            if self.app is None:
+                continue
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception as e:
+                logger.error(f"Container state flush failed: {e}")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size = len(self._containers)
+            pending = len(self._changed)
+        return {
+            'synced': self.synced,
+            'hosts': {manager.host or 'local': bool(self._synced.get(manager.host)) for manager in self.container_manager.managers},
+            'containers': size,
+            'pending_updates': pending,
+            'counters': dict(self.counters)
+        }
+
+
+# Serves container status and lists for the whole process (bound to the app in src/main.py)
+container_state = ContainerStateCache(get_container_manager())
@@ -0,0 +1,328 @@
+"""
+Docker Cluster Module
+Spreads containers over several Docker engines and routes every container call to its engine
+"""
+
+import os
+import time
+import zlib
+import logging
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from flask import has_app_context
+from src.models.project import Project
+from src.models.container_manager import (
+    ContainerManager, EXECUTION_BACKEND, DEFAULT_IMAGE_VARIANT, ImageBuilder, BuildJob
+)
+from src.models.languages import LANGUAGES
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Engines to place containers on: "name=endpoint,..." (or bare endpoints, named host1, host2, ...)
+# e.g. DOCKER_HOSTS="local=unix:///var/run/docker.sock,node2=tcp://10.0.0.2:2375"
+DOCKER_HOSTS = os.getenv('DOCKER_HOSTS', '')
+
+# 'least-loaded' picks the engine with the most free capacity; 'affinity' hashes the
+# project ID so a project keeps landing on the same engine while it is up
+PLACEMENT_POLICY = os.getenv('PLACEMENT_POLICY', 'least-loaded')
+PLACEMENT_POLICIES = ['least-loaded', 'affinity']
+
+# Seconds an engine that failed a create is left out of placement
+HOST_RETRY_AFTER = float(os.getenv('DOCKER_HOST_RETRY_AFTER', '30'))
+
+
+def parse_hosts(spec: str) -> List[Tuple[str, str]]:
+    """(name, endpoint) pairs from a DOCKER_HOSTS specification"""
+    hosts = []
+    for index, item in enumerate(filter(None, (part.strip() for part in spec.split(','))), start=1):
+        name, _, endpoint = item.rpartition('=') if '=' in item.split('://', 1)[0] else ('', '', item)
+        hosts.append((name.strip() or f'host{index}', endpoint.strip()))
+    names = [name for name, _ in hosts]
+    if len(set(names)) != len(names):
+        raise ValueError(f'Duplicate names in DOCKER_HOSTS: {spec}')
+    return hosts
+
+
+class ClusterAdmission:
+    """Admission checks across engines, for callers written against a single AdmissionController"""
+
+    def __init__(self, cluster):
+        self.cluster = cluster
+
+    @property
+    def enabled(self) -> bool:
+        return any(manager.admission.enabled for manager in self.cluster.managers)
+
+    def check_request(self, cpu_limit, memory_limit):
+        """Accept limits that fit on at least one engine (ValueError otherwise)"""
+        error = None
+        for manager in self.cluster.managers:
+            try:
+                return manager.admission.check_request(cpu_limit, memory_limit)
+            except ValueError as e:
+                error = e
+        raise error
+
+    def stats(self) -> Dict:
+        return {manager.host: manager.admission.stats() for manager in self.cluster.managers}
+
+
+class DockerCluster:
+    def __init__(self, hosts: List[Tuple[str, str]], policy: str = PLACEMENT_POLICY,
+                 backend: str = EXECUTION_BACKEND):
+        """One ContainerManager per engine; the first engine is the default"""
+        if not hosts:
+            raise ValueError('A Docker cluster needs at least one host')
+        if policy not in PLACEMENT_POLICIES:
+            raise ValueError(f"Unknown placement policy '{policy}'. Available: {', '.join(PLACEMENT_POLICIES)}")
+        self.hosts = {
+            name: ContainerManager(backend=backend, host=name, docker_host=endpoint)
+            for name, endpoint in hosts
+        }
+        self.default_host = hosts[0][0]
+        self.policy = policy
+        self._routes = {}  # container or exec ID -> host name
+        self._down = {}  # host name -> monotonic time it may be used again
+        self._lock = threading.Lock()
+        self._state_cache = None
+        self.admission = ClusterAdmission(self)
+        self.counters = {'placed': {name: 0 for name in self.hosts}, 'probes': 0, 'failovers': 0}
+        logger.info(f"Docker cluster with {len(self.hosts)} hosts ({policy} placement): {', '.join(self.hosts)}")
+
+    @property
+    def managers(self) -> List[ContainerManager]:
+        return list(self.hosts.values())
+
+    @property
+    def client(self):
+        """Client of the default engine, for tools that talk to a single engine"""
+        return self.hosts[self.default_host].client
+
+    @property
+    def state_cache(self):
+        return self._state_cache
+
+    @state_cache.setter
+    def state_cache(self, cache):
+        # One cache holds the containers of every engine (entries carry their host)
+        self._state_cache = cache
+        for manager in self.managers:
+            manager.state_cache = cache
+
+    def _reset_after_fork(self):
+        self._lock = threading.Lock()
+        self._down = {}
+        for manager in self.managers:
+            manager._reset_after_fork()
+
+    # Routing
+
+    def _remember(self, key: Optional[str], host: str):
+        if key:
+            with self._lock:
+                self._routes[key] = host
+
+    def host_of(self, container_id: str) -> Optional[str]:
+        """Engine running a container: remembered routes, the state cache, the placement
+        recorded on its project, then asking each engine; None when no engine knows it"""
+        if not container_id:
+            return None
+        with self._lock:
+            host = self._routes.get(container_id)
+        if host:
+            return host
+
+        cached = self._state_cache.get(container_id) if self._state_cache is not None else None
+        if cached and cached.get('host') in self.hosts:
+            self._remember(container_id, cached['host'])
+            return cached['host']
+
+        if has_app_context():
+            recorded = Project.query.filter_by(container_id=container_id).with_entities(Project.docker_host).first()
+            if recorded and recorded.docker_host in self.hosts:
+                self._remember(container_id, recorded.docker_host)
+                return recorded.docker_host
+
+        self.counters['probes'] += 1
+        for name, manager in self.hosts.items():
+            try:
+                manager.client.api.inspect_container(container_id)
+            except Exception:
+                continue
+            self._remember(container_id, name)
+            return name
+        return None
+
+    def manager_for(self, container_id: str) -> ContainerManager:
+        """Manager of the engine running a container (the default one when nobody knows it,
+        so the caller gets that engine's not-found error)"""
+        return self.hosts[self.host_of(container_id) or self.default_host]
+
+    # Placement
+
+    def _available(self) -> List[str]:
+        now = time.monotonic()
+        with self._lock:
+            hosts = [name for name in self.hosts if self._down.get(name, 0) <= now]
+        return hosts or list(self.hosts)
+
+    def _load(self, name: str, kind: str) -> float:
+        """Fraction of an engine's admissible capacity in use (the fuller of CPU and memory)"""
+        admission = self.hosts[name].admission
+        try:
+            capacity = admission.capacity()
+            if not capacity:
+                return float('inf')
+            used = admission.usage()
+            cpu_ratio, memory_ratio = admission.ratio(kind)
+            return max(used['cpu'] / (capacity['cpu'] * cpu_ratio),
+                       used['memory'] / (capacity['memory'] * memory_ratio))
+        except Exception as e:
+            logger.warning(f"Could not read the load of Docker host {name}: {e}")
+            return float('inf')
+
+    def placement(self, project_id: Optional[str] = None, kind: str = 'project',
+                  host: Optional[str] = None) -> List[str]:
+        """Engines to try for a new container, best first. A preferred host (a project's
+        recorded placement) comes first while it is up"""
+        hosts = self._available()
+        if self.policy == 'affinity' and project_id:
+            # Rendezvous hashing: only projects of a lost engine move when the set changes
+            order = sorted(hosts, key=lambda name: zlib.crc32(f'{name}/{project_id}'.encode()), reverse=True)
+        else:
+            loads = {name: self._load(name, kind) for name in hosts}
+            order = sorted(hosts, key=lambda name: loads[name])
+        if host in hosts:
+            order.remove(host)
+            order.insert(0, host)
+        return order
+
+    def create_container(self, language: str, project_id: str = None,
+                         cpu_limit: str = "1", memory_limit: str = "512m",
+                         variant: str = DEFAULT_IMAGE_VARIANT, kind: str = 'project',
+                         host: Optional[str] = None) -> Tuple[str, bool]:
+        """Create a container on the best engine, falling back to the next one when it fails"""
+        for name in self.placement(project_id, kind, host):
+            container_id, success = self.hosts[name].create_container(
+                language, project_id, cpu_limit, memory_limit, variant, kind
+            )
+            if success and container_id:
+                self._remember(container_id, name)
+                self.counters['placed'][name] += 1
+                logger.info(f"Placed {kind} container {container_id[:12]} on Docker host {name}")
+                return container_id, True
+            with self._lock:
+                self._down[name] = time.monotonic() + HOST_RETRY_AFTER
+            self.counters['failovers'] += 1
+            logger.warning(f"Container create failed on Docker host {name}, trying the next one")
+        return None, False
+
+    # Calls on one container, routed to its engine
+
+    def start_container(self, container_id: str) -> bool:
+        return self.manager_for(container_id).start_container(container_id)
+
+    def pause_container(self, container_id: str) -> bool:
+        return self.manager_for(container_id).pause_container(container_id)
+
+    def unpause_container(self, container_id: str) -> bool:
+        return self.manager_for(container_id).unpause_container(container_id)
+
+    def ensure_running(self, container_id: str) -> bool:
+        return self.manager_for(container_id).ensure_running(container_id)
+
+    def stop_container(self, container_id: str) -> bool:
+        return self.manager_for(container_id).stop_container(container_id)
+
+    def remove_container(self, container_id: str) -> bool:
+        removed = self.manager_for(container_id).remove_container(container_id)
+        if removed:
+            with self._lock:
+                self._routes.pop(container_id, None)
+        return removed
+
+    def execute_command(self, container_id: str, command: Union[str, List[str]],
+                        working_dir: str = "/workspace") -> Tuple[str, str, int]:
+        return self.manager_for(container_id).execute_command(container_id, command, working_dir)
+
+    def stream_command(self, container_id: str, command: str,
+                       working_dir: str = "/workspace") -> Iterator[Tuple[str, object]]:
+        return self.manager_for(container_id).stream_command(container_id, command, working_dir)
+
+    def put_archive(self, container_id: str, path: str, data: bytes) -> bool:
+        return self.manager_for(container_id).put_archive(container_id, path, data)
+
+    def get_archive(self, container_id: str, path: str) -> Iterator[bytes]:
+        return self.manager_for(container_id).get_archive(container_id, path)
+
+    def open_shell(self, container_id: str, cols: int = 80, rows: int = 24,
+                   working_dir: str = "/workspace") -> Tuple[Optional[str], object]:
+        name = self.host_of(container_id) or self.default_host
+        exec_id, sock = self.hosts[name].open_shell(container_id, cols, rows, working_dir)
+        self._remember(exec_id, name)
+        return exec_id, sock
+
+    def resize_shell(self, exec_id: str, cols: int, rows: int) -> bool:
+        with self._lock:
+            name = self._routes.get(exec_id, self.default_host)
+        return self.hosts[name].resize_shell(exec_id, cols, rows)
+
+    def get_container_status(self, container_id: str) -> Dict:
+        name = self.host_of(container_id) or self.default_host
+        status = self.hosts[name].get_container_status(container_id)
+        if 'error' not in status:
+            status['host'] = name
+        return status
+
+    # Calls on every engine
+
+    def list_containers(self, all_containers: bool = False) -> List[Dict]:
+        result = []
+        for name, manager in self.hosts.items():
+            result.extend(dict(entry, host=name) for entry in manager.list_containers(all_containers))
+        return result
+
+    def build_images(self, languages: Optional[List[str]] = None, force: bool = False,
+                     variants: Optional[List[str]] = None) -> Dict[str, bool]:
+        """Build images on every engine (see ImageBuilder)"""
+        return ImageBuilder(self).run(BuildJob(languages or list(LANGUAGES), force=force, variants=variants))
+
+    def get_image_digest(self, image_name: str) -> Optional[str]:
+        """Digest on the default engine; every engine builds the same Dockerfiles, so it
+        identifies the toolchain for the compile and result caches"""
+        return self.hosts[self.default_host].get_image_digest(image_name)
+
+    def invalidate_image_digest(self, image_name: str):
+        for manager in self.managers:
+            manager.invalidate_image_digest(image_name)
+
+    def cleanup_old_containers(self, max_age_hours: int = 24) -> int:
+        from src.models.container_reaper import ContainerReaper
+        try:
+            return ContainerReaper(self).reap(max_age_hours)['containers_removed']
+        except Exception as e:
+            logger.error(f"Failed to cleanup old containers: {e}")
+            return 0
+
+    def get_system_info(self) -> Dict:
+        """Totals over the engines that answered, with each engine's own info under 'hosts'"""
+        hosts = {name: manager.get_system_info() for name, manager in self.hosts.items()}
+        reachable = [info for info in hosts.values() if 'error' not in info]
+        if not reachable:
+            return {'error': 'No Docker host reachable', 'hosts': hosts}
+        totals = {
+            key: sum(info.get(key, 0) for info in reachable)
+            for key in ('containers', 'containers_running', 'containers_paused', 'containers_stopped',
+                        'images', 'memory_total', 'cpus')
+        }
+        totals['server_version'] = reachable[0].get('server_version', 'unknown')
+        totals['hosts'] = hosts
+        totals['placement'] = {
+            'policy': self.policy,
+            'placed': dict(self.counters['placed']),
+            'probes': self.counters['probes'],
+            'failovers': self.counters['failovers']
+        }
+        return totals
@@ -0,0 +1,107 @@
+"""
+Execution Limits Module
+Wall-clock and CPU-time limits for container execs and killing of their process trees
+"""
+
+import os
+import math
+import shlex
+import logging
+from typing import Dict, List, Optional, Union
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Defaults and maxima for project executions (seconds)
+EXECUTION_TIME_LIMIT = float(os.getenv('EXECUTION_TIME_LIMIT', '300'))
+EXECUTION_CPU_LIMIT = float(os.getenv('EXECUTION_CPU_LIMIT', '120'))
+EXECUTION_MAX_TIME_LIMIT = float(os.getenv('EXECUTION_MAX_TIME_LIMIT', '3600'))
+EXECUTION_MAX_CPU_LIMIT = float(os.getenv('EXECUTION_MAX_CPU_LIMIT', '1800'))
+
+# Limits for quick executions
+QUICK_TIME_LIMIT = float(os.getenv('QUICK_TIME_LIMIT', '10'))
+QUICK_CPU_LIMIT = float(os.getenv('QUICK_CPU_LIMIT', '10'))
+
+# Seconds between the polite signal and SIGKILL
+KILL_GRACE = int(os.getenv('EXECUTION_KILL_GRACE', '2'))
+
+# Exit statuses of limited commands: timeout(1), SIGKILL, SIGTERM and SIGXCPU
+EXIT_TIMEOUT = 124
+EXIT_KILLED = 137
+EXIT_TERMINATED = 143
+EXIT_CPU_LIMIT = 152
+
+# Counts the processes of the group and their CPU ticks, then kills the group and
+# its leader (busybox timeout execs the program itself instead of leading a group).
+# Fields after "pid (comm) " in /proc/<pid>/stat: $3 pgrp, $12 utime, $13 stime
+KILL_SCRIPT = """
+pgid=$(cat {pid_file} 2>/dev/null)
+[ -n "$pgid" ] || {{ echo 0 0 100; exit 0; }}
+usage=$(cat /proc/[0-9]*/stat 2>/dev/null | awk -v g="$pgid" '{{ sub(/^.*\\) /, ""); if ($3 == g) {{ n++; t += $12 + $13 }} }} END {{ print n + 0, t + 0 }}')
+kill -KILL -"$pgid" 2>/dev/null
+kill -KILL "$pgid" 2>/dev/null
+rm -f {pid_file}
+echo $usage $(getconf CLK_TCK 2>/dev/null || echo 100)
+"""
+
+
+def pid_file(tag: str) -> str:
+    """Path, inside the container, holding the process group ID of an exec"""
+    return f'/tmp/exec-{tag}.pid'
+
+
+def clamp_limit(value, default: float, maximum: float) -> float:
+    """Validate a requested limit in seconds, falling back to the default"""
+    if value is None:
+        return default
+    value = float(value)
+    if value <= 0:
+        raise ValueError('limits must be positive numbers of seconds')
+    return min(value, maximum)
+
+
+def limit_command(command: Union[str, List[str]], tag: str,
+                  time_limit: float, cpu_limit: float) -> List[str]:
+    """Wrap a command so it runs under timeout and ulimit -t.
+    The shell records its PID before exec'ing timeout, which makes that PID
+    the process group ID of the whole tree; kill_exec uses it later"""
+    args = shlex.split(command) if isinstance(command, str) else list(command)
+    cpu_seconds = max(1, math.ceil(cpu_limit))
+    script = (
+        f'echo $$ > {pid_file(tag)}; '
+        f'ulimit -S -t {cpu_seconds}; ulimit -H -t {cpu_seconds + KILL_GRACE}; '
+        f'exec timeout -k {KILL_GRACE} {max(1, math.ceil(time_limit))} {shlex.join(args)}'
+    )
+    return ['sh', '-c', script]
+
+
+def termination_reason(exit_code: int, elapsed: float, time_limit: float) -> Optional[str]:
+    """Tell whether a limited command was cut off by one of its limits"""
+    if exit_code == EXIT_TIMEOUT:
+        return 'timeout'
+    if exit_code in (EXIT_KILLED, EXIT_TERMINATED) and elapsed >= time_limit:
+        return 'timeout'
+    if exit_code == EXIT_CPU_LIMIT:
+        return 'cpu_limit'
+    return None
+
+
+def kill_exec(container_manager, container_id: str, tag: str) -> Dict:
+    """Kill every process left in the exec's process group.
+    Returns what was reclaimed: {'processes': n, 'cpu_seconds': s}"""
+    reclaimed = {'processes': 0, 'cpu_seconds': 0.0}
+    stdout, stderr, exit_code = container_manager.execute_command(
+        container_id, ['sh', '-c', KILL_SCRIPT.format(pid_file=pid_file(tag))], '/'
+    )
+
+    try:
+        processes, ticks, hertz = stdout.split()[:3]
+        reclaimed['processes'] = int(processes)
+        reclaimed['cpu_seconds'] = round(int(float(ticks)) / (int(hertz) or 100), 2)
+    except ValueError:
+        logger.warning(f"Could not read usage of exec {tag} in {container_id}: {stdout or stderr}")
+
+    if reclaimed['processes']:
+        logger.info(f"Killed {reclaimed['processes']} processes of exec {tag} in {container_id}")
+    return reclaimed
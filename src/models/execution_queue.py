@@ -0,0 +1,247 @@
+"""
+Execution Queue Module
+Database-backed job queue with a bounded worker pool for project executions
+"""
+
+import os
+import time
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+from sqlalchemy import or_, text
+from src.models.project import ExecutionResult, db
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Worker threads per process and concurrency caps shared by all processes
+WORKERS_PER_PROCESS = int(os.getenv('EXECUTION_WORKERS', '4'))
+GLOBAL_LIMIT = int(os.getenv('EXECUTION_GLOBAL_LIMIT', '16'))
+USER_LIMIT = int(os.getenv('EXECUTION_USER_LIMIT', '2'))
+PROJECT_LIMIT = int(os.getenv('EXECUTION_PROJECT_LIMIT', '1'))
+MAX_PENDING = int(os.getenv('EXECUTION_MAX_PENDING', '1000'))
+
+POLL_INTERVAL = float(os.getenv('EXECUTION_POLL_INTERVAL', '1'))
+HEARTBEAT_INTERVAL = float(os.getenv('EXECUTION_HEARTBEAT_INTERVAL', '10'))
+STALE_AFTER = float(os.getenv('EXECUTION_STALE_AFTER', '60'))
+MAX_ATTEMPTS = int(os.getenv('EXECUTION_MAX_ATTEMPTS', '3'))
+
+# Highest priority first, then oldest first
+_CANDIDATES_SQL = text("""
+    SELECT id FROM execution_results
+    WHERE status = 'pending'
+    ORDER BY priority DESC, started_at ASC
+    LIMIT :batch
+""")
+
+# The caps are re-checked inside the UPDATE so concurrent claimers from
+# different processes cannot overshoot them (writes are serialized)
+_CLAIM_SQL = text("""
+    UPDATE execution_results
+    SET status = 'running', worker_id = :worker_id, heartbeat_at = :now,
+        attempts = COALESCE(attempts, 0) + 1
+    WHERE id = :execution_id
+      AND status = 'pending'
+      AND (SELECT COUNT(*) FROM execution_results r
+           WHERE r.status = 'running') < :global_limit
+      AND (SELECT COUNT(*) FROM execution_results r
+           WHERE r.status = 'running'
+             AND r.project_id = execution_results.project_id) < :project_limit
+      AND (execution_results.user_id IS NULL
+           OR (SELECT COUNT(*) FROM execution_results r
+               WHERE r.status = 'running'
+                 AND r.user_id = execution_results.user_id) < :user_limit)
+""")
+
+
+class QueueFullError(Exception):
+    """Raised when the queue has too many pending executions"""
+
+
+class ExecutionQueue:
+    def __init__(self, runner: Callable[[str], None], app=None):
+        """Initialize the queue; runner is called with an execution ID"""
+        self.runner = runner
+        self.app = None
+        self._cond = threading.Condition()
+        self._active = set()
+        self._threads = []
+        self._pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Bind to the app and recover executions orphaned by a restart"""
+        self.app = app
+        try:
+            with app.app_context():
+                self.recover()
+        except Exception as e:
+            logger.error(f"Failed to recover executions at startup: {e}")
+        # Workers are started lazily in each serving process (after fork)
+        app.before_request(self.ensure_started)
+
+    def ensure_started(self):
+        """Start worker and heartbeat threads once per process"""
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._active = set()
+            self._threads = []
+            for index in range(WORKERS_PER_PROCESS):
+                thread = threading.Thread(target=self._worker_loop, args=(index,), daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+            heartbeat.start()
+            self._threads.append(heartbeat)
+        logger.info(f"Started {WORKERS_PER_PROCESS} execution workers (pid {self._pid})")
+
+    def enqueue(self, project_id: str, command: str, user_id: Optional[str] = None,
+                working_dir: str = "/workspace", priority: int = 0,
+                time_limit: Optional[float] = None,
+                cpu_time_limit: Optional[float] = None) -> ExecutionResult:
+        """Persist a pending execution and wake up a worker"""
+        if ExecutionResult.count_pending() >= MAX_PENDING:
+            raise QueueFullError('Execution queue is full, please retry later')
+
+        execution = ExecutionResult(
+            project_id=project_id,
+            command=command,
+            user_id=user_id,
+            working_dir=working_dir,
+            priority=priority,
+            time_limit=time_limit,
+            cpu_time_limit=cpu_time_limit
+        )
+        execution.save()
+
+        self.ensure_started()
+        with self._cond:
+            self._cond.notify()
+        return execution
+
+    def _worker_id(self, index: int) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+    def _claim(self, worker_id: str) -> Optional[str]:
+        """Atomically claim the next runnable execution, if any"""
+        candidates = db.session.execute(
+            _CANDIDATES_SQL, {'batch': WORKERS_PER_PROCESS * 4}
+        ).scalars().all()
+
+        for execution_id in candidates:
+            result = db.session.execute(_CLAIM_SQL, {
+                'execution_id': execution_id,
+                'worker_id': worker_id,
+                'now': datetime.utcnow(),
+                'global_limit': GLOBAL_LIMIT,
+                'project_limit': PROJECT_LIMIT,
+                'user_limit': USER_LIMIT
+            })
+            db.session.commit()
+            if result.rowcount == 1:
+                return execution_id
+        return None
+
+    def _worker_loop(self, index: int):
+        worker_id = self._worker_id(index)
+        pid = os.getpid()
+
+        while self._pid == pid:
+            execution_id = None
+            try:
+                with self.app.app_context():
+                    execution_id = self._claim(worker_id)
+                    if execution_id:
+                        with self._cond:
+                            self._active.add(execution_id)
+                        self.runner(execution_id)
+            except Exception as e:
+                logger.error(f"Execution worker {worker_id} failed: {e}")
+            finally:
+                if execution_id:
+                    with self._cond:
+                        self._active.discard(execution_id)
+
+            if not execution_id:
+                with self._cond:
+                    self._cond.wait(POLL_INTERVAL)
+
+    def _heartbeat_loop(self):
+        pid = os.getpid()
+        since_recovery = 0.0
+
+        while self._pid == pid:
+            time.sleep(HEARTBEAT_INTERVAL)
+            try:
+                with self.app.app_context():
+                    with self._cond:
+                        active = list(self._active)
+                    if active:
+                        ExecutionResult.query.filter(
+                            ExecutionResult.id.in_(active),
+                            ExecutionResult.status == 'running'
+                        ).update({'heartbeat_at': datetime.utcnow()}, synchronize_session=False)
+                        db.session.commit()
+
+                    since_recovery += HEARTBEAT_INTERVAL
+                    if since_recovery >= STALE_AFTER:
+                        since_recovery = 0.0
+                        self.recover()
+            except Exception as e:
+                logger.error(f"Execution heartbeat failed: {e}")
+
+    def recover(self) -> int:
+        """Requeue running executions whose worker stopped sending heartbeats"""
+        cutoff = datetime.utcnow() - timedelta(seconds=STALE_AFTER)
+
+        try:
+            stale = ExecutionResult.query.filter(
+                ExecutionResult.status == 'running',
+                or_(ExecutionResult.heartbeat_at.is_(None), ExecutionResult.heartbeat_at < cutoff)
+            ).all()
+
+            for execution in stale:
+                if (execution.attempts or 0) >= MAX_ATTEMPTS:
+                    execution.set_output(stderr=f'Execution lost after {execution.attempts} attempts')
+                    execution.set_status('failed')
+                else:
+                    execution.status = 'pending'
+                    execution.worker_id = None
+                    execution.heartbeat_at = None
+            db.session.commit()
+
+            if stale:
+                logger.info(f"Recovered {len(stale)} orphaned executions")
+                with self._cond:
+                    self._cond.notify_all()
+            return len(stale)
+
+        except Exception as e:
+            logger.error(f"Failed to recover orphaned executions: {e}")
+            db.session.rollback()
+            return 0
+
+    def stats(self) -> dict:
+        """Get queue depth and worker information"""
+        with self._cond:
+            active = len(self._active)
+        return {
+            'pending': ExecutionResult.count_pending(),
+            'running': ExecutionResult.query.filter_by(status='running').count(),
+            'active_in_process': active,
+            'workers_per_process': WORKERS_PER_PROCESS,
+            'limits': {
+                'global': GLOBAL_LIMIT,
+                'per_user': USER_LIMIT,
+                'per_project': PROJECT_LIMIT,
+                'max_pending': MAX_PENDING
+            }
+        }
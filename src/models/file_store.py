@@ -0,0 +1,72 @@
+"""
+File Store Module
+Content-addressed blob storage for project files, keyed by SHA-256
+"""
+
+import os
+import uuid
+import hashlib
+import logging
+from typing import Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FILE_STORE_DIR = os.getenv(
+    'FILE_STORE_DIR',
+    os.path.join(os.path.dirname(__file__), '..', 'database', 'blobs')
+)
+
+
+def hash_content(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore:
+    def __init__(self, root: str = FILE_STORE_DIR):
+        """Initialize the store; blobs live under root/<sha[:2]>/<sha>"""
+        self.root = os.path.abspath(root)
+
+    def path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def put(self, data: bytes) -> str:
+        """Store content (once per distinct hash) and return its SHA-256"""
+        sha256 = hash_content(data)
+        path = self.path(sha256)
+        if os.path.exists(path):
+            return sha256
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        return sha256
+
+    def get(self, sha256: str) -> Optional[bytes]:
+        """Read content by hash"""
+        try:
+            with open(self.path(sha256), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            logger.error(f"Blob {sha256} missing from file store")
+            return None
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self.path(sha256))
+
+    def delete(self, sha256: str) -> bool:
+        """Remove a blob that is no longer referenced"""
+        try:
+            os.remove(self.path(sha256))
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.error(f"Failed to delete blob {sha256}: {e}")
+            return False
+
+
+blob_store = BlobStore()
@@ -0,0 +1,289 @@
+"""
+Image Builder Module
+Builds language images as background jobs with bounded parallelism and change detection
+"""
+
+import os
+import json
+import uuid
+import time
+import hashlib
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from src.models.languages import LANGUAGES, IMAGE_VARIANTS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DOCKERFILES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'dockerfiles'))
+
+IMAGE_BUILD_PARALLELISM = int(os.getenv('IMAGE_BUILD_PARALLELISM', '3'))
+
+# Job state is mirrored here so every worker process can answer status polls
+IMAGE_BUILD_STATE_DIR = os.getenv('IMAGE_BUILD_STATE_DIR', '/tmp/compiler-image-builds')
+
+# Build log lines kept per image
+BUILD_LOG_LINES = int(os.getenv('IMAGE_BUILD_LOG_LINES', '200'))
+
+# Image label holding the hash of the Dockerfile it was built from
+DOCKERFILE_HASH_LABEL = 'compiler-server.dockerfile-sha256'
+
+
+def dockerfile_hash(path: str) -> str:
+    """Hash of a Dockerfile; the images copy nothing from the build context, so this
+    is everything that determines the build besides the base image"""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def image_key(language: str, variant: str) -> str:
+    """Key of an image in a job: the language for minimal images, language:variant otherwise"""
+    return language if variant == 'minimal' else f'{language}:{variant}'
+
+
+def base_images(path: str) -> List[str]:
+    """Images named in FROM instructions"""
+    images = []
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].upper() == 'FROM' and not parts[1].startswith('--'):
+                images.append(parts[1])
+    return images
+
+
+class BuildJob:
+    """Progress of one build-images request"""
+
+    def __init__(self, languages: List[str], force: bool = False, pull: bool = False,
+                 variants: Optional[List[str]] = None):
+        self.id = str(uuid.uuid4())
+        self.languages = languages
+        self.variants = variants or ['minimal']
+        self.force = force
+        self.pull = pull
+        self.status = 'queued'  # queued, running, completed, failed
+        self.created_at = time.time()
+        self.finished_at = None
+        # (key, language, variant) of every image to build
+        self.targets = [
+            (image_key(language, variant), language, variant)
+            for language in languages for variant in self.variants
+        ]
+        self.images = {
+            key: {'status': 'queued', 'variant': variant, 'hash': None, 'error': None, 'duration': None}
+            for key, language, variant in self.targets
+        }
+        self.logs = {key: deque(maxlen=BUILD_LOG_LINES) for key, _, _ in self.targets}
+        self.lock = threading.Lock()
+
+    def to_dict(self, log_lines: int = 20) -> Dict:
+        with self.lock:
+            images = {}
+            for key, state in self.images.items():
+                images[key] = dict(state)
+                if log_lines:
+                    images[key]['log'] = list(self.logs[key])[-log_lines:]
+            counts = {}
+            for state in self.images.values():
+                counts[state['status']] = counts.get(state['status'], 0) + 1
+            done = sum(counts.get(status, 0) for status in ('built', 'skipped', 'failed'))
+            return {
+                'job_id': self.id,
+                'status': self.status,
+                'force': self.force,
+                'variants': self.variants,
+                'progress': {'done': done, 'total': len(self.images), 'counts': counts},
+                'images': images,
+                'created_at': self.created_at,
+                'finished_at': self.finished_at
+            }
+
+
+class ImageBuilder:
+    def __init__(self, container_manager, parallelism: int = IMAGE_BUILD_PARALLELISM,
+                 dockerfiles_dir: str = DOCKERFILES_DIR):
+        """Initialize the builder; jobs run on daemon threads"""
+        self.container_manager = container_manager
+        self.parallelism = parallelism
+        self.dockerfiles_dir = dockerfiles_dir
+        self._jobs = {}
+        self._active = None
+        self._lock = threading.Lock()
+
+    def start(self, languages: Optional[List[str]] = None, force: bool = False,
+              pull: bool = False, variants: Optional[List[str]] = None) -> BuildJob:
+        """Start a background build job, or return the one already running"""
+        languages = languages or list(LANGUAGES)
+        unknown = [language for language in languages if language not in LANGUAGES]
+        if unknown:
+            raise ValueError(f"Unknown languages: {', '.join(unknown)}")
+        unknown = [variant for variant in variants or [] if variant not in IMAGE_VARIANTS]
+        if unknown:
+            raise ValueError(f"Unknown image variants: {', '.join(unknown)}")
+
+        with self._lock:
+            if self._active and self._active.status in ('queued', 'running'):
+                return self._active
+            job = BuildJob(languages, force, pull, variants)
+            self._jobs[job.id] = job
+            self._active = job
+
+        self._save(job)
+        threading.Thread(target=self.run, args=(job,), daemon=True).start()
+        logger.info(f"Started image build job {job.id} for {', '.join(languages)}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Status of a job from this process, or from the state another worker wrote"""
+        job = self._jobs.get(job_id)
+        if job:
+            return job.to_dict()
+        try:
+            with open(self._state_path(job_id)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def run(self, job: BuildJob) -> Dict[str, bool]:
+        """Build the job's images; returns {image key: success}"""
+        job.status = 'running'
+        self._save(job)
+
+        try:
+            self._pull_bases(job)
+
+            # Images sharing a base are built after the pull above, so they share its layers
+            with ThreadPoolExecutor(max_workers=max(1, self.parallelism)) as executor:
+                list(executor.map(lambda target: self._build(job, *target), job.targets))
+
+            job.status = 'failed' if any(
+                state['status'] == 'failed' for state in job.images.values()
+            ) else 'completed'
+        except Exception as e:
+            logger.error(f"Image build job {job.id} failed: {e}")
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            self._save(job)
+
+        logger.info(f"Image build job {job.id} {job.status}: {job.to_dict(0)['progress']['counts']}")
+        return {key: state['status'] in ('built', 'skipped') for key, state in job.images.items()}
+
+    def _pull_bases(self, job: BuildJob):
+        """Pull each distinct base image once, in parallel, before any build starts"""
+        bases = set()
+        for _, language, variant in job.targets:
+            path = os.path.join(self.dockerfiles_dir, LANGUAGES[language].dockerfile_for(variant))
+            if os.path.exists(path):
+                bases.update(base_images(path))
+
+        def pull(target):
+            client, image = target
+            try:
+                if not job.pull:
+                    try:
+                        client.images.get(image)
+                        return
+                    except Exception:
+                        pass
+                repository, _, tag = image.partition(':')
+                client.images.pull(repository, tag=tag or 'latest')
+                logger.info(f"Pulled base image {image}")
+            except Exception as e:
+                # The build pulls it itself (or fails with a clear error)
+                logger.warning(f"Failed to pull base image {image}: {e}")
+
+        # Every engine of a cluster needs its own copy
+        targets = [(manager.client, image) for manager in self.container_manager.managers for image in sorted(bases)]
+        with ThreadPoolExecutor(max_workers=max(1, self.parallelism)) as executor:
+            list(executor.map(pull, targets))
+
+    def _build(self, job: BuildJob, key: str, language: str, variant: str):
+        spec = LANGUAGES[language]
+        state = job.images[key]
+        dockerfile = spec.dockerfile_for(variant)
+        image = spec.image_for(variant)
+        path = os.path.join(self.dockerfiles_dir, dockerfile)
+
+        if not os.path.exists(path):
+            with job.lock:
+                state.update(status='failed', error=f'Dockerfile not found: {dockerfile}')
+            self._save(job)
+            return
+
+        digest = dockerfile_hash(path)
+        state['hash'] = digest
+
+        # Engines whose copy of the image is missing or older than the Dockerfile
+        managers = self.container_manager.managers
+        stale = [manager for manager in managers if job.force or self._built_hash(manager, image) != digest]
+        if not stale:
+            with job.lock:
+                state['status'] = 'skipped'
+            self._save(job)
+            logger.info(f"Image {image} is up to date")
+            return
+
+        with job.lock:
+            state['status'] = 'building'
+        self._save(job)
+        started = time.time()
+
+        try:
+            for manager in stale:
+                prefix = f'[{manager.host}] ' if len(managers) > 1 else ''
+                output = manager.client.api.build(
+                    path=self.dockerfiles_dir,
+                    dockerfile=dockerfile,
+                    tag=image,
+                    labels={DOCKERFILE_HASH_LABEL: digest},
+                    rm=True,
+                    decode=True
+                )
+                last_save = 0.0
+                for chunk in output:
+                    if 'error' in chunk:
+                        raise RuntimeError(f"{prefix}{chunk['error'].strip()}")
+                    line = (chunk.get('stream') or chunk.get('status') or '').rstrip()
+                    if line:
+                        with job.lock:
+                            job.logs[key].append(prefix + line)
+                        if time.time() - last_save > 1:
+                            self._save(job)
+                            last_save = time.time()
+                manager.invalidate_image_digest(image)
+
+            with job.lock:
+                state.update(status='built', duration=round(time.time() - started, 1))
+            logger.info(f"Built image {image}")
+
+        except Exception as e:
+            logger.error(f"Failed to build image {image}: {e}")
+            with job.lock:
+                state.update(status='failed', error=str(e), duration=round(time.time() - started, 1))
+        finally:
+            self._save(job)
+
+    def _built_hash(self, manager, image: str) -> Optional[str]:
+        try:
+            return manager.client.images.get(image).labels.get(DOCKERFILE_HASH_LABEL)
+        except Exception:
+            return None
+
+    def _state_path(self, job_id: str) -> str:
+        return os.path.join(IMAGE_BUILD_STATE_DIR, f'{job_id}.json')
+
+    def _save(self, job: BuildJob):
+        try:
+            os.makedirs(IMAGE_BUILD_STATE_DIR, exist_ok=True)
+            temp_path = f'{self._state_path(job.id)}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(job.to_dict(), f)
+            os.replace(temp_path, self._state_path(job.id))
+        except Exception as e:
+            logger.warning(f"Failed to save state of build job {job.id}: {e}")
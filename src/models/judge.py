@@ -0,0 +1,88 @@
+"""
+Judge Module
+Runs test cases against a compiled submission and assigns per-case verdicts
+"""
+
+import os
+import time
+import uuid
+import shlex
+import logging
+from typing import Dict, Optional
+from src.models.exec_limits import limit_command, termination_reason, kill_exec, EXIT_KILLED
+from src.models.languages import get_language
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_CASES = int(os.getenv('BATCH_MAX_CASES', '100'))
+BATCH_PARALLELISM = int(os.getenv('BATCH_PARALLELISM', '4'))
+
+# Per-case limits: CPU seconds and megabytes of address space
+BATCH_TIME_LIMIT = float(os.getenv('BATCH_TIME_LIMIT', '2'))
+BATCH_MAX_TIME_LIMIT = float(os.getenv('BATCH_MAX_TIME_LIMIT', '10'))
+BATCH_MEMORY_LIMIT = int(os.getenv('BATCH_MEMORY_LIMIT', '256'))
+BATCH_MAX_MEMORY_LIMIT = int(os.getenv('BATCH_MAX_MEMORY_LIMIT', '1024'))
+
+# Cases share the sandbox CPU, so the wall clock allowance is looser than the CPU limit
+WALL_TIME_FACTOR = 3
+
+# Output returned per case; comparison always uses the full output
+OUTPUT_PREVIEW_CHARS = int(os.getenv('BATCH_OUTPUT_PREVIEW_CHARS', '4096'))
+
+CASES_DIR = 'cases'
+
+
+def normalize_output(output: str) -> str:
+    """Ignore trailing whitespace on each line and trailing blank lines"""
+    return '\n'.join(line.rstrip() for line in output.replace('\r\n', '\n').split('\n')).rstrip('\n')
+
+
+def judge_verdict(exit_code: int, reason: Optional[str], stdout: str,
+                  expected: Optional[str], compare: str = 'trimmed') -> str:
+    """AC/WA when an expected output is given, OK when there is nothing to compare,
+    otherwise TLE, MLE or RE"""
+    if reason in ('timeout', 'cpu_limit'):
+        return 'TLE'
+    if exit_code == EXIT_KILLED:
+        return 'MLE'
+    if exit_code != 0:
+        return 'RE'
+    if expected is None:
+        return 'OK'
+    if compare == 'exact':
+        return 'AC' if stdout == expected else 'WA'
+    return 'AC' if normalize_output(stdout) == normalize_output(expected) else 'WA'
+
+
+def run_case(container_manager, container_id: str, language: str, index: int, case: Dict,
+             time_limit: float, memory_limit: int, compare: str = 'trimmed') -> Dict:
+    """Run one case whose input was uploaded to cases/<index>.in and judge it"""
+    spec = get_language(language)
+    script = f"exec {spec.run} < {shlex.quote(f'/workspace/{CASES_DIR}/{index}.in')}"
+    if spec.limit_memory:
+        script = f"ulimit -v {memory_limit * 1024}; {script}"
+
+    tag = uuid.uuid4().hex
+    wall_limit = time_limit * WALL_TIME_FACTOR + 1
+    command = limit_command(['sh', '-c', script], tag, wall_limit, time_limit)
+
+    start_time = time.time()
+    stdout, stderr, exit_code = container_manager.execute_command(container_id, command)
+    elapsed = time.time() - start_time
+
+    reason = termination_reason(exit_code, elapsed, wall_limit)
+    if reason:
+        kill_exec(container_manager, container_id, tag)
+
+    verdict = judge_verdict(exit_code, reason, stdout, case.get('expected_output'), compare)
+    return {
+        'index': index,
+        'verdict': verdict,
+        'exit_code': exit_code,
+        'time': round(elapsed, 3),
+        'stdout': stdout[:OUTPUT_PREVIEW_CHARS],
+        'stderr': stderr[:OUTPUT_PREVIEW_CHARS],
+        'truncated': len(stdout) > OUTPUT_PREVIEW_CHARS or len(stderr) > OUTPUT_PREVIEW_CHARS
+    }
@@ -0,0 +1,162 @@
+"""
+Language Registry Module
+Declares the toolchain of every supported language in one place
+"""
+
+import os
+import json
+import logging
+from typing import Dict, List, Optional
+from src.models.exec_limits import QUICK_TIME_LIMIT, QUICK_CPU_LIMIT
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Optional JSON file ({"name": {field: value}}) adding languages or overriding fields
+LANGUAGE_REGISTRY_FILE = os.getenv('LANGUAGE_REGISTRY_FILE', '')
+
+# Image tiers: 'minimal' holds only the toolchain, 'full' adds editors, build tools and
+# common packages. Projects pick one; quick runs, batches and the pool use the default
+IMAGE_VARIANTS = ['minimal', 'full']
+DEFAULT_IMAGE_VARIANT = os.getenv('DEFAULT_IMAGE_VARIANT', 'minimal')
+
+
+class Language:
+    """Toolchain of one language: image, files, commands, limits and pooling"""
+
+    def __init__(self, name: str, dockerfile: str, source: str, run: str,
+                 compile: Optional[str] = None, artifacts: Optional[List[str]] = None,
+                 github_names: Optional[List[str]] = None,
+                 time_limit: float = QUICK_TIME_LIMIT, cpu_limit: float = QUICK_CPU_LIMIT,
+                 memory_limit: str = '256m', cpu_share: str = '0.5', limit_memory: bool = True,
+                 cacheable: bool = True, pool_min: Optional[int] = None, pool_max: Optional[int] = None):
+        self.name = name
+        self.dockerfile = dockerfile
+        self.source = source
+        self.run = run
+        self.compile = compile
+        # Files produced by compilation that are enough to run the program
+        self.artifacts = artifacts or []
+        # GitHub language names mapped to this language when cloning
+        self.github_names = github_names or []
+        # Default limits of quick runs and resources of pooled sandboxes
+        self.time_limit = time_limit
+        self.cpu_limit = cpu_limit
+        self.memory_limit = memory_limit
+        self.cpu_share = cpu_share
+        # Off for runtimes that reserve large address spaces up front (JVM, V8, Go)
+        self.limit_memory = limit_memory
+        # Whether results of identical runs may be memoized
+        self.cacheable = cacheable
+        # Warm pool bounds; None falls back to the pool defaults
+        self.pool_min = pool_min
+        self.pool_max = pool_max
+
+    @property
+    def image(self) -> str:
+        return image_name(self.name, DEFAULT_IMAGE_VARIANT)
+
+    def image_for(self, variant: str) -> str:
+        return image_name(self.name, variant)
+
+    def dockerfile_for(self, variant: str) -> str:
+        """Dockerfile of a variant: Dockerfile.<lang> for minimal, Dockerfile.<lang>.<variant> otherwise"""
+        return self.dockerfile if variant == 'minimal' else f'{self.dockerfile}.{variant}'
+
+    @property
+    def compiled(self) -> bool:
+        return bool(self.compile)
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'image': self.image,
+            'images': {variant: self.image_for(variant) for variant in IMAGE_VARIANTS},
+            'source': self.source,
+            'compile': self.compile,
+            'run': self.run,
+            'time_limit': self.time_limit,
+            'cpu_limit': self.cpu_limit,
+            'memory_limit': self.memory_limit,
+            'cacheable': self.cacheable
+        }
+
+
+def image_name(language: str, variant: str = 'minimal') -> str:
+    """Tag of the sandbox image of a language; the minimal variant keeps the :latest tag"""
+    tag = 'latest' if variant == 'minimal' else variant
+    return f"compiler-server-{language}:{tag}"
+
+
+LANGUAGES = {language.name: language for language in [
+    Language('python', 'Dockerfile.python', 'main.py', 'python /workspace/main.py',
+             github_names=['Python']),
+    Language('nodejs', 'Dockerfile.nodejs', 'main.js', 'node /workspace/main.js',
+             github_names=['JavaScript', 'TypeScript'], limit_memory=False),
+    Language('java', 'Dockerfile.java', 'Main.java', 'java -cp /workspace Main',
+             compile='javac /workspace/Main.java', artifacts=['*.class'],
+             github_names=['Java'], limit_memory=False),
+    Language('cpp', 'Dockerfile.cpp', 'main.cpp', '/workspace/main',
+             compile='g++ -O2 -o /workspace/main /workspace/main.cpp', artifacts=['main'],
+             github_names=['C++', 'C']),
+    Language('go', 'Dockerfile.go', 'main.go', '/workspace/main',
+             compile='go build -o /workspace/main /workspace/main.go', artifacts=['main'],
+             github_names=['Go'], limit_memory=False),
+    Language('rust', 'Dockerfile.rust', 'main.rs', '/workspace/main',
+             compile='rustc -O -o /workspace/main /workspace/main.rs', artifacts=['main'],
+             github_names=['Rust']),
+    Language('php', 'Dockerfile.php', 'main.php', 'php /workspace/main.php',
+             github_names=['PHP'])
+]}
+
+
+def _load_overrides(path: str):
+    """Merge languages and fields from the registry file"""
+    try:
+        with open(path) as f:
+            entries = json.load(f)
+    except Exception as e:
+        logger.error(f"Failed to load language registry file {path}: {e}")
+        return
+
+    for name, fields in entries.items():
+        try:
+            if name in LANGUAGES:
+                for field, value in fields.items():
+                    if not hasattr(LANGUAGES[name], field) or callable(getattr(LANGUAGES[name], field)) \
+                            or field in ('image', 'compiled'):
+                        raise ValueError(f'unknown field {field}')
+                    setattr(LANGUAGES[name], field, value)
+            else:
+                LANGUAGES[name] = Language(name, **fields)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Ignoring invalid registry entry for {name}: {e}")
+
+
+if LANGUAGE_REGISTRY_FILE:
+    _load_overrides(LANGUAGE_REGISTRY_FILE)
+
+SUPPORTED_LANGUAGES = list(LANGUAGES)
+
+
+def get_language(name: str) -> Optional[Language]:
+    """Get the registry entry of a language"""
+    return LANGUAGES.get(name)
+
+
+def validate_variant(variant: Optional[str]) -> str:
+    """Check a requested image variant, falling back to the default"""
+    if variant is None:
+        return DEFAULT_IMAGE_VARIANT
+    if variant not in IMAGE_VARIANTS:
+        raise ValueError(f"Unknown image variant {variant}; expected one of {', '.join(IMAGE_VARIANTS)}")
+    return variant
+
+
+def detect_language(github_language: Optional[str], default: str = 'python') -> str:
+    """Map a GitHub language name to a supported language"""
+    for language in LANGUAGES.values():
+        if github_language in language.github_names:
+            return language.name
+    return default
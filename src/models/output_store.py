@@ -0,0 +1,163 @@
+"""
+Output Store Module
+Compressed, append-only log segments for execution output too large to keep in the database
+"""
+
+import os
+import re
+import zlib
+import shutil
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+OUTPUT_STORE_DIR = os.getenv(
+    'OUTPUT_STORE_DIR',
+    os.path.join(os.path.dirname(__file__), '..', 'database', 'outputs')
+)
+
+# Outputs up to this many bytes stay in the execution_results row (0 keeps everything inline)
+OUTPUT_INLINE_BYTES = int(os.getenv('OUTPUT_INLINE_BYTES', str(64 * 1024)))
+
+# Days spilled output is kept (0 keeps it forever)
+OUTPUT_RETENTION_DAYS = float(os.getenv('OUTPUT_RETENTION_DAYS', '30'))
+
+# zstd when the zstandard package is installed, else gzip
+OUTPUT_COMPRESSION = os.getenv('OUTPUT_COMPRESSION', 'zstd' if zstandard else 'gzip')
+OUTPUT_COMPRESSION_LEVEL = int(os.getenv('OUTPUT_COMPRESSION_LEVEL', '3'))
+
+# Compressed bytes read from a segment at a time
+READ_CHUNK_SIZE = 64 * 1024
+
+EXTENSIONS = {'zstd': '.log.zst', 'gzip': '.log.gz'}
+DAY_FORMAT = '%Y-%m-%d'
+
+
+class OutputStore:
+    def __init__(self, root: str = OUTPUT_STORE_DIR, inline_bytes: int = OUTPUT_INLINE_BYTES,
+                 compression: str = OUTPUT_COMPRESSION):
+        """Spilled outputs are appended as independent compressed frames to one segment
+        per day and process, root/<YYYY-MM-DD>/<host>-<pid>.log.{zst,gz}; a row references
+        its frame as "<segment>:<offset>:<length>", and a whole day is dropped at once
+        when it leaves the retention window"""
+        self.root = os.path.abspath(root)
+        self.inline_bytes = inline_bytes
+        if compression == 'zstd' and zstandard is None:
+            logger.warning("zstandard is not installed, compressing execution output with gzip")
+            compression = 'gzip'
+        if compression not in EXTENSIONS:
+            raise ValueError(f'Unknown output compression: {compression}')
+        self.compression = compression
+        self._lock = threading.Lock()
+        self.counters = {'spilled': 0, 'spilled_bytes': 0, 'stored_bytes': 0}
+
+    def should_spill(self, size: int) -> bool:
+        return 0 < self.inline_bytes < size
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor(level=OUTPUT_COMPRESSION_LEVEL).compress(data)
+        compressor = zlib.compressobj(OUTPUT_COMPRESSION_LEVEL, zlib.DEFLATED, 31)  # gzip member
+        return compressor.compress(data) + compressor.flush()
+
+    def write(self, data: bytes) -> str:
+        """Append one output as a compressed frame and return its reference"""
+        frame = self._compress(data)
+        segment = os.path.join(
+            datetime.utcnow().strftime(DAY_FORMAT),
+            f'{socket.gethostname()}-{os.getpid()}{EXTENSIONS[self.compression]}'
+        )
+        path = os.path.join(self.root, segment)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'ab') as f:
+                offset = f.tell()
+                f.write(frame)
+            self.counters['spilled'] += 1
+            self.counters['spilled_bytes'] += len(data)
+            self.counters['stored_bytes'] += len(frame)
+        return f'{segment}:{offset}:{len(frame)}'
+
+    def _locate(self, ref: str) -> Tuple[str, int, int]:
+        segment, offset, length = ref.rsplit(':', 2)
+        path = os.path.abspath(os.path.join(self.root, segment))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f'Invalid output reference: {ref}')
+        return path, int(offset), int(length)
+
+    def iter_bytes(self, ref: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+        """Decompress a spilled output chunk by chunk, without holding all of it in memory"""
+        path, offset, length = self._locate(ref)
+        if path.endswith(EXTENSIONS['zstd']):
+            if zstandard is None:
+                raise RuntimeError('zstandard is required to read zstd-compressed output')
+            decompressor = zstandard.ZstdDecompressor().decompressobj()
+        else:
+            decompressor = zlib.decompressobj(31)
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    raise OSError(f'Output segment {path} is truncated')
+                remaining -= len(chunk)
+                data = decompressor.decompress(chunk)
+                if data:
+                    yield data
+        if hasattr(decompressor, 'flush'):
+            data = decompressor.flush()
+            if data:
+                yield data
+
+    def read(self, ref: str) -> Optional[bytes]:
+        """A whole spilled output, or None when its segment is gone"""
+        try:
+            return b''.join(self.iter_bytes(ref))
+        except (OSError, ValueError, RuntimeError, zlib.error) as e:
+            logger.error(f"Failed to read spilled output {ref}: {e}")
+            return None
+
+    def prune(self, retention_days: float = OUTPUT_RETENTION_DAYS) -> Tuple[List[str], int]:
+        """Delete the day directories older than the retention window; returns (days, bytes)"""
+        if retention_days <= 0 or not os.path.isdir(self.root):
+            return [], 0
+        cutoff = (datetime.utcnow() - timedelta(days=retention_days)).strftime(DAY_FORMAT)
+        days, reclaimed = [], 0
+        for name in sorted(os.listdir(self.root)):
+            if not re.fullmatch(r'\d{4}-\d{2}-\d{2}', name) or name >= cutoff:
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+                shutil.rmtree(path)
+                days.append(name)
+                reclaimed += size
+            except OSError as e:
+                logger.error(f"Failed to prune output segments {path}: {e}")
+        return days, reclaimed
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            'root': self.root,
+            'inline_bytes': self.inline_bytes,
+            'compression': self.compression,
+            'retention_days': OUTPUT_RETENTION_DAYS,
+            'counters': counters
+        }
+
+
+output_store = OutputStore()
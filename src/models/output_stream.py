@@ -0,0 +1,132 @@
+"""
+Execution Output Streaming Module
+Bounded per-execution output buffers that feed Socket.IO rooms and HTTP streams
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Frames kept for late subscribers, and output kept for the database row
+STREAM_BUFFER_BYTES = int(os.getenv('STREAM_BUFFER_BYTES', str(1024 * 1024)))
+STORED_OUTPUT_BYTES = int(os.getenv('STORED_OUTPUT_BYTES', str(1024 * 1024)))
+BUFFER_LINGER = float(os.getenv('STREAM_BUFFER_LINGER', '60'))
+
+SOCKETIO_NAMESPACE = '/terminal'
+
+_socketio = None
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+
+def attach_socketio(socketio):
+    """Push output frames to Socket.IO rooms named execution:<id>"""
+    global _socketio
+    _socketio = socketio
+
+
+def execution_room(execution_id: str) -> str:
+    return f'execution:{execution_id}'
+
+
+class OutputBuffer:
+    """Ring buffer of output frames for one execution"""
+
+    def __init__(self, execution_id: str, max_bytes: int = STREAM_BUFFER_BYTES,
+                 max_stored: int = STORED_OUTPUT_BYTES):
+        self.execution_id = execution_id
+        self.max_bytes = max_bytes
+        self.max_stored = max_stored
+        self.frames = deque()
+        self.size = 0
+        self.next_seq = 0
+        self.closed = False
+        self.closed_at = None
+        self.exit_code = None
+        self._cond = threading.Condition()
+        self._stored = {'stdout': [], 'stderr': []}
+        self._stored_size = {'stdout': 0, 'stderr': 0}
+        self._omitted = {'stdout': 0, 'stderr': 0}
+
+    def append(self, stream: str, data: str):
+        """Add a frame, dropping the oldest frames when over the byte budget"""
+        with self._cond:
+            frame = {'seq': self.next_seq, 'stream': stream, 'data': data}
+            self.next_seq += 1
+            self.frames.append(frame)
+            self.size += len(data)
+            while self.size > self.max_bytes and len(self.frames) > 1:
+                self.size -= len(self.frames.popleft()['data'])
+            self._store(stream, data)
+            self._cond.notify_all()
+
+        if _socketio:
+            _socketio.emit('execution_output', dict(frame, execution_id=self.execution_id),
+                           namespace=SOCKETIO_NAMESPACE, room=execution_room(self.execution_id))
+
+    def _store(self, stream: str, data: str):
+        """Keep the head of each stream up to max_stored characters"""
+        room = self.max_stored - self._stored_size[stream]
+        if room > 0:
+            kept = data[:room]
+            self._stored[stream].append(kept)
+            self._stored_size[stream] += len(kept)
+            data = data[room:]
+        self._omitted[stream] += len(data)
+
+    def close(self, exit_code: int):
+        """Mark the execution finished and wake up readers"""
+        with self._cond:
+            self.closed = True
+            self.closed_at = time.time()
+            self.exit_code = exit_code
+            self._cond.notify_all()
+
+        if _socketio:
+            _socketio.emit('execution_finished',
+                           {'execution_id': self.execution_id, 'exit_code': exit_code},
+                           namespace=SOCKETIO_NAMESPACE, room=execution_room(self.execution_id))
+
+    def read(self, after_seq: int = -1, timeout: Optional[float] = None) -> Tuple[List[Dict], int, bool]:
+        """Get frames newer than after_seq, waiting up to timeout for new ones.
+        Returns (frames, dropped_frames, closed)"""
+        with self._cond:
+            if self.next_seq - 1 <= after_seq and not self.closed and timeout:
+                self._cond.wait(timeout)
+            frames = [frame for frame in self.frames if frame['seq'] > after_seq]
+            first_seq = self.frames[0]['seq'] if self.frames else self.next_seq
+            dropped = max(0, first_seq - after_seq - 1)
+            return frames, dropped, self.closed
+
+    def captured(self, stream: str) -> str:
+        """Get stored output for a stream, noting any truncation"""
+        with self._cond:
+            text = ''.join(self._stored[stream])
+            if self._omitted[stream]:
+                text += f'\n[output truncated: {self._omitted[stream]} characters omitted]\n'
+            return text
+
+
+def open_buffer(execution_id: str) -> OutputBuffer:
+    """Create the buffer for an execution, pruning expired ones"""
+    now = time.time()
+    with _buffers_lock:
+        for key in [key for key, buffer in _buffers.items()
+                    if buffer.closed and now - buffer.closed_at > BUFFER_LINGER]:
+            del _buffers[key]
+        buffer = OutputBuffer(execution_id)
+        _buffers[execution_id] = buffer
+        return buffer
+
+
+def get_buffer(execution_id: str) -> Optional[OutputBuffer]:
+    """Get the buffer for an execution running (or recently run) in this process"""
+    with _buffers_lock:
+        return _buffers.get(execution_id)
@@ -0,0 +1,67 @@
+"""
+Pagination Module
+Opaque cursors and keyset conditions for paging through large tables in constant time
+"""
+
+import json
+import base64
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import and_, or_
+
+# Page size when the client gives none, and the largest page served
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def parse_limit(value, default: int = DEFAULT_PAGE_SIZE, maximum: int = MAX_PAGE_SIZE) -> int:
+    """Page size from a query parameter, clamped to 1..maximum"""
+    if value in (None, ''):
+        return default
+    try:
+        return max(1, min(int(value), maximum))
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+
+
+def encode_cursor(values: List) -> str:
+    """Opaque cursor holding the sort key of the last row of a page"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, types: List[type]) -> List:
+    """Sort key values of a cursor, converted to the given types (ValueError when malformed)"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError
+        return [
+            datetime.fromisoformat(value) if kind is datetime and value is not None else kind(value)
+            for kind, value in zip(types, payload)
+        ]
+    except (ValueError, TypeError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+
+def parse_time(value: Optional[str], name: str) -> Optional[datetime]:
+    """ISO 8601 query parameter as a naive UTC datetime"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO 8601 timestamp')
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return parsed
+
+
+def after_cursor(columns, values):
+    """Rows after the cursor row in descending (columns...) order: the index range scan
+    continues where the previous page stopped, however deep the page is"""
+    conditions = []
+    for index, column in enumerate(columns):
+        equal = [columns[prior] == values[prior] for prior in range(index)]
+        conditions.append(and_(*equal, column < values[index]))
+    return or_(*conditions)
@@ -4,14 +4,50 @@ Handles project data and database operations
 """
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import deferred, load_only
 from datetime import datetime
+from src.models.file_store import blob_store
+from src.models.output_store import output_store, OUTPUT_RETENTION_DAYS
+from src.models.pagination import after_cursor
+import os
 import uuid
 import json
+import logging
 
 db = SQLAlchemy()
 
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bytes of stdout and stderr kept inline as a preview for execution history
+OUTPUT_PREVIEW_BYTES = int(os.getenv('OUTPUT_PREVIEW_BYTES', '4096'))
+
+
+def output_preview(data):
+    """(preview, size in bytes) of an output: its first OUTPUT_PREVIEW_BYTES as text"""
+    if data is None:
+        return None, 0
+    encoded = data.encode('utf-8', errors='replace')
+    return encoded[:OUTPUT_PREVIEW_BYTES].decode('utf-8', errors='ignore'), len(encoded)
+
+
 class Project(db.Model):
     __tablename__ = 'projects'
+    # Listing is newest-updated first, for everyone or for one user (keyset pagination)
+    __table_args__ = (
+        db.Index('ix_projects_updated_at', 'updated_at', 'id'),
+        db.Index('ix_projects_user_updated_at', 'user_id', 'updated_at', 'id'),
+    )
+    
+    # Keys of to_dict, in order; each is a column of the same name
+    FIELDS = (
+        'id', 'name', 'description', 'language', 'framework', 'github_url', 'github_branch',
+        'container_id', 'container_status', 'file_count', 'files_size', 'main_file',
+        'cpu_limit', 'memory_limit', 'image_variant', 'docker_host', 'created_at', 'updated_at',
+        'last_executed', 'last_activity_at', 'user_id'
+    )
+    FIELD_DEFAULTS = {'file_count': 0, 'files_size': 0, 'image_variant': 'minimal'}
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name = db.Column(db.String(255), nullable=False)
@@ -27,18 +63,31 @@ class Project(db.Model):
     container_id = db.Column(db.String(100))
     container_status = db.Column(db.String(50), default='stopped')
     
-    # Project files and structure
-    files = db.Column(db.Text)  # JSON string of file structure
+    # Project files and structure (contents live in the blob store, see ProjectFile)
+    files = deferred(db.Column(db.Text))  # Legacy JSON file structure, migrated on access
+    file_count = db.Column(db.Integer, default=0)
+    files_size = db.Column(db.Integer, default=0)  # in bytes
     main_file = db.Column(db.String(255))  # Entry point file
     
+    # Files last synced into the container workspace (path -> sha256 JSON)
+    workspace_manifest = deferred(db.Column(db.Text))
+    workspace_container_id = db.Column(db.String(100))
+    
     # Resource limits
     cpu_limit = db.Column(db.String(10), default='1')
     memory_limit = db.Column(db.String(10), default='512m')
     
+    # Sandbox image tier: 'minimal' (toolchain only) or 'full' (tools and common packages)
+    image_variant = db.Column(db.String(20), default='minimal')
+    
+    # Docker engine the container was placed on (set when DOCKER_HOSTS lists several)
+    docker_host = db.Column(db.String(100))
+    
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_executed = db.Column(db.DateTime)
+    last_activity_at = db.Column(db.DateTime)  # Executions and terminal use; drives pause/stop
     
     # User association (for future multi-user support)
     user_id = db.Column(db.String(36), db.ForeignKey('users.id'))
@@ -51,48 +100,119 @@ class Project(db.Model):
         self.framework = framework
         self.github_url = github_url
         self.user_id = user_id
-        self.files = json.dumps({})  # Initialize empty file structure
+        self.file_count = 0
+        self.files_size = 0
     
-    def to_dict(self):
-        """Convert project to dictionary"""
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'language': self.language,
-            'framework': self.framework,
-            'github_url': self.github_url,
-            'github_branch': self.github_branch,
-            'container_id': self.container_id,
-            'container_status': self.container_status,
-            'files': json.loads(self.files) if self.files else {},
-            'main_file': self.main_file,
-            'cpu_limit': self.cpu_limit,
-            'memory_limit': self.memory_limit,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-            'last_executed': self.last_executed.isoformat() if self.last_executed else None,
-            'user_id': self.user_id
-        }
+    def to_dict(self, include_files=False, fields=None):
+        """Convert project to dictionary (file metadata only on request, never contents).
+        fields limits it to some of FIELDS, so only those columns need to be loaded"""
+        project_dict = {}
+        for name in fields or Project.FIELDS:
+            value = getattr(self, name)
+            if value is None:
+                value = Project.FIELD_DEFAULTS.get(name)
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            project_dict[name] = value
+        if include_files:
+            project_dict['files'] = self.get_file_manifest()
+        return project_dict
     
     def update_files(self, files_dict):
-        """Update project files structure"""
-        self.files = json.dumps(files_dict)
-        self.updated_at = datetime.utcnow()
+        """Replace project files; contents go to the blob store, metadata to ProjectFile rows"""
+        entries = {}
+        for path, content in files_dict.items():
+            data = content if isinstance(content, bytes) else str(content).encode('utf-8')
+            entries[path] = (blob_store.put(data), len(data))
+        self.set_file_entries(entries)
+    
+    def set_file_entries(self, entries):
+        """Replace the file manifest with {path: (sha256, size)} of blobs already stored"""
+        if not self.id:
+            self.id = str(uuid.uuid4())
+        existing = {entry.path: entry for entry in ProjectFile.query.filter_by(project_id=self.id).all()}
+        released = getattr(self, '_released_blobs', set())
+        now = datetime.utcnow()
+        
+        for path, (sha256, size) in entries.items():
+            entry = existing.pop(path, None)
+            if entry is None:
+                db.session.add(ProjectFile(self.id, path, sha256, size))
+            elif entry.sha256 != sha256:
+                released.add(entry.sha256)
+                entry.sha256 = sha256
+                entry.size = size
+                entry.updated_at = now
+        
+        for entry in existing.values():
+            released.add(entry.sha256)
+            db.session.delete(entry)
+        
+        self._released_blobs = released
+        self.files = None
+        self.file_count = len(entries)
+        self.files_size = sum(size for _, size in entries.values())
+        self.updated_at = now
+    
+    def _migrate_legacy_files(self):
+        """Move files stored in the legacy JSON column into the blob store"""
+        if self.files:
+            legacy = json.loads(self.files)
+            if legacy:
+                self.update_files(legacy)
+                self.save()
+                return
+            self.files = None
+    
+    def get_file_manifest(self):
+        """Get file metadata (path, size, hash) without reading contents"""
+        self._migrate_legacy_files()
+        entries = ProjectFile.query.filter_by(project_id=self.id).order_by(ProjectFile.path).all()
+        return [entry.to_dict() for entry in entries]
+    
+    def get_file_content(self, path):
+        """Get the raw bytes of one file, or None if it doesn't exist"""
+        self._migrate_legacy_files()
+        entry = ProjectFile.query.filter_by(project_id=self.id, path=path).first()
+        return blob_store.get(entry.sha256) if entry else None
     
     def get_files(self):
-        """Get project files as dictionary"""
-        return json.loads(self.files) if self.files else {}
+        """Get project files as dictionary of path to text content"""
+        self._migrate_legacy_files()
+        files = {}
+        for entry in ProjectFile.query.filter_by(project_id=self.id).all():
+            data = blob_store.get(entry.sha256)
+            if data is not None:
+                files[entry.path] = data.decode('utf-8', errors='replace')
+        return files
+    
+    def get_file_hashes(self):
+        """Get a path to SHA-256 mapping of project files"""
+        self._migrate_legacy_files()
+        return {entry.path: entry.sha256 for entry in ProjectFile.query.filter_by(project_id=self.id).all()}
+    
+    def get_workspace_manifest(self):
+        """Get hashes of files last synced into the current container"""
+        if not self.workspace_manifest or self.workspace_container_id != self.container_id:
+            return {}
+        return json.loads(self.workspace_manifest)
+    
+    def set_workspace_manifest(self, container_id, manifest):
+        """Record which file versions are present in a container workspace"""
+        self.workspace_container_id = container_id
+        self.workspace_manifest = json.dumps(manifest)
     
-    def set_container(self, container_id, status='created'):
+    def set_container(self, container_id, status='created', docker_host=None):
         """Set container information"""
         self.container_id = container_id
         self.container_status = status
+        self.docker_host = docker_host
         self.updated_at = datetime.utcnow()
     
     def update_execution_time(self):
         """Update last execution timestamp"""
         self.last_executed = datetime.utcnow()
+        self.last_activity_at = self.last_executed
         self.updated_at = datetime.utcnow()
     
     @staticmethod
@@ -110,32 +230,132 @@ class Project(db.Model):
         """Get all projects"""
         return Project.query.all()
     
+    @staticmethod
+    def filtered(user_id=None, language=None, statuses=None, updated_after=None, updated_before=None):
+        """Query of the projects matching the listing filters"""
+        query = Project.query
+        if user_id:
+            query = query.filter(Project.user_id == user_id)
+        if language:
+            query = query.filter(Project.language == language)
+        if statuses:
+            query = query.filter(Project.container_status.in_(statuses))
+        if updated_after:
+            query = query.filter(Project.updated_at > updated_after)
+        if updated_before:
+            query = query.filter(Project.updated_at < updated_before)
+        return query
+    
+    @staticmethod
+    def page(query, limit, cursor=None, fields=None):
+        """One page of a filtered query, most recently updated first. cursor is the
+        (updated_at, id) of the previous page's last row; returns (projects, next cursor)"""
+        if cursor:
+            query = query.filter(after_cursor([Project.updated_at, Project.id], cursor))
+        if fields:
+            # The sort key is always loaded, the cursor is built from it
+            columns = set(fields) | {'id', 'updated_at'}
+            query = query.options(load_only(*[getattr(Project, name) for name in columns]))
+        projects = query.order_by(Project.updated_at.desc(), Project.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(projects) > limit:
+            projects = projects[:limit]
+            next_cursor = [projects[-1].updated_at, projects[-1].id]
+        return projects, next_cursor
+    
     def save(self):
         """Save project to database"""
         db.session.add(self)
         db.session.commit()
+        ProjectFile.release_blobs(getattr(self, '_released_blobs', set()))
+        self._released_blobs = set()
     
     def delete(self):
-        """Delete project from database"""
+        """Delete project and its file manifest from database"""
+        entries = ProjectFile.query.filter_by(project_id=self.id).all()
+        for entry in entries:
+            db.session.delete(entry)
         db.session.delete(self)
         db.session.commit()
+        ProjectFile.release_blobs({entry.sha256 for entry in entries})
+
+
+class ProjectFile(db.Model):
+    __tablename__ = 'project_files'
+    __table_args__ = (db.UniqueConstraint('project_id', 'path', name='uq_project_files_path'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.String(36), db.ForeignKey('projects.id'), nullable=False, index=True)
+    path = db.Column(db.String(1024), nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    size = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __init__(self, project_id, path, sha256, size):
+        self.project_id = project_id
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+    
+    def to_dict(self):
+        """Convert file metadata to dictionary"""
+        return {
+            'path': self.path,
+            'size': self.size,
+            'sha256': self.sha256,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+    
+    @staticmethod
+    def release_blobs(hashes):
+        """Delete blobs no longer referenced by any project (deduplicated across projects)"""
+        for sha256 in hashes:
+            if not ProjectFile.query.filter_by(sha256=sha256).first():
+                blob_store.delete(sha256)
 
 
 class ExecutionResult(db.Model):
     __tablename__ = 'execution_results'
+    # Execution history is listed per project, newest first (keyset pagination)
+    __table_args__ = (
+        db.Index('ix_execution_results_project_started_at', 'project_id', 'started_at', 'id'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     project_id = db.Column(db.String(36), db.ForeignKey('projects.id'), nullable=False)
     
     # Execution details
     command = db.Column(db.Text, nullable=False)
-    stdout = db.Column(db.Text)
-    stderr = db.Column(db.Text)
     exit_code = db.Column(db.Integer)
     execution_time = db.Column(db.Float)  # in seconds
     
+    # Output: full text loaded only when asked for, previews and sizes for listings.
+    # Large outputs are spilled to the output store and referenced instead of stored
+    stdout = deferred(db.Column(db.Text))
+    stderr = deferred(db.Column(db.Text))
+    stdout_ref = db.Column(db.String(255))
+    stderr_ref = db.Column(db.String(255))
+    stdout_preview = db.Column(db.Text)
+    stderr_preview = db.Column(db.Text)
+    stdout_bytes = db.Column(db.Integer, default=0)
+    stderr_bytes = db.Column(db.Integer, default=0)
+    
     # Status
-    status = db.Column(db.String(50), default='pending')  # pending, running, completed, failed
+    status = db.Column(db.String(50), default='pending')  # pending, running, completed, failed, stopped
+    
+    # Queue information
+    user_id = db.Column(db.String(36))
+    working_dir = db.Column(db.String(500), default='/workspace')
+    priority = db.Column(db.Integer, default=0)  # higher runs first
+    worker_id = db.Column(db.String(100))  # host:pid:thread that claimed the job
+    attempts = db.Column(db.Integer, default=0)
+    heartbeat_at = db.Column(db.DateTime)
+    
+    # Resource limits (seconds) and how the execution ended when they were hit
+    time_limit = db.Column(db.Float)
+    cpu_time_limit = db.Column(db.Float)
+    termination_reason = db.Column(db.String(50))  # timeout, cpu_limit, stopped
+    reclaimed = db.Column(db.Text)  # JSON: processes killed and their CPU seconds
     
     # Timestamps
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -144,40 +364,113 @@ class ExecutionResult(db.Model):
     # Relationship
     project = db.relationship('Project', backref=db.backref('executions', lazy=True))
     
-    def __init__(self, project_id, command):
+    def __init__(self, project_id, command, user_id=None, working_dir='/workspace', priority=0,
+                 time_limit=None, cpu_time_limit=None):
         self.project_id = project_id
         self.command = command
+        self.user_id = user_id
+        self.working_dir = working_dir
+        self.priority = priority
+        self.time_limit = time_limit
+        self.cpu_time_limit = cpu_time_limit
+        self.attempts = 0
     
-    def to_dict(self):
-        """Convert execution result to dictionary"""
+    def to_dict(self, full_output=True):
+        """Convert execution result to dictionary; without full_output, stdout and stderr
+        are the stored previews (output_truncated tells whether more is available)"""
+        if full_output:
+            stdout, stderr = self.read_output('stdout'), self.read_output('stderr')
+        else:
+            stdout, stderr = self.stdout_preview, self.stderr_preview
         return {
             'id': self.id,
             'project_id': self.project_id,
             'command': self.command,
-            'stdout': self.stdout,
-            'stderr': self.stderr,
+            'stdout': stdout,
+            'stderr': stderr,
+            'stdout_bytes': self.stdout_bytes or 0,
+            'stderr_bytes': self.stderr_bytes or 0,
+            'output_truncated': self.output_truncated,
             'exit_code': self.exit_code,
             'execution_time': self.execution_time,
             'status': self.status,
+            'priority': self.priority,
+            'attempts': self.attempts,
+            'time_limit': self.time_limit,
+            'cpu_time_limit': self.cpu_time_limit,
+            'termination_reason': self.termination_reason,
+            'reclaimed': json.loads(self.reclaimed) if self.reclaimed else None,
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
     
+    @property
+    def output_truncated(self):
+        """Whether the previews hold less than the full output"""
+        return max(self.stdout_bytes or 0, self.stderr_bytes or 0) > OUTPUT_PREVIEW_BYTES
+    
+    def set_output(self, stdout=None, stderr=None):
+        """Store output along with its preview and size (None leaves a stream unchanged);
+        outputs over OUTPUT_INLINE_BYTES go to the output store"""
+        for stream, data in (('stdout', stdout), ('stderr', stderr)):
+            if data is None:
+                continue
+            preview, size = output_preview(data)
+            setattr(self, f'{stream}_preview', preview)
+            setattr(self, f'{stream}_bytes', size)
+            setattr(self, stream, data)
+            setattr(self, f'{stream}_ref', None)
+            if output_store.should_spill(size):
+                try:
+                    setattr(self, f'{stream}_ref', output_store.write(data.encode('utf-8', errors='replace')))
+                    setattr(self, stream, None)
+                except OSError as e:
+                    logger.error(f"Failed to spill {stream} of execution {self.id}, keeping it inline: {e}")
+    
+    def read_output(self, stream):
+        """Full stdout or stderr: inline, from the output store, or only the preview once
+        the spilled copy was pruned"""
+        ref = getattr(self, f'{stream}_ref')
+        data = output_store.read(ref) if ref else None
+        if data is not None:
+            return data.decode('utf-8', errors='replace')
+        inline = getattr(self, stream)
+        return inline if inline is not None else getattr(self, f'{stream}_preview')
+    
+    def iter_output(self, stream):
+        """Full stdout or stderr as UTF-8 byte chunks, decompressed as they are read"""
+        ref = getattr(self, f'{stream}_ref')
+        if ref:
+            return output_store.iter_bytes(ref)
+        return iter([(getattr(self, stream) or '').encode('utf-8', errors='replace')])
+    
     def set_result(self, stdout, stderr, exit_code, execution_time):
         """Set execution result"""
-        self.stdout = stdout
-        self.stderr = stderr
+        self.set_output(stdout, stderr)
         self.exit_code = exit_code
         self.execution_time = execution_time
         self.completed_at = datetime.utcnow()
         self.status = 'completed' if exit_code == 0 else 'failed'
     
+    def set_termination(self, reason, reclaimed=None):
+        """Record why the execution was cut off and what killing it reclaimed"""
+        self.termination_reason = reason
+        if reclaimed is not None:
+            self.reclaimed = json.dumps(reclaimed)
+    
     def set_status(self, status):
         """Update execution status"""
         self.status = status
-        if status == 'completed' or status == 'failed':
+        if status in ('completed', 'failed', 'stopped'):
             self.completed_at = datetime.utcnow()
     
+    def requeue(self):
+        """Put a claimed execution back in the queue without counting the attempt"""
+        self.status = 'pending'
+        self.worker_id = None
+        self.heartbeat_at = None
+        self.attempts = max((self.attempts or 1) - 1, 0)
+    
     def save(self):
         """Save execution result to database"""
         db.session.add(self)
@@ -188,10 +481,48 @@ class ExecutionResult(db.Model):
         """Get execution result by ID"""
         return ExecutionResult.query.filter_by(id=execution_id).first()
     
+    @staticmethod
+    def get_running():
+        """Get all executions currently claimed by a worker"""
+        return ExecutionResult.query.filter_by(status='running')\
+                                  .order_by(ExecutionResult.started_at.asc()).all()
+    
+    @staticmethod
+    def count_pending():
+        """Count executions waiting in the queue"""
+        return ExecutionResult.query.filter_by(status='pending').count()
+    
+    @staticmethod
+    def prune_spilled_output(retention_days=OUTPUT_RETENTION_DAYS):
+        """Drop spilled output past its retention; rows keep their previews. Returns (days, bytes)"""
+        days, reclaimed = output_store.prune(retention_days)
+        for day in days:
+            for stream in ('stdout', 'stderr'):
+                ref = getattr(ExecutionResult, f'{stream}_ref')
+                ExecutionResult.query.filter(ref.like(f'{day}/%'))\
+                               .update({ref: None}, synchronize_session=False)
+        if days:
+            db.session.commit()
+        return days, reclaimed
+    
     @staticmethod
     def get_by_project(project_id, limit=10):
         """Get execution results for a project"""
-        return ExecutionResult.query.filter_by(project_id=project_id)\
-                                  .order_by(ExecutionResult.started_at.desc())\
-                                  .limit(limit).all()
+        return ExecutionResult.page(project_id, limit)[0]
+    
+    @staticmethod
+    def page(project_id, limit, cursor=None):
+        """One page of a project's executions, newest first, without the full output.
+        cursor is the (started_at, id) of the previous page's last row; returns
+        (executions, next cursor)"""
+        query = ExecutionResult.query.filter_by(project_id=project_id)
+        if cursor:
+            query = query.filter(after_cursor([ExecutionResult.started_at, ExecutionResult.id], cursor))
+        executions = query.order_by(ExecutionResult.started_at.desc(), ExecutionResult.id.desc())\
+                          .limit(limit + 1).all()
+        next_cursor = None
+        if len(executions) > limit:
+            executions = executions[:limit]
+            next_cursor = [executions[-1].started_at, executions[-1].id]
+        return executions, next_cursor
 
@@ -0,0 +1,58 @@
+"""
+Repository Fetcher Module
+Downloads a GitHub repository as a single tarball and streams its files
+"""
+
+import os
+import tarfile
+import logging
+import requests
+from typing import Iterator, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Point at a stand-in server (src/utils/github_stub_server.py) to work offline
+GITHUB_API_URL = os.getenv('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+
+ARCHIVE_TIMEOUT = int(os.getenv('GITHUB_ARCHIVE_TIMEOUT', '120'))
+MAX_FILE_BYTES = int(os.getenv('GITHUB_MAX_FILE_BYTES', str(10 * 1024 * 1024)))
+
+
+class RefNotFoundError(Exception):
+    """Raised when the requested branch, tag or commit does not exist"""
+
+
+def iter_repository_files(owner: str, repo: str, ref: str,
+                          token: Optional[str] = None) -> Iterator[Tuple[str, bytes]]:
+    """Yield (path, content) for every regular file of the repository at ref.
+    The archive is streamed, so only one file is held in memory at a time"""
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/tarball/{ref}"
+    headers = {'Accept': 'application/vnd.github+json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+
+    with requests.get(url, headers=headers, stream=True, timeout=ARCHIVE_TIMEOUT) as response:
+        if response.status_code == 404:
+            raise RefNotFoundError(f'{owner}/{repo}@{ref} not found')
+        response.raise_for_status()
+
+        with tarfile.open(fileobj=response.raw, mode='r|gz') as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+
+                # Strip the "<owner>-<repo>-<sha>/" directory GitHub adds
+                parts = member.name.split('/', 1)
+                if len(parts) < 2 or not parts[1]:
+                    continue
+                path = parts[1]
+
+                if member.size > MAX_FILE_BYTES:
+                    logger.warning(f"Skipped large file: {path} ({member.size} bytes)")
+                    continue
+
+                yield path, archive.extractfile(member).read()
+
+    logger.info(f"Downloaded archive of {owner}/{repo}@{ref}")
@@ -0,0 +1,157 @@
+"""
+Result Cache Module
+Memoizes quick execution results in an in-process LRU backed by a shared SQLite file
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Opt-in: results are only memoized when enabled for the deployment
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'false').lower() == 'true'
+RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', '3600'))
+RESULT_CACHE_MEMORY_ENTRIES = int(os.getenv('RESULT_CACHE_MEMORY_ENTRIES', '512'))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '10000'))
+RESULT_CACHE_MAX_RESULT_BYTES = int(os.getenv('RESULT_CACHE_MAX_RESULT_BYTES', str(256 * 1024)))
+RESULT_CACHE_PATH = os.getenv('RESULT_CACHE_PATH', '/tmp/compiler-result-cache.sqlite3')
+
+# Shared-tier eviction runs once per this many writes
+EVICT_EVERY = 100
+
+
+class ResultCache:
+    def __init__(self, path: str = RESULT_CACHE_PATH, ttl: float = RESULT_CACHE_TTL,
+                 memory_entries: int = RESULT_CACHE_MEMORY_ENTRIES,
+                 max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        """Initialize both tiers; the SQLite file is shared by all worker processes"""
+        self.path = path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self.stats_counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0}
+
+    @staticmethod
+    def make_key(language: str, code: str, stdin: str, image_digest: str) -> str:
+        material = json.dumps({
+            'language': language,
+            'code': code,
+            'stdin': stdin or '',
+            'image': image_digest
+        }, sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread and process"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_results_last_used ON results (last_used)')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _remember(self, key: str, result: Dict, expires_at: float):
+        """Insert into the in-process LRU; caller holds the lock"""
+        self._memory[key] = (expires_at, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Get a stored result from memory, then from the shared tier"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.stats_counters['memory_hits'] += 1
+                    return entry[1]
+                del self._memory[key]
+
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                'SELECT value, expires_at FROM results WHERE key = ? AND expires_at > ?', (key, now)
+            ).fetchone()
+            if row:
+                connection.execute('UPDATE results SET last_used = ? WHERE key = ?', (now, key))
+                result = json.loads(row[0])
+                with self._lock:
+                    self._remember(key, result, row[1])
+                    self.stats_counters['disk_hits'] += 1
+                return result
+        except Exception as e:
+            logger.error(f"Failed to read result cache: {e}")
+
+        with self._lock:
+            self.stats_counters['misses'] += 1
+        return None
+
+    def put(self, key: str, result: Dict):
+        """Store a result in both tiers unless it is too large"""
+        value = json.dumps(result)
+        if len(value) > RESULT_CACHE_MAX_RESULT_BYTES:
+            return
+
+        now = time.time()
+        expires_at = now + self.ttl
+
+        with self._lock:
+            self._remember(key, result, expires_at)
+            self.stats_counters['stores'] += 1
+            self._writes += 1
+            evict = self._writes % EVICT_EVERY == 0
+
+        try:
+            connection = self._connection()
+            connection.execute(
+                'INSERT OR REPLACE INTO results (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)',
+                (key, value, expires_at, now)
+            )
+            if evict:
+                self._evict(connection, now)
+        except Exception as e:
+            logger.error(f"Failed to write result cache: {e}")
+
+    def _evict(self, connection: sqlite3.Connection, now: float):
+        """Drop expired rows and least recently used rows over max_entries"""
+        connection.execute('DELETE FROM results WHERE expires_at <= ?', (now,))
+        connection.execute("""
+            DELETE FROM results WHERE key IN (
+                SELECT key FROM results ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats_counters)
+            stats['memory_entries'] = len(self._memory)
+        stats['enabled'] = RESULT_CACHE_ENABLED
+        stats['ttl'] = self.ttl
+        return stats
@@ -0,0 +1,178 @@
+"""
+Workspace Sync Module
+Incremental file sync between projects and container workspaces using tar archives
+"""
+
+import io
+import os
+import time
+import tarfile
+import tempfile
+import posixpath
+import logging
+from typing import Dict, Iterable, Optional, Union
+from src.models.file_store import blob_store, hash_content
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WORKSPACE_DIR = '/workspace'
+
+# Owner of uploaded files (the coderunner user created in dockerfiles/)
+WORKSPACE_UID = int(os.getenv('WORKSPACE_UID', '1000'))
+WORKSPACE_GID = int(os.getenv('WORKSPACE_GID', '1000'))
+
+# Largest workspace archive accepted when pulling files back
+PULL_MAX_BYTES = int(os.getenv('WORKSPACE_PULL_MAX_BYTES', str(100 * 1024 * 1024)))
+
+# Paths per rm invocation, keeps argv well under the kernel limit
+REMOVE_BATCH_SIZE = 500
+
+
+def normalize_path(path: str) -> Optional[str]:
+    """Make a file path relative to the workspace, rejecting escapes"""
+    normalized = posixpath.normpath(path.replace('\\', '/')).lstrip('/')
+    if not normalized or normalized == '.' or normalized.startswith('..'):
+        return None
+    return normalized
+
+
+def build_archive(files: Dict[str, Union[bytes, str]]) -> bytes:
+    """Build an in-memory tar archive of files"""
+    buffer = io.BytesIO()
+    now = time.time()
+
+    with tarfile.open(fileobj=buffer, mode='w') as archive:
+        for path, content in files.items():
+            name = normalize_path(path)
+            if not name:
+                logger.warning(f"Skipping unsafe workspace path: {path}")
+                continue
+            data = content if isinstance(content, bytes) else content.encode('utf-8')
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o644
+            info.mtime = now
+            info.uid = WORKSPACE_UID
+            info.gid = WORKSPACE_GID
+            archive.addfile(info, io.BytesIO(data))
+
+    return buffer.getvalue()
+
+
+class WorkspaceSync:
+    def __init__(self, container_manager):
+        """Initialize with the container manager used for archive transfers"""
+        self.container_manager = container_manager
+
+    def apply(self, container_id: str, files: Dict[str, Union[bytes, str]],
+              removed: Iterable[str] = (), dest: str = WORKSPACE_DIR) -> Dict:
+        """Upload files in a single archive and delete removed paths"""
+        stats = {'uploaded': 0, 'removed': 0, 'bytes': 0, 'api_calls': 0}
+
+        for path in [path for path in files if not normalize_path(path)]:
+            logger.warning(f"Skipping unsafe workspace path: {path}")
+            files = {name: data for name, data in files.items() if name != path}
+
+        if files:
+            archive = build_archive(files)
+            if not self.container_manager.put_archive(container_id, dest, archive):
+                raise RuntimeError(f'Failed to upload workspace archive to {container_id}')
+            stats['uploaded'] = len(files)
+            stats['bytes'] = len(archive)
+            stats['api_calls'] += 1
+
+        paths = [posixpath.join(dest, name) for name in map(normalize_path, removed) if name]
+        for start in range(0, len(paths), REMOVE_BATCH_SIZE):
+            batch = paths[start:start + REMOVE_BATCH_SIZE]
+            self.container_manager.execute_command(container_id, ['rm', '-f', '--'] + batch)
+            stats['removed'] += len(batch)
+            stats['api_calls'] += 1
+
+        return stats
+
+    def push(self, container_id: str, files: Dict[str, Union[bytes, str]],
+             previous: Optional[Dict[str, str]] = None, dest: str = WORKSPACE_DIR) -> Dict:
+        """Send only files whose hash differs from the previous manifest.
+        Returns the stats plus the new manifest under 'manifest'"""
+        previous = previous or {}
+        manifest = {}
+        changed = {}
+
+        for path, content in files.items():
+            data = content if isinstance(content, bytes) else content.encode('utf-8')
+            manifest[path] = hash_content(data)
+            if previous.get(path) != manifest[path]:
+                changed[path] = data
+
+        removed = [path for path in previous if path not in manifest]
+        stats = self.apply(container_id, changed, removed, dest)
+        stats['unchanged'] = len(files) - len(changed)
+        stats['manifest'] = manifest
+        return stats
+
+    def pull(self, container_id: str, src: str = WORKSPACE_DIR) -> Dict[str, bytes]:
+        """Download regular files under src with one get_archive call"""
+        files = {}
+
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+            size = 0
+            for chunk in self.container_manager.get_archive(container_id, src):
+                size += len(chunk)
+                if size > PULL_MAX_BYTES:
+                    raise RuntimeError(f'Workspace archive exceeds {PULL_MAX_BYTES} bytes')
+                spool.write(chunk)
+            spool.seek(0)
+
+            with tarfile.open(fileobj=spool, mode='r|') as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    # Entries are prefixed with the basename of src
+                    parts = member.name.split('/', 1)
+                    name = normalize_path(parts[1]) if len(parts) > 1 else None
+                    if name:
+                        files[name] = archive.extractfile(member).read()
+
+        return files
+
+
+def sync_project_workspace(project, workspace_sync: WorkspaceSync, full: bool = False) -> Dict:
+    """Push changed project files into the project container.
+    Unchanged files cost no Docker round trips; the synced manifest is saved on the project"""
+    if not project.container_id:
+        return {'uploaded': 0, 'removed': 0, 'bytes': 0, 'api_calls': 0, 'unchanged': 0}
+
+    manifest = project.get_file_hashes()
+    previous = {} if full else project.get_workspace_manifest()
+
+    changed = {}
+    for path, sha256 in manifest.items():
+        if previous.get(path) != sha256:
+            data = blob_store.get(sha256)
+            if data is not None:
+                changed[path] = data
+
+    removed = [path for path in previous if path not in manifest]
+    stats = workspace_sync.apply(project.container_id, changed, removed)
+    stats['unchanged'] = len(manifest) - len(changed)
+
+    project.set_workspace_manifest(project.container_id, manifest)
+    project.save()
+
+    logger.info(f"Synced workspace for project {project.id}: {stats}")
+    return stats
+
+
+def pull_project_workspace(project, workspace_sync: WorkspaceSync) -> Dict:
+    """Copy the container workspace back into the project file store"""
+    files = workspace_sync.pull(project.container_id)
+    project.update_files(files)
+    project.set_workspace_manifest(project.container_id, {
+        path: hash_content(data) for path, data in files.items()
+    })
+    project.save()
+
+    logger.info(f"Pulled {len(files)} files from workspace of project {project.id}")
+    return {'downloaded': len(files), 'bytes': sum(len(data) for data in files.values()), 'api_calls': 1}
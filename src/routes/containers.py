@@ -5,7 +5,13 @@ Handles container operations
 
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models.container_manager import ContainerManager
+from src.models.container_manager import get_container_manager
+from src.models.admission import AdmissionRejected
+from src.models.image_builder import ImageBuilder
+from src.models.container_lifecycle import container_lifecycle
+from src.models.container_state import container_state
+from src.models.container_reaper import container_reaper
+from src.models.languages import validate_variant
 from src.models.project import Project
 import logging
 
@@ -16,8 +22,11 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 containers_bp = Blueprint('containers', __name__)
 
-# Initialize container manager
-container_manager = ContainerManager()
+# Shared, lazily-connected container manager
+container_manager = get_container_manager()
+
+# Background image builds (one job at a time per process)
+image_builder = ImageBuilder(container_manager)
 
 @containers_bp.route('/containers', methods=['POST'])
 @jwt_required(optional=True)
@@ -35,29 +44,44 @@ def create_container():
         cpu_limit = data.get('cpu_limit', '1')
         memory_limit = data.get('memory_limit', '512m')
         
+        # Image variant: explicit, else the project's, else the default
+        project = Project.get_by_id(project_id) if project_id else None
+        try:
+            variant = validate_variant(data.get('image_variant') or (project.image_variant if project else None))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Limits larger than the whole node could never be admitted
+        try:
+            container_manager.admission.check_request(cpu_limit, memory_limit)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Create container
         container_id, success = container_manager.create_container(
             language=language,
             project_id=project_id,
             cpu_limit=cpu_limit,
-            memory_limit=memory_limit
+            memory_limit=memory_limit,
+            variant=variant,
+            host=project.docker_host if project else None
         )
         
         if not success or not container_id:
             return jsonify({'error': 'Failed to create container'}), 500
         
         # Update project if project_id provided
-        if project_id:
-            project = Project.get_by_id(project_id)
-            if project:
-                project.set_container(container_id, 'created')
-                project.save()
+        if project:
+            project.set_container(container_id, 'created', container_manager.host_of(container_id))
+            project.image_variant = variant
+            project.save()
         
         logger.info(f"Created container {container_id} for language {language}")
         return jsonify({
             'container_id': container_id,
             'language': language,
             'status': 'created',
+            'image_variant': variant,
             'project_id': project_id
         }), 201
         
@@ -84,9 +108,9 @@ def get_container_status(container_id):
 @containers_bp.route('/containers/<container_id>/start', methods=['POST'])
 @jwt_required(optional=True)
 def start_container(container_id):
-    """Start a container"""
+    """Start a container (or unpause it)"""
     try:
-        success = container_manager.start_container(container_id)
+        success = container_lifecycle.resume_container(container_id)
         
         if not success:
             return jsonify({'error': 'Failed to start container'}), 500
@@ -100,6 +124,8 @@ def start_container(container_id):
         logger.info(f"Started container {container_id}")
         return jsonify({'message': 'Container started successfully'}), 200
         
+    except AdmissionRejected as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         logger.error(f"Error starting container {container_id}: {e}")
         return jsonify({'error': str(e)}), 500
@@ -206,27 +232,45 @@ def execute_in_container(container_id):
 @containers_bp.route('/containers/cleanup', methods=['POST'])
 @jwt_required(optional=True)
 def cleanup_containers():
-    """Clean up old containers"""
+    """Reap orphaned containers, workspaces and volumes"""
     try:
         max_age_hours = request.args.get('max_age_hours', 24, type=int)
-        cleaned_count = container_manager.cleanup_old_containers(max_age_hours)
+        report = container_reaper.reap(max_age_hours)
+        cleaned_count = report['containers_removed']
+        
+        if report.get('skipped'):
+            return jsonify({'message': 'Another cleanup is running', 'cleaned_count': 0}), 409
         
         logger.info(f"Cleaned up {cleaned_count} old containers")
         return jsonify({
             'message': f'Cleaned up {cleaned_count} old containers',
-            'cleaned_count': cleaned_count
+            'cleaned_count': cleaned_count,
+            'report': report
         }), 200
         
     except Exception as e:
         logger.error(f"Error cleaning up containers: {e}")
         return jsonify({'error': str(e)}), 500
 
+@containers_bp.route('/containers/cleanup', methods=['GET'])
+@jwt_required(optional=True)
+def get_cleanup_stats():
+    """Get reaper totals and the last report of this process"""
+    try:
+        return jsonify(container_reaper.stats()), 200
+        
+    except Exception as e:
+        logger.error(f"Error getting cleanup stats: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @containers_bp.route('/containers/system-info', methods=['GET'])
 @jwt_required(optional=True)
 def get_system_info():
     """Get Docker system information"""
     try:
         system_info = container_manager.get_system_info()
+        system_info['state_cache'] = container_state.stats()
+        system_info['admission'] = container_manager.admission.stats()
         
         return jsonify(system_info), 200
         
@@ -234,25 +278,63 @@ def get_system_info():
         logger.error(f"Error getting system info: {e}")
         return jsonify({'error': str(e)}), 500
 
+@containers_bp.route('/containers/lifecycle', methods=['GET'])
+@jwt_required(optional=True)
+def get_lifecycle_stats():
+    """Get idle pause/stop settings and counters of this process"""
+    try:
+        return jsonify(container_lifecycle.stats()), 200
+        
+    except Exception as e:
+        logger.error(f"Error getting lifecycle stats: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @containers_bp.route('/containers/build-images', methods=['POST'])
 @jwt_required(optional=True)
 def build_images():
-    """Build all language-specific Docker images"""
+    """Start building language-specific Docker images in the background"""
     try:
-        results = container_manager.build_images()
-        
-        success_count = sum(1 for success in results.values() if success)
-        total_count = len(results)
+        data = request.get_json(silent=True) or {}
+        
+        try:
+            job = image_builder.start(
+                languages=data.get('languages'),
+                force=bool(data.get('force', False)),
+                pull=bool(data.get('pull', False)),
+                variants=data.get('variants')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        logger.info(f"Built {success_count}/{total_count} Docker images")
         return jsonify({
-            'message': f'Built {success_count}/{total_count} Docker images',
-            'results': results,
-            'success_count': success_count,
-            'total_count': total_count
-        }), 200
+            'message': 'Image build started',
+            'job_id': job.id,
+            'status_url': f'/api/containers/build-images/{job.id}',
+            'job': job.to_dict(log_lines=0)
+        }), 202
         
     except Exception as e:
         logger.error(f"Error building images: {e}")
         return jsonify({'error': str(e)}), 500
 
+@containers_bp.route('/containers/build-images/<job_id>', methods=['GET'])
+@jwt_required(optional=True)
+def get_build_status(job_id):
+    """Get progress and build log tail of an image build job"""
+    try:
+        job = image_builder.get(job_id)
+        
+        if not job:
+            return jsonify({'error': 'Build job not found'}), 404
+        
+        # Trim the log tail to what the caller asked for
+        log_lines = request.args.get('log_lines', 20, type=int)
+        for image in job['images'].values():
+            image['log'] = image.get('log', [])[-log_lines:] if log_lines > 0 else []
+        
+        return jsonify(job), 200
+        
+    except Exception as e:
+        logger.error(f"Error getting build job {job_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
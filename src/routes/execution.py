@@ -3,12 +3,33 @@ Code Execution API Routes
 Handles code execution in containers
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.project import Project, ExecutionResult, db
-from src.models.container_manager import ContainerManager
+from src.models.container_manager import get_container_manager
+from src.models.container_lifecycle import container_lifecycle
+from src.models.container_pool import ContainerPool
+from src.models.admission import AdmissionRejected
+from src.models.languages import LANGUAGES, get_language
+from src.models.execution_queue import ExecutionQueue, QueueFullError
+from src.models.output_stream import open_buffer, get_buffer
+from src.models.output_store import output_store
+from src.models.workspace_sync import WorkspaceSync, sync_project_workspace
+from src.models.compile_cache import CompileCache, collect_artifacts
+from src.models.result_cache import ResultCache, RESULT_CACHE_ENABLED
+from src.models.workspace_sync import build_archive
+from src.models.judge import (
+    CASES_DIR, run_case, BATCH_MAX_CASES, BATCH_PARALLELISM,
+    BATCH_TIME_LIMIT, BATCH_MAX_TIME_LIMIT, BATCH_MEMORY_LIMIT, BATCH_MAX_MEMORY_LIMIT
+)
+from src.models.exec_limits import (
+    limit_command, termination_reason, kill_exec, clamp_limit,
+    EXECUTION_TIME_LIMIT, EXECUTION_CPU_LIMIT, EXECUTION_MAX_TIME_LIMIT, EXECUTION_MAX_CPU_LIMIT
+)
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
 import time
-import threading
+import uuid
 import logging
 
 # Configure logging
@@ -18,60 +39,135 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 execution_bp = Blueprint('execution', __name__)
 
-# Initialize container manager
-container_manager = ContainerManager()
+# Shared, lazily-connected container manager
+container_manager = get_container_manager()
+workspace_sync = WorkspaceSync(container_manager)
 
-# Store running executions
-running_executions = {}
+# Warm sandboxes for quick executions
+container_pool = ContainerPool(container_manager)
 
-def execute_code_async(execution_id, project_id, command, working_dir="/workspace"):
-    """Execute code asynchronously"""
+# Build artifacts of compiled languages, shared by all workers on the host
+compile_cache = CompileCache()
+
+# Memoized quick execution results (opt-in with RESULT_CACHE_ENABLED)
+result_cache = ResultCache()
+
+# Workspace file quick executions read their standard input from
+STDIN_FILE = '.stdin'
+
+# Keepalive interval for streaming clients and DB poll interval for remote executions
+STREAM_KEEPALIVE = 15
+STREAM_POLL_INTERVAL = 1
+
+def execute_code_async(execution_id):
+    """Run a queued execution (called by an execution queue worker)"""
     try:
         execution = ExecutionResult.get_by_id(execution_id)
-        project = Project.get_by_id(project_id)
+        project = Project.get_by_id(execution.project_id) if execution else None
         
         if not execution or not project:
-            logger.error(f"Execution {execution_id} or project {project_id} not found")
+            logger.error(f"Execution {execution_id} or its project not found")
             return
         
-        # Update status to running
-        execution.set_status('running')
-        execution.save()
-        
-        # Start container if not running
+        # Resume the container if it was paused or stopped and upload files changed since the last run
         if project.container_id:
-            container_manager.start_container(project.container_id)
-        
-        # Execute command
+            try:
+                container_lifecycle.ensure_running(project)
+            except AdmissionRejected as e:
+                # Node full: back to the queue, the next claim waits for capacity again
+                logger.info(f"Requeued execution {execution_id}: {e}")
+                execution.requeue()
+                execution.save()
+                return
+            sync_project_workspace(project, workspace_sync)
+        
+        # Run under wall-clock and CPU limits; the process group ID is recorded for kill_exec
+        time_limit = execution.time_limit or EXECUTION_TIME_LIMIT
+        cpu_limit = execution.cpu_time_limit or EXECUTION_CPU_LIMIT
+        command = limit_command(execution.command, execution_id, time_limit, cpu_limit)
+        
+        # Stream output into a bounded buffer as it is produced
+        buffer = open_buffer(execution_id)
+        exit_code = 1
         start_time = time.time()
-        stdout, stderr, exit_code = container_manager.execute_command(
-            project.container_id, command, working_dir
-        )
+        for stream, data in container_manager.stream_command(
+            project.container_id, command, execution.working_dir or '/workspace'
+        ):
+            if stream == 'exit':
+                exit_code = data
+            else:
+                buffer.append(stream, data)
         execution_time = time.time() - start_time
         
+        # Kill whatever the command left behind (background jobs, timed out children)
+        reason = termination_reason(exit_code, execution_time, time_limit)
+        reclaimed = kill_exec(container_manager, project.container_id, execution_id)
+        if reason == 'timeout':
+            buffer.append('stderr', f"\nExecution exceeded its time limit of {time_limit:g} seconds\n")
+        elif reason == 'cpu_limit':
+            buffer.append('stderr', f"\nExecution exceeded its CPU time limit of {cpu_limit:g} seconds\n")
+        buffer.close(exit_code)
+        stdout, stderr = buffer.captured('stdout'), buffer.captured('stderr')
+        
+        # Don't overwrite an execution stopped while it was running
+        db.session.refresh(execution)
+        if execution.status == 'stopped':
+            logger.info(f"Execution {execution_id} was stopped before completion")
+            return
+        
         # Update execution result
         execution.set_result(stdout, stderr, exit_code, execution_time)
+        if reason or reclaimed['processes']:
+            execution.set_termination(reason, reclaimed)
         execution.save()
         
         # Update project execution time
         project.update_execution_time()
         project.save()
         
-        # Remove from running executions
-        if execution_id in running_executions:
-            del running_executions[execution_id]
-        
-        logger.info(f"Completed execution {execution_id} for project {project_id}")
+        logger.info(f"Completed execution {execution_id} for project {project.id}")
         
     except Exception as e:
         logger.error(f"Error in async execution {execution_id}: {e}")
-        if execution_id in running_executions:
-            del running_executions[execution_id]
+        db.session.rollback()
+        execution = ExecutionResult.get_by_id(execution_id)
+        if execution and execution.status == 'running':
+            execution.set_output(stderr=str(e))
+            execution.set_status('failed')
+            execution.save()
+
+# Bounded, database-backed worker pool (bound to the app in src/main.py)
+execution_queue = ExecutionQueue(runner=execute_code_async)
+
+def compile_with_cache(container_id, language, compile_command, code):
+    """Compile in the sandbox, or restore cached artifacts and skip compilation.
+    Returns (stdout, stderr, exit_code, cache_hit)"""
+    key = None
+    spec = get_language(language)
+    image_digest = container_manager.get_image_digest(spec.image) if spec.artifacts else None
+    
+    if image_digest:
+        key = compile_cache.make_key(language, image_digest, compile_command, code)
+        artifact = compile_cache.get(key)
+        if artifact and container_manager.put_archive(container_id, '/workspace', artifact):
+            return '', '', 0, True
+    
+    stdout, stderr, exit_code = container_manager.execute_command(container_id, compile_command)
+    
+    if exit_code == 0 and key:
+        try:
+            artifact = collect_artifacts(container_manager, container_id, spec.artifacts)
+            if artifact:
+                compile_cache.put(key, artifact)
+        except Exception as e:
+            logger.warning(f"Failed to cache {language} build artifacts: {e}")
+    
+    return stdout, stderr, exit_code, False
 
 @execution_bp.route('/execute', methods=['POST'])
 @jwt_required(optional=True)
 def execute_code():
-    """Execute code in a project container"""
+    """Queue code execution in a project container"""
     try:
         data = request.get_json()
         
@@ -83,6 +179,17 @@ def execute_code():
         command = data['command']
         working_dir = data.get('working_dir', '/workspace')
         
+        try:
+            priority = int(data.get('priority', 0))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'priority must be an integer'}), 400
+        
+        try:
+            time_limit = clamp_limit(data.get('time_limit'), EXECUTION_TIME_LIMIT, EXECUTION_MAX_TIME_LIMIT)
+            cpu_time_limit = clamp_limit(data.get('cpu_time_limit'), EXECUTION_CPU_LIMIT, EXECUTION_MAX_CPU_LIMIT)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'time_limit and cpu_time_limit must be positive numbers of seconds'}), 400
+        
         # Get project
         project = Project.get_by_id(project_id)
         if not project:
@@ -92,30 +199,25 @@ def execute_code():
         if not project.container_id:
             return jsonify({'error': 'Project container not found'}), 400
         
-        # Create execution record
-        execution = ExecutionResult(project_id=project_id, command=command)
-        execution.save()
-        
-        # Add to running executions
-        running_executions[execution.id] = {
-            'project_id': project_id,
-            'command': command,
-            'started_at': time.time()
-        }
-        
-        # Start async execution
-        thread = threading.Thread(
-            target=execute_code_async,
-            args=(execution.id, project_id, command, working_dir)
-        )
-        thread.daemon = True
-        thread.start()
-        
-        logger.info(f"Started execution {execution.id} for project {project_id}")
+        # Create a pending execution record for the worker pool
+        try:
+            execution = execution_queue.enqueue(
+                project_id=project_id,
+                command=command,
+                user_id=get_jwt_identity(),
+                working_dir=working_dir,
+                priority=priority,
+                time_limit=time_limit,
+                cpu_time_limit=cpu_time_limit
+            )
+        except QueueFullError as e:
+            return jsonify({'error': str(e)}), 429
+        
+        logger.info(f"Queued execution {execution.id} for project {project_id}")
         return jsonify({
             'execution_id': execution.id,
-            'status': 'started',
-            'message': 'Code execution started'
+            'status': 'queued',
+            'message': 'Code execution queued'
         }), 202
         
     except Exception as e:
@@ -138,6 +240,99 @@ def get_execution_output(execution_id):
         logger.error(f"Error getting execution output {execution_id}: {e}")
         return jsonify({'error': str(e)}), 500
 
+@execution_bp.route('/execute/<execution_id>/output/<stream>', methods=['GET'])
+@jwt_required(optional=True)
+def get_execution_stream_output(execution_id, stream):
+    """Get the full stdout or stderr of an execution as text (supports Range requests)"""
+    try:
+        if stream not in ('stdout', 'stderr'):
+            return jsonify({'error': 'Stream must be stdout or stderr'}), 400
+        
+        execution = ExecutionResult.get_by_id(execution_id)
+        
+        if not execution:
+            return jsonify({'error': 'Execution not found'}), 404
+        
+        # Spilled output is decompressed as it is sent; Range requests skip the unwanted head
+        length = getattr(execution, f'{stream}_bytes') or 0
+        if getattr(execution, f'{stream}_ref'):
+            response = Response(execution.iter_output(stream), mimetype='text/plain', direct_passthrough=True)
+        else:
+            data = (execution.read_output(stream) or '').encode('utf-8', errors='replace')
+            response = Response(data, mimetype='text/plain')
+            length = len(data)
+        
+        # Finished output never changes, so clients may cache it and resume partial reads
+        if execution.status not in ('pending', 'running'):
+            response.set_etag(f'{execution.id}-{stream}-{length}')
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        response.content_length = length
+        return response.make_conditional(request, accept_ranges=True, complete_length=length)
+        
+    except Exception as e:
+        logger.error(f"Error getting {stream} of execution {execution_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@execution_bp.route('/execute/<execution_id>/stream', methods=['GET'])
+@jwt_required(optional=True)
+def stream_execution_output(execution_id):
+    """Stream execution output as newline-delimited JSON frames"""
+    try:
+        if not ExecutionResult.get_by_id(execution_id):
+            return jsonify({'error': 'Execution not found'}), 404
+        
+        after_seq = request.args.get('after', -1, type=int)
+        
+        def generate():
+            seq = after_seq
+            while True:
+                buffer = get_buffer(execution_id)
+                
+                # Running in this process: stream frames as they arrive
+                if buffer:
+                    frames, dropped, closed = buffer.read(seq, timeout=STREAM_KEEPALIVE)
+                    if dropped:
+                        yield json.dumps({'event': 'truncated', 'dropped_frames': dropped}) + '\n'
+                    for frame in frames:
+                        yield json.dumps(frame) + '\n'
+                        seq = frame['seq']
+                    if closed and not frames:
+                        yield json.dumps({'event': 'exit', 'exit_code': buffer.exit_code}) + '\n'
+                        return
+                    if not frames:
+                        yield json.dumps({'event': 'keepalive'}) + '\n'
+                    continue
+                
+                # Queued or running elsewhere: wait for the stored result
+                db.session.expire_all()
+                execution = ExecutionResult.get_by_id(execution_id)
+                if not execution or execution.status not in ('pending', 'running'):
+                    if execution:
+                        for stream in ('stdout', 'stderr'):
+                            data = execution.read_output(stream)
+                            if data:
+                                yield json.dumps({'stream': stream, 'data': data}) + '\n'
+                    yield json.dumps({
+                        'event': 'exit',
+                        'exit_code': execution.exit_code if execution else None,
+                        'status': execution.status if execution else 'missing'
+                    }) + '\n'
+                    return
+                
+                yield json.dumps({'event': 'keepalive', 'status': execution.status}) + '\n'
+                time.sleep(STREAM_POLL_INTERVAL)
+        
+        return Response(
+            stream_with_context(generate()),
+            mimetype='application/x-ndjson',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+        
+    except Exception as e:
+        logger.error(f"Error streaming execution output {execution_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @execution_bp.route('/execute/<execution_id>/stop', methods=['POST'])
 @jwt_required(optional=True)
 def stop_execution(execution_id):
@@ -151,16 +346,25 @@ def stop_execution(execution_id):
         if execution.status not in ['pending', 'running']:
             return jsonify({'error': 'Execution is not running'}), 400
         
-        # Remove from running executions
-        if execution_id in running_executions:
-            del running_executions[execution_id]
+        was_running = execution.status == 'running'
         
-        # Update execution status
+        # Update execution status (stopped executions are never claimed)
         execution.set_status('stopped')
         execution.save()
         
+        # Kill the process tree in the container; the worker then sees the stopped status
+        reclaimed = None
+        project = Project.get_by_id(execution.project_id)
+        if was_running and project and project.container_id:
+            reclaimed = kill_exec(container_manager, project.container_id, execution_id)
+        execution.set_termination('stopped', reclaimed)
+        execution.save()
+        
         logger.info(f"Stopped execution {execution_id}")
-        return jsonify({'message': 'Execution stopped successfully'}), 200
+        return jsonify({
+            'message': 'Execution stopped successfully',
+            'reclaimed': reclaimed
+        }), 200
         
     except Exception as e:
         logger.error(f"Error stopping execution {execution_id}: {e}")
@@ -171,9 +375,20 @@ def stop_execution(execution_id):
 def get_running_executions():
     """Get all currently running executions"""
     try:
+        running_executions = {
+            execution.id: {
+                'project_id': execution.project_id,
+                'command': execution.command,
+                'started_at': execution.started_at.isoformat() if execution.started_at else None,
+                'worker_id': execution.worker_id
+            }
+            for execution in ExecutionResult.get_running()
+        }
+        
         return jsonify({
             'running_executions': running_executions,
-            'count': len(running_executions)
+            'count': len(running_executions),
+            'queue': execution_queue.stats()
         }), 200
         
     except Exception as e:
@@ -183,7 +398,7 @@ def get_running_executions():
 @execution_bp.route('/execute/quick', methods=['POST'])
 @jwt_required(optional=True)
 def quick_execute():
-    """Quick code execution without project (temporary container)"""
+    """Quick code execution without project (leased warm container)"""
     try:
         data = request.get_json()
         
@@ -193,133 +408,250 @@ def quick_execute():
         
         language = data['language']
         code = data['code']
+        stdin = data.get('stdin') or ''
+        
+        spec = get_language(language)
+        if not spec:
+            return jsonify({'error': f'Language {language} not supported'}), 400
+        
+        if not isinstance(code, str) or not isinstance(stdin, str):
+            return jsonify({'error': 'code and stdin must be strings'}), 400
+        
+        # Serve byte-identical reruns from the result cache
+        cache_key = None
+        if RESULT_CACHE_ENABLED and spec.cacheable and not data.get('no_cache'):
+            image_digest = container_manager.get_image_digest(spec.image)
+            if image_digest:
+                cache_key = result_cache.make_key(language, code, stdin, image_digest)
+                cached = result_cache.get(cache_key)
+                if cached:
+                    return jsonify(dict(cached, cached=True)), 200
+        
+        # Lease a warm sandbox container
+        try:
+            lease = container_pool.lease(language)
+        except AdmissionRejected as e:
+            return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
         
-        # Create temporary container
-        container_id, success = container_manager.create_container(
-            language=language,
-            project_id=f"temp-{int(time.time())}",
-            cpu_limit="0.5",
-            memory_limit="256m"
-        )
-        
-        if not success or not container_id:
+        if not lease:
             return jsonify({'error': 'Failed to create container'}), 500
         
+        container_id = lease.container_id
+        reusable = False
+        compile_cached = None
+        run_tag = uuid.uuid4().hex
+        
         try:
-            # Start container
-            container_manager.start_container(container_id)
+            # Source and stdin reach the sandbox in one archive upload, with no shell quoting
+            files = {spec.source: code, STDIN_FILE: stdin}
+            if not container_manager.put_archive(container_id, '/workspace', build_archive(files)):
+                return jsonify({'error': 'Failed to upload source'}), 500
             
-            # Write code to file and execute based on language
-            if language == 'python':
-                # Write Python code to file
-                write_cmd = f'echo "{code}" > /workspace/main.py'
-                container_manager.execute_command(container_id, write_cmd)
-                
-                # Execute Python code
-                stdout, stderr, exit_code = container_manager.execute_command(
-                    container_id, 'python /workspace/main.py'
+            # Compile (or restore cached artifacts) for compiled languages
+            compile_exit = 0
+            if spec.compile:
+                compile_stdout, compile_stderr, compile_exit, compile_cached = compile_with_cache(
+                    container_id, language, spec.compile, code
                 )
             
-            elif language == 'nodejs':
-                # Write Node.js code to file
-                write_cmd = f'echo "{code}" > /workspace/main.js'
-                container_manager.execute_command(container_id, write_cmd)
-                
-                # Execute Node.js code
+            run_started = time.time()
+            if compile_exit == 0:
+                run_script = f"exec {spec.run} < /workspace/{STDIN_FILE}"
                 stdout, stderr, exit_code = container_manager.execute_command(
-                    container_id, 'node /workspace/main.js'
-                )
-            
-            elif language == 'java':
-                # Write Java code to file (assuming class name is Main)
-                write_cmd = f'echo "{code}" > /workspace/Main.java'
-                container_manager.execute_command(container_id, write_cmd)
-                
-                # Compile and execute Java code
-                compile_stdout, compile_stderr, compile_exit = container_manager.execute_command(
-                    container_id, 'javac /workspace/Main.java'
+                    container_id, limit_command(['sh', '-c', run_script], run_tag, spec.time_limit, spec.cpu_limit)
                 )
-                
-                if compile_exit == 0:
-                    stdout, stderr, exit_code = container_manager.execute_command(
-                        container_id, 'java -cp /workspace Main'
-                    )
-                else:
-                    stdout, stderr, exit_code = compile_stdout, compile_stderr, compile_exit
-            
-            elif language == 'cpp':
-                # Write C++ code to file
-                write_cmd = f'echo "{code}" > /workspace/main.cpp'
-                container_manager.execute_command(container_id, write_cmd)
-                
-                # Compile and execute C++ code
-                compile_stdout, compile_stderr, compile_exit = container_manager.execute_command(
-                    container_id, 'g++ -o /workspace/main /workspace/main.cpp'
-                )
-                
-                if compile_exit == 0:
-                    stdout, stderr, exit_code = container_manager.execute_command(
-                        container_id, '/workspace/main'
-                    )
-                else:
-                    stdout, stderr, exit_code = compile_stdout, compile_stderr, compile_exit
-            
-            elif language == 'go':
-                # Write Go code to file
-                write_cmd = f'echo "{code}" > /workspace/main.go'
-                container_manager.execute_command(container_id, write_cmd)
-                
-                # Execute Go code
-                stdout, stderr, exit_code = container_manager.execute_command(
-                    container_id, 'go run /workspace/main.go'
-                )
-            
-            elif language == 'rust':
-                # Write Rust code to file
-                write_cmd = f'echo "{code}" > /workspace/main.rs'
-                container_manager.execute_command(container_id, write_cmd)
-                
-                # Compile and execute Rust code
-                compile_stdout, compile_stderr, compile_exit = container_manager.execute_command(
-                    container_id, 'rustc -o /workspace/main /workspace/main.rs'
-                )
-                
-                if compile_exit == 0:
-                    stdout, stderr, exit_code = container_manager.execute_command(
-                        container_id, '/workspace/main'
-                    )
-                else:
-                    stdout, stderr, exit_code = compile_stdout, compile_stderr, compile_exit
-            
-            elif language == 'php':
-                # Write PHP code to file
-                write_cmd = f'echo "{code}" > /workspace/main.php'
-                container_manager.execute_command(container_id, write_cmd)
-                
-                # Execute PHP code
-                stdout, stderr, exit_code = container_manager.execute_command(
-                    container_id, 'php /workspace/main.php'
-                )
-            
             else:
-                return jsonify({'error': f'Language {language} not supported'}), 400
+                stdout, stderr, exit_code = compile_stdout, compile_stderr, compile_exit
             
             result = {
                 'stdout': stdout,
                 'stderr': stderr,
                 'exit_code': exit_code,
-                'language': language
+                'language': language,
+                'pooled': not lease.overflow
             }
+            if compile_cached is not None:
+                result['compile_cached'] = compile_cached
+            
+            reason = termination_reason(exit_code, time.time() - run_started, spec.time_limit)
+            if reason:
+                result['termination_reason'] = reason
+                result['reclaimed'] = kill_exec(container_manager, container_id, run_tag)
+            
+            # Only successful runs are memoized; failures may be transient
+            if cache_key and exit_code == 0:
+                result_cache.put(cache_key, {
+                    'stdout': stdout,
+                    'stderr': stderr,
+                    'exit_code': exit_code,
+                    'language': language
+                })
+            result['cached'] = False
             
+            reusable = True
             logger.info(f"Quick execution completed for language {language}")
             return jsonify(result), 200
             
         finally:
-            # Clean up temporary container
-            container_manager.stop_container(container_id)
-            container_manager.remove_container(container_id)
+            # Return the sandbox to the pool (reset or recycled in the background)
+            container_pool.release(lease, reusable=reusable)
         
     except Exception as e:
         logger.error(f"Error in quick execution: {e}")
         return jsonify({'error': str(e)}), 500
 
+
+def judge_submission(language, code, cases, time_limit, memory_limit, compare):
+    """Compile once in a leased sandbox, then run the cases in parallel.
+    Yields a compile event, one event per case as it finishes, then a summary"""
+    spec = get_language(language)
+    started = time.time()
+    try:
+        lease = container_pool.lease(language)
+    except AdmissionRejected as e:
+        yield {'type': 'error', 'error': str(e)}
+        return
+    if not lease:
+        yield {'type': 'error', 'error': 'Failed to create container'}
+        return
+    
+    reusable = False
+    executor = None
+    try:
+        container_id = lease.container_id
+        
+        # Source and every case input in a single upload
+        files = {spec.source: code}
+        for index, case in enumerate(cases):
+            files[f'{CASES_DIR}/{index}.in'] = case.get('stdin') or ''
+        if not container_manager.put_archive(container_id, '/workspace', build_archive(files)):
+            yield {'type': 'error', 'error': 'Failed to upload submission'}
+            return
+        
+        compile_event = {'type': 'compile', 'status': 'skipped', 'cached': False}
+        if spec.compile:
+            stdout, stderr, exit_code, cached = compile_with_cache(container_id, language, spec.compile, code)
+            compile_event.update({
+                'status': 'ok' if exit_code == 0 else 'error',
+                'cached': cached,
+                'stdout': stdout,
+                'stderr': stderr
+            })
+        yield compile_event
+        
+        verdicts = {}
+        if compile_event['status'] == 'error':
+            for index in range(len(cases)):
+                verdicts[index] = 'CE'
+                yield {'type': 'case', 'index': index, 'verdict': 'CE'}
+        else:
+            executor = ThreadPoolExecutor(max_workers=min(BATCH_PARALLELISM, len(cases)))
+            futures = [
+                executor.submit(run_case, container_manager, container_id, language, index, case,
+                                time_limit, memory_limit, compare)
+                for index, case in enumerate(cases)
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                verdicts[result['index']] = result['verdict']
+                yield dict(result, type='case')
+        
+        ordered = [verdicts[index] for index in range(len(cases))]
+        counts = {}
+        for verdict in ordered:
+            counts[verdict] = counts.get(verdict, 0) + 1
+        
+        reusable = True
+        yield {
+            'type': 'summary',
+            'verdict': next((v for v in ordered if v not in ('AC', 'OK')), ordered[0] if ordered else 'OK'),
+            'verdicts': ordered,
+            'counts': counts,
+            'pooled': not lease.overflow,
+            'total_time': round(time.time() - started, 3)
+        }
+        logger.info(f"Batch execution of {len(cases)} {language} cases finished: {counts}")
+        
+    finally:
+        if executor:
+            executor.shutdown(wait=not reusable, cancel_futures=True)
+        container_pool.release(lease, reusable=reusable)
+
+@execution_bp.route('/execute/batch', methods=['POST'])
+@jwt_required(optional=True)
+def batch_execute():
+    """Judge one submission against a list of test cases"""
+    try:
+        data = request.get_json()
+        
+        # Validate required fields
+        if not data or 'language' not in data or 'code' not in data or 'cases' not in data:
+            return jsonify({'error': 'language, code and cases are required'}), 400
+        
+        language = data['language']
+        cases = data['cases']
+        
+        if not get_language(language):
+            return jsonify({'error': f'Language {language} not supported'}), 400
+        
+        if not isinstance(cases, list) or not cases or not all(isinstance(case, dict) for case in cases):
+            return jsonify({'error': 'cases must be a non-empty list of objects'}), 400
+        
+        if len(cases) > BATCH_MAX_CASES:
+            return jsonify({'error': f'At most {BATCH_MAX_CASES} cases are allowed'}), 400
+        
+        try:
+            time_limit = clamp_limit(data.get('time_limit'), BATCH_TIME_LIMIT, BATCH_MAX_TIME_LIMIT)
+            memory_limit = int(clamp_limit(data.get('memory_limit'), BATCH_MEMORY_LIMIT, BATCH_MAX_MEMORY_LIMIT))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'time_limit (seconds) and memory_limit (MB) must be positive numbers'}), 400
+        
+        compare = data.get('compare', 'trimmed')
+        if compare not in ('trimmed', 'exact'):
+            return jsonify({'error': 'compare must be trimmed or exact'}), 400
+        
+        events = judge_submission(language, data['code'], cases, time_limit, memory_limit, compare)
+        
+        # Stream each event as a JSON line as soon as it is known
+        if data.get('stream'):
+            return Response(
+                stream_with_context(json.dumps(event) + '\n' for event in events),
+                mimetype='application/x-ndjson',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+        
+        response = {'results': []}
+        for event in events:
+            if event['type'] == 'error':
+                return jsonify({'error': event['error']}), 500
+            if event['type'] == 'case':
+                response['results'].append(event)
+            else:
+                response[event['type']] = event
+        response['results'].sort(key=lambda result: result['index'])
+        return jsonify(response), 200
+        
+    except Exception as e:
+        logger.error(f"Error in batch execution: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@execution_bp.route('/execute/languages', methods=['GET'])
+def list_languages():
+    """List the languages of the toolchain registry"""
+    return jsonify({'languages': [language.to_dict() for language in LANGUAGES.values()]}), 200
+
+@execution_bp.route('/execute/pool/stats', methods=['GET'])
+@jwt_required(optional=True)
+def get_pool_stats():
+    """Get warm container pool, compile cache, result cache and output store statistics"""
+    try:
+        return jsonify({
+            'pools': container_pool.stats(),
+            'compile_cache': compile_cache.stats(),
+            'result_cache': result_cache.stats(),
+            'output_store': output_store.stats()
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error getting pool stats: {e}")
+        return jsonify({'error': str(e)}), 500
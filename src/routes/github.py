@@ -7,7 +7,11 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from github import Github
 from src.models.project import Project
-from src.models.container_manager import ContainerManager
+from src.models.container_manager import get_container_manager
+from src.models.file_store import blob_store
+from src.models.repo_fetcher import GITHUB_API_URL, RefNotFoundError, iter_repository_files
+from src.models.workspace_sync import WorkspaceSync, sync_project_workspace
+from src.models.languages import detect_language, validate_variant
 import os
 import tempfile
 import shutil
@@ -20,20 +24,34 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 github_bp = Blueprint('github', __name__)
 
-# Initialize container manager
-container_manager = ContainerManager()
+# Shared, lazily-connected container manager
+container_manager = get_container_manager()
+workspace_sync = WorkspaceSync(container_manager)
 
 def get_github_client(token=None):
     """Get GitHub client with optional token"""
     if token:
-        return Github(token)
+        return Github(token, base_url=GITHUB_API_URL)
     else:
         # Use environment variable or return unauthenticated client
         github_token = os.getenv('GITHUB_TOKEN')
         if github_token:
-            return Github(github_token)
+            return Github(github_token, base_url=GITHUB_API_URL)
         else:
-            return Github()  # Unauthenticated (limited API calls)
+            return Github(base_url=GITHUB_API_URL)  # Unauthenticated (limited API calls)
+
+def download_repository(owner, repo_name, ref, token=None):
+    """Stream a repository tarball into the file store; returns {path: (sha256, size)}"""
+    entries = {}
+    for path, data in iter_repository_files(owner, repo_name, ref, token or os.getenv('GITHUB_TOKEN')):
+        try:
+            data.decode('utf-8')
+        except UnicodeDecodeError:
+            # Skip binary files, project files are text
+            logger.warning(f"Skipped binary file: {path}")
+            continue
+        entries[path] = (blob_store.put(data), len(data))
+    return entries
 
 @github_bp.route('/github/clone', methods=['POST'])
 @jwt_required(optional=True)
@@ -50,6 +68,10 @@ def clone_repository():
         branch = data.get('branch', 'main')
         project_id = data.get('project_id')
         github_token = data.get('github_token')
+        try:
+            image_variant = validate_variant(data.get('image_variant'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Parse repository URL to get owner and repo name
         if 'github.com/' in repository_url:
@@ -70,34 +92,29 @@ def clone_repository():
             # Get repository information
             repo = github_client.get_repo(f"{owner}/{repo_name}")
             
-            # Get repository contents
+            # Look up an existing project before downloading anything
+            project = None
+            if project_id:
+                project = Project.get_by_id(project_id)
+                if not project:
+                    return jsonify({'error': 'Project not found'}), 404
+            
+            # Download the whole repository as one tarball
             try:
-                contents = repo.get_contents("", ref=branch)
-            except:
+                file_entries = download_repository(owner, repo_name, branch, github_token)
+            except RefNotFoundError:
                 # Try with default branch if specified branch doesn't exist
-                contents = repo.get_contents("")
                 branch = repo.default_branch
+                file_entries = download_repository(owner, repo_name, branch, github_token)
             
             # Create project if not provided
-            if not project_id:
+            if not project:
                 # Detect language from repository
                 languages = repo.get_languages()
                 primary_language = max(languages.keys(), key=lambda k: languages[k]) if languages else 'python'
                 
-                # Map GitHub language names to our supported languages
-                language_mapping = {
-                    'Python': 'python',
-                    'JavaScript': 'nodejs',
-                    'TypeScript': 'nodejs',
-                    'Java': 'java',
-                    'Go': 'go',
-                    'Rust': 'rust',
-                    'PHP': 'php',
-                    'C++': 'cpp',
-                    'C': 'cpp'
-                }
-                
-                detected_language = language_mapping.get(primary_language, 'python')
+                # Map the GitHub language name to one of our supported languages
+                detected_language = detect_language(primary_language)
                 
                 # Create new project
                 project = Project(
@@ -108,71 +125,32 @@ def clone_repository():
                     user_id=get_jwt_identity() if get_jwt_identity() else None
                 )
                 project.github_branch = branch
+                project.image_variant = image_variant
                 project.save()
                 project_id = project.id
                 
                 # Create container for the project
                 container_id, success = container_manager.create_container(
                     language=detected_language,
-                    project_id=project_id
+                    project_id=project_id,
+                    variant=image_variant
                 )
                 
                 if success and container_id:
-                    project.set_container(container_id, 'created')
+                    project.set_container(container_id, 'created', container_manager.host_of(container_id))
                     project.save()
-            else:
-                project = Project.get_by_id(project_id)
-                if not project:
-                    return jsonify({'error': 'Project not found'}), 404
-            
-            # Download repository files
-            files_structure = {}
-            
-            def download_contents(contents, path=""):
-                for content in contents:
-                    if content.type == "dir":
-                        # Recursively get directory contents
-                        dir_contents = repo.get_contents(content.path, ref=branch)
-                        download_contents(dir_contents, content.path)
-                    else:
-                        # Download file content
-                        try:
-                            file_content = content.decoded_content.decode('utf-8')
-                            files_structure[content.path] = file_content
-                        except:
-                            # Skip binary files or files that can't be decoded
-                            logger.warning(f"Skipped binary file: {content.path}")
-            
-            download_contents(contents)
             
             # Update project files
-            project.update_files(files_structure)
+            project.set_file_entries(file_entries)
             project.github_url = repository_url
             project.github_branch = branch
             project.save()
             
-            # Copy files to container workspace if container exists
+            # Copy files to container workspace in a single archive upload
             if project.container_id:
                 try:
-                    # Start container
                     container_manager.start_container(project.container_id)
-                    
-                    # Create files in container
-                    for file_path, file_content in files_structure.items():
-                        # Create directory structure
-                        dir_path = os.path.dirname(file_path)
-                        if dir_path:
-                            container_manager.execute_command(
-                                project.container_id,
-                                f"mkdir -p /workspace/{dir_path}"
-                            )
-                        
-                        # Write file content (escape quotes and special characters)
-                        escaped_content = file_content.replace('"', '\\"').replace('`', '\\`').replace('$', '\\$')
-                        container_manager.execute_command(
-                            project.container_id,
-                            f'echo "{escaped_content}" > /workspace/{file_path}'
-                        )
+                    sync_project_workspace(project, workspace_sync)
                 except Exception as e:
                     logger.warning(f"Failed to copy files to container: {e}")
             
@@ -182,7 +160,7 @@ def clone_repository():
                 'project_id': project_id,
                 'repository_url': repository_url,
                 'branch': branch,
-                'files_count': len(files_structure),
+                'files_count': len(file_entries),
                 'project': project.to_dict()
             }), 200
             
@@ -4,8 +4,8 @@ Provides system health status for monitoring and load balancers
 """
 
 from flask import Blueprint, jsonify
+from src.models.container_manager import get_container_manager
 import psutil
-import docker
 import time
 import logging
 
@@ -35,14 +35,15 @@ def health_check():
             health_status['checks']['database'] = f'unhealthy: {str(e)}'
             health_status['status'] = 'degraded'
         
-        # Check Docker daemon
-        try:
-            client = docker.from_env()
-            client.ping()
-            health_status['checks']['docker'] = 'healthy'
-        except Exception as e:
-            health_status['checks']['docker'] = f'unhealthy: {str(e)}'
-            health_status['status'] = 'degraded'
+        # Check Docker daemons (every engine of a cluster)
+        for manager in get_container_manager().managers:
+            check = f'docker:{manager.host}' if manager.host else 'docker'
+            try:
+                manager.client.ping()
+                health_status['checks'][check] = 'healthy'
+            except Exception as e:
+                health_status['checks'][check] = f'unhealthy: {str(e)}'
+                health_status['status'] = 'degraded'
         
         # Check system resources
         try:
@@ -129,8 +130,7 @@ def metrics():
         
         # Docker metrics
         try:
-            client = docker.from_env()
-            containers = client.containers.list()
+            containers = get_container_manager().client.containers.list()
             running_containers = len([c for c in containers if c.status == 'running'])
             total_containers = len(containers)
         except:
@@ -3,10 +3,16 @@ Project Management API Routes
 Handles CRUD operations for projects
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.project import Project, ExecutionResult, db
-from src.models.container_manager import ContainerManager
+from src.models.container_manager import get_container_manager
+from src.models.languages import validate_variant
+from src.models.pagination import parse_limit, encode_cursor, decode_cursor, parse_time
+from datetime import datetime
+from src.models.workspace_sync import WorkspaceSync, sync_project_workspace, pull_project_workspace
+from urllib.parse import urlencode
+import mimetypes
 import logging
 
 # Configure logging
@@ -16,8 +22,18 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 projects_bp = Blueprint('projects', __name__)
 
-# Initialize container manager
-container_manager = ContainerManager()
+# Shared, lazily-connected container manager
+container_manager = get_container_manager()
+workspace_sync = WorkspaceSync(container_manager)
+
+def _link_next_page(response, next_cursor):
+    """Announce the next page of a listing in X-Next-Cursor and Link headers"""
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = encode_cursor(next_cursor)
+        args = request.args.to_dict()
+        args['cursor'] = response.headers['X-Next-Cursor']
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return response
 
 @projects_bp.route('/projects', methods=['POST'])
 @jwt_required(optional=True)  # Make JWT optional for now
@@ -48,6 +64,11 @@ def create_project():
             project.cpu_limit = data['cpu_limit']
         if 'memory_limit' in data:
             project.memory_limit = data['memory_limit']
+        try:
+            project.image_variant = validate_variant(data.get('image_variant'))
+            container_manager.admission.check_request(data.get('cpu_limit', '1'), data.get('memory_limit', '512m'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         # Save project
         project.save()
@@ -57,11 +78,12 @@ def create_project():
             language=project.language,
             project_id=project.id,
             cpu_limit=project.cpu_limit,
-            memory_limit=project.memory_limit
+            memory_limit=project.memory_limit,
+            variant=project.image_variant
         )
         
         if success and container_id:
-            project.set_container(container_id, 'created')
+            project.set_container(container_id, 'created', container_manager.host_of(container_id))
             project.save()
         
         logger.info(f"Created project {project.id} with container {container_id}")
@@ -74,16 +96,36 @@ def create_project():
 @projects_bp.route('/projects', methods=['GET'])
 @jwt_required(optional=True)
 def get_projects():
-    """Get all projects or projects for a specific user"""
+    """Get a page of projects (the user's when authenticated), most recently updated first"""
     try:
         user_id = get_jwt_identity() if get_jwt_identity() else None
         
-        if user_id:
-            projects = Project.get_by_user(user_id)
-        else:
-            projects = Project.get_all()
-        
-        return jsonify([project.to_dict() for project in projects]), 200
+        # Paging, filters and sparse fieldsets from the query string
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            cursor = request.args.get('cursor')
+            cursor = decode_cursor(cursor, [datetime, str]) if cursor else None
+            fields = [name for name in request.args.get('fields', '').split(',') if name]
+            unknown = [name for name in fields if name not in Project.FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(Project.FIELDS)}")
+            query = Project.filtered(
+                user_id=user_id,
+                language=request.args.get('language'),
+                statuses=[status for status in request.args.get('status', '').split(',') if status],
+                updated_after=parse_time(request.args.get('updated_after'), 'updated_after'),
+                updated_before=parse_time(request.args.get('updated_before'), 'updated_before')
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        projects, next_cursor = Project.page(query, limit, cursor, fields)
+        
+        # The body stays a plain list; the next page is announced in headers
+        response = _link_next_page(jsonify([project.to_dict(fields=fields) for project in projects]), next_cursor)
+        if request.args.get('count', 'false').lower() == 'true':
+            response.headers['X-Total-Count'] = str(query.order_by(None).count())
+        return response, 200
         
     except Exception as e:
         logger.error(f"Error getting projects: {e}")
@@ -99,14 +141,13 @@ def get_project(project_id):
         if not project:
             return jsonify({'error': 'Project not found'}), 404
         
+        project_dict = project.to_dict(include_files=True)
+        
         # Get container status if container exists
         if project.container_id:
-            container_status = container_manager.get_container_status(project.container_id)
-            project_dict = project.to_dict()
-            project_dict['container_info'] = container_status
-            return jsonify(project_dict), 200
+            project_dict['container_info'] = container_manager.get_container_status(project.container_id)
         
-        return jsonify(project.to_dict()), 200
+        return jsonify(project_dict), 200
         
     except Exception as e:
         logger.error(f"Error getting project {project_id}: {e}")
@@ -141,6 +182,17 @@ def update_project(project_id):
             project.cpu_limit = data['cpu_limit']
         if 'memory_limit' in data:
             project.memory_limit = data['memory_limit']
+        if 'cpu_limit' in data or 'memory_limit' in data:
+            try:
+                container_manager.admission.check_request(project.cpu_limit, project.memory_limit)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        if 'image_variant' in data:
+            # Takes effect when the project's container is next created
+            try:
+                project.image_variant = validate_variant(data['image_variant'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
         if 'files' in data:
             project.update_files(data['files'])
         
@@ -198,12 +250,84 @@ def upload_files(project_id):
         project.save()
         
         logger.info(f"Updated files for project {project_id}")
-        return jsonify({'message': 'Files updated successfully', 'files': project.get_files()}), 200
+        return jsonify({'message': 'Files updated successfully', 'files': project.get_file_manifest()}), 200
         
     except Exception as e:
         logger.error(f"Error uploading files to project {project_id}: {e}")
         return jsonify({'error': str(e)}), 500
 
+@projects_bp.route('/projects/<project_id>/files', methods=['GET'])
+@jwt_required(optional=True)
+def list_files(project_id):
+    """List project file metadata without contents"""
+    try:
+        project = Project.get_by_id(project_id)
+        
+        if not project:
+            return jsonify({'error': 'Project not found'}), 404
+        
+        files = project.get_file_manifest()
+        return jsonify({
+            'files': files,
+            'count': len(files),
+            'total_size': sum(entry['size'] for entry in files)
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error listing files for project {project_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@projects_bp.route('/projects/<project_id>/files/<path:file_path>', methods=['GET'])
+@jwt_required(optional=True)
+def get_file(project_id, file_path):
+    """Get the raw content of a single project file"""
+    try:
+        project = Project.get_by_id(project_id)
+        
+        if not project:
+            return jsonify({'error': 'Project not found'}), 404
+        
+        content = project.get_file_content(file_path)
+        if content is None:
+            return jsonify({'error': 'File not found'}), 404
+        
+        mimetype = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        return Response(content, mimetype=mimetype), 200
+        
+    except Exception as e:
+        logger.error(f"Error getting file {file_path} of project {project_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@projects_bp.route('/projects/<project_id>/sync', methods=['POST'])
+@jwt_required(optional=True)
+def sync_workspace(project_id):
+    """Push project files to the container workspace or pull them back"""
+    try:
+        project = Project.get_by_id(project_id)
+        
+        if not project:
+            return jsonify({'error': 'Project not found'}), 404
+        
+        if not project.container_id:
+            return jsonify({'error': 'Project has no associated container'}), 400
+        
+        data = request.get_json(silent=True) or {}
+        direction = data.get('direction', 'push')
+        
+        if direction == 'push':
+            stats = sync_project_workspace(project, workspace_sync, full=bool(data.get('full')))
+        elif direction == 'pull':
+            stats = pull_project_workspace(project, workspace_sync)
+        else:
+            return jsonify({'error': 'direction must be push or pull'}), 400
+        
+        logger.info(f"Synced workspace ({direction}) for project {project_id}")
+        return jsonify({'direction': direction, 'stats': stats}), 200
+        
+    except Exception as e:
+        logger.error(f"Error syncing workspace for project {project_id}: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @projects_bp.route('/projects/<project_id>/executions', methods=['GET'])
 @jwt_required(optional=True)
 def get_project_executions(project_id):
@@ -214,10 +338,20 @@ def get_project_executions(project_id):
         if not project:
             return jsonify({'error': 'Project not found'}), 404
         
-        limit = request.args.get('limit', 10, type=int)
-        executions = ExecutionResult.get_by_project(project_id, limit)
+        try:
+            limit = parse_limit(request.args.get('limit'), default=10)
+            cursor = request.args.get('cursor')
+            cursor = decode_cursor(cursor, [datetime, str]) if cursor else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify([execution.to_dict() for execution in executions]), 200
+        executions, next_cursor = ExecutionResult.page(project_id, limit, cursor)
+        
+        # Output previews only; the full output is served by /execute/<id>/output/<stream>
+        response = _link_next_page(
+            jsonify([execution.to_dict(full_output=False) for execution in executions]), next_cursor
+        )
+        return response, 200
         
     except Exception as e:
         logger.error(f"Error getting executions for project {project_id}: {e}")
@@ -6,9 +6,15 @@ Handles terminal access to containers
 from flask import Blueprint, request, jsonify
 from flask_socketio import emit, join_room, leave_room
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models.project import Project
-from src.models.container_manager import ContainerManager
+from src.models.project import Project, ExecutionResult
+from src.models.container_manager import get_container_manager
+from src.models.container_lifecycle import container_lifecycle
+from src.models.admission import AdmissionRejected
+from src.models.output_stream import get_buffer, execution_room
 import uuid
+import codecs
+import select
+import socket
 import logging
 import threading
 import time
@@ -20,12 +26,16 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 terminal_bp = Blueprint('terminal', __name__)
 
-# Initialize container manager
-container_manager = ContainerManager()
+# Shared, lazily-connected container manager
+container_manager = get_container_manager()
 
 # Store active terminal sessions
 terminal_sessions = {}
 
+# Shell output is coalesced into frames of up to this size / age
+OUTPUT_FLUSH_BYTES = 16384
+OUTPUT_FLUSH_INTERVAL = 0.02
+
 class TerminalSession:
     def __init__(self, session_id, container_id, project_id=None):
         self.session_id = session_id
@@ -34,12 +44,113 @@ class TerminalSession:
         self.created_at = time.time()
         self.last_activity = time.time()
         self.is_active = True
+        self.exec_id = None
+        self.shell_socket = None
+        self._raw_socket = None
+        self._write_lock = threading.Lock()
+        self._shell_lock = threading.Lock()
     
     def update_activity(self):
         self.last_activity = time.time()
+        # Keeps the container from being paused, and thaws it if it already was
+        container_lifecycle.activity(self.container_id)
+    
+    @property
+    def has_shell(self):
+        return self._raw_socket is not None
+    
+    def open_shell(self, socketio, cols=80, rows=24):
+        """Start the session's PTY shell and its output reader task"""
+        with self._shell_lock:
+            if self.has_shell:
+                return True
+            
+            exec_id, shell_socket = container_manager.open_shell(self.container_id, cols, rows)
+            if not exec_id:
+                return False
+            
+            self.exec_id = exec_id
+            self.shell_socket = shell_socket
+            # docker-py wraps the hijacked connection; talk to the raw socket directly
+            self._raw_socket = getattr(shell_socket, '_sock', shell_socket)
+            socketio.start_background_task(self._pump_output, socketio, self._raw_socket)
+            return True
+    
+    def write(self, data):
+        """Send keystrokes to the shell"""
+        if not self.has_shell:
+            return False
+        with self._write_lock:
+            self._raw_socket.sendall(data.encode('utf-8'))
+        self.update_activity()
+        return True
+    
+    def resize(self, cols, rows):
+        """Resize the shell's PTY"""
+        if not self.exec_id:
+            return False
+        return container_manager.resize_shell(self.exec_id, cols, rows)
+    
+    def _pump_output(self, socketio, raw_socket):
+        """Read shell output and emit it to the session room in coalesced frames"""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        pending = []
+        pending_size = 0
+        first_pending_at = None
+        
+        def flush():
+            nonlocal pending, pending_size, first_pending_at
+            if pending:
+                socketio.emit('output', {
+                    'data': ''.join(pending),
+                    'type': 'stdout'
+                }, namespace='/terminal', room=self.session_id)
+            pending, pending_size, first_pending_at = [], 0, None
+        
+        try:
+            while self.is_active:
+                timeout = OUTPUT_FLUSH_INTERVAL if pending else 1.0
+                readable, _, _ = select.select([raw_socket], [], [], timeout)
+                
+                if readable:
+                    chunk = raw_socket.recv(4096)
+                    if not chunk:
+                        break
+                    text = decoder.decode(chunk)
+                    if text:
+                        pending.append(text)
+                        pending_size += len(text)
+                        first_pending_at = first_pending_at or time.monotonic()
+                
+                if pending and (pending_size >= OUTPUT_FLUSH_BYTES
+                                or time.monotonic() - first_pending_at >= OUTPUT_FLUSH_INTERVAL):
+                    flush()
+        except (OSError, ValueError) as e:
+            if self.is_active:
+                logger.warning(f"Terminal session {self.session_id} shell read failed: {e}")
+        
+        flush()
+        if self.is_active:
+            socketio.emit('output', {
+                'data': 'Shell exited\n',
+                'type': 'system'
+            }, namespace='/terminal', room=self.session_id)
+        self._close_shell()
+    
+    def _close_shell(self):
+        raw_socket, self._raw_socket = self._raw_socket, None
+        self.shell_socket = None
+        self.exec_id = None
+        if raw_socket is not None:
+            try:
+                raw_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            raw_socket.close()
     
     def close(self):
         self.is_active = False
+        self._close_shell()
 
 @terminal_bp.route('/terminal/create', methods=['POST'])
 @jwt_required(optional=True)
@@ -74,11 +185,16 @@ def create_terminal_session():
         if 'error' in container_status:
             return jsonify({'error': 'Container not found or not accessible'}), 404
         
-        # Start container if not running
+        # Start or unpause the container if it is not running
         if container_status.get('status') != 'running':
-            success = container_manager.start_container(container_id)
+            try:
+                success = container_lifecycle.resume_container(container_id)
+            except AdmissionRejected as e:
+                return jsonify({'error': str(e)}), 503, {'Retry-After': str(e.retry_after)}
             if not success:
                 return jsonify({'error': 'Failed to start container'}), 500
+        else:
+            container_lifecycle.touch(container_id)
         
         # Create terminal session
         session_id = str(uuid.uuid4())
@@ -114,7 +230,8 @@ def get_terminal_session_status(session_id):
             'project_id': session.project_id,
             'created_at': session.created_at,
             'last_activity': session.last_activity,
-            'is_active': session.is_active
+            'is_active': session.is_active,
+            'has_shell': session.has_shell
         }), 200
         
     except Exception as e:
@@ -203,9 +320,10 @@ def register_terminal_events(socketio):
                 emit('error', {'error': 'Session is not active'})
                 return
             
-            # Join the session room
+            # Join the session room; the container may have been paused since the session was created
             join_room(session_id)
             session.update_activity()
+            container_lifecycle.resume_container(session.container_id)
             
             # Send welcome message
             emit('output', {
@@ -213,14 +331,10 @@ def register_terminal_events(socketio):
                 'type': 'system'
             })
             
-            # Send current working directory
-            stdout, stderr, exit_code = container_manager.execute_command(
-                session.container_id, 'pwd'
-            )
-            
-            if exit_code == 0:
+            # Attach to the session's interactive shell
+            if not session.open_shell(socketio, data.get('cols', 80), data.get('rows', 24)):
                 emit('output', {
-                    'data': f'Current directory: {stdout.strip()}\n',
+                    'data': 'Interactive shell unavailable, falling back to single commands\n',
                     'type': 'system'
                 })
             
@@ -265,6 +379,11 @@ def register_terminal_events(socketio):
             if not command:
                 return
             
+            # The PTY shell echoes and runs the line itself
+            if session.has_shell:
+                session.write(command + '\n')
+                return
+            
             # Echo the command
             emit('output', {
                 'data': f'$ {command}\n',
@@ -303,6 +422,92 @@ def register_terminal_events(socketio):
             logger.error(f"Error executing command: {e}")
             emit('error', {'error': str(e)})
     
+    @socketio.on('input', namespace='/terminal')
+    def handle_input(data):
+        """Write raw keystrokes to the session shell"""
+        try:
+            session_id = data.get('session_id')
+            
+            if not session_id or session_id not in terminal_sessions:
+                emit('error', {'error': 'Invalid session ID'})
+                return
+            
+            session = terminal_sessions[session_id]
+            
+            if not session.is_active or not session.write(data.get('data', '')):
+                emit('error', {'error': 'Session has no active shell'})
+            
+        except Exception as e:
+            logger.error(f"Error writing terminal input: {e}")
+            emit('error', {'error': str(e)})
+    
+    @socketio.on('resize', namespace='/terminal')
+    def handle_resize(data):
+        """Resize the session shell"""
+        try:
+            session_id = data.get('session_id')
+            
+            if not session_id or session_id not in terminal_sessions:
+                emit('error', {'error': 'Invalid session ID'})
+                return
+            
+            session = terminal_sessions[session_id]
+            session.resize(int(data.get('cols', 80)), int(data.get('rows', 24)))
+            
+        except Exception as e:
+            logger.error(f"Error resizing terminal: {e}")
+            emit('error', {'error': str(e)})
+    
+    @socketio.on('subscribe_execution', namespace='/terminal')
+    def handle_subscribe_execution(data):
+        """Subscribe to live output of a queued execution"""
+        try:
+            execution_id = data.get('execution_id')
+            after_seq = data.get('after', -1)
+            
+            if not execution_id:
+                emit('error', {'error': 'execution_id is required'})
+                return
+            
+            join_room(execution_room(execution_id))
+            
+            # Replay frames produced before the subscription
+            buffer = get_buffer(execution_id)
+            if buffer:
+                frames, dropped, closed = buffer.read(after_seq)
+                if dropped:
+                    emit('execution_truncated', {'execution_id': execution_id, 'dropped_frames': dropped})
+                for frame in frames:
+                    emit('execution_output', dict(frame, execution_id=execution_id))
+                if closed:
+                    emit('execution_finished', {'execution_id': execution_id, 'exit_code': buffer.exit_code})
+                return
+            
+            # Already finished (or running in another worker process)
+            execution = ExecutionResult.get_by_id(execution_id)
+            if execution and execution.status not in ('pending', 'running'):
+                for stream in ('stdout', 'stderr'):
+                    output = getattr(execution, stream)
+                    if output:
+                        emit('execution_output', {'execution_id': execution_id, 'stream': stream, 'data': output})
+                emit('execution_finished', {'execution_id': execution_id, 'exit_code': execution.exit_code})
+            
+        except Exception as e:
+            logger.error(f"Error subscribing to execution output: {e}")
+            emit('error', {'error': str(e)})
+    
+    @socketio.on('unsubscribe_execution', namespace='/terminal')
+    def handle_unsubscribe_execution(data):
+        """Stop receiving output of an execution"""
+        try:
+            execution_id = data.get('execution_id')
+            
+            if execution_id:
+                leave_room(execution_room(execution_id))
+            
+        except Exception as e:
+            logger.error(f"Error unsubscribing from execution output: {e}")
+    
     @socketio.on('get_directory_listing', namespace='/terminal')
     def handle_get_directory_listing(data):
         """Get directory listing"""
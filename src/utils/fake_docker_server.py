@@ -0,0 +1,315 @@
+"""
+Fake Docker Server
+Serves the subset of the Docker Engine API used by the async execution engine
+(plus enough container create, list and inspect calls for cluster placement)
+over a Unix socket, running exec commands as local processes.
+
+Commands run on the host, not in a sandbox: use it for tests only.
+
+Usage:
+    python -m src.utils.fake_docker_server --socket /tmp/fake-docker.sock --container sandbox
+    DOCKER_HOST=unix:///tmp/fake-docker.sock EXECUTION_BACKEND=async python src/main.py
+
+Several engines for a DOCKER_HOSTS cluster are several servers:
+    python -m src.utils.fake_docker_server --socket /tmp/fake-a.sock --cpus 4 &
+    python -m src.utils.fake_docker_server --socket /tmp/fake-b.sock --cpus 8 &
+    DOCKER_HOSTS=a=unix:///tmp/fake-a.sock,b=unix:///tmp/fake-b.sock python src/main.py
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import threading
+from urllib.parse import parse_qs
+
+# Requests carry an API version prefix such as /v1.41
+VERSION_PREFIX = re.compile(r'^/v[0-9.]+')
+
+
+class FakeDockerServer:
+    def __init__(self, socket_path, workdir=None, cpus=4, memory=8 * 1024 ** 3):
+        """Containers are plain records; exec commands run with workdir as their cwd.
+        cpus and memory are the node totals reported by /info"""
+        self.socket_path = socket_path
+        self.workdir = workdir or os.getcwd()
+        self.cpus = cpus
+        self.memory = memory
+        self.containers = {}
+        self.execs = {}
+        self.loop = None
+        self.server = None
+
+    def add_container(self, container_id, running=True, name=None, image='fake', labels=None):
+        self.containers[container_id] = {
+            'running': running, 'paused': False, 'name': name or container_id,
+            'image': image, 'labels': labels or {}, 'created': int(time.time())
+        }
+
+    def _state(self, container):
+        if container['paused']:
+            return 'paused'
+        return 'running' if container['running'] else 'created'
+
+    def _inspect(self, container_id):
+        container = self.containers[container_id]
+        state = self._state(container)
+        return {
+            'Id': container_id,
+            'Name': '/' + container['name'],
+            'Image': f"sha256:{container['image']}",
+            'Created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(container['created'])),
+            'State': {'Status': state, 'Running': state != 'created', 'Paused': container['paused']},
+            'Config': {'Image': container['image'], 'Labels': container['labels']},
+            'HostConfig': {},
+            'NetworkSettings': {'Ports': {}}
+        }
+
+    def _find(self, reference):
+        """Container ID for a full ID, name or unique ID prefix"""
+        if reference in self.containers:
+            return reference
+        matches = [
+            container_id for container_id, container in self.containers.items()
+            if container['name'] == reference or container_id.startswith(reference)
+        ]
+        return matches[0] if len(matches) == 1 else None
+
+    async def _write_json(self, writer, status, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        head = [f'HTTP/1.1 {status} OK', f'Content-Length: {len(body)}']
+        if payload is not None:
+            head.append('Content-Type: application/json')
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    async def _read_request(self, reader):
+        request_line = await reader.readline()
+        if not request_line.strip():
+            return None
+        method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length', '0'))
+        body = await reader.readexactly(length) if length else b''
+        payload = json.loads(body) if body else {}
+        path, _, query = path.partition('?')
+        headers['query'] = {key: values[0] for key, values in parse_qs(query).items()}
+        return method, VERSION_PREFIX.sub('', path), headers, payload
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, payload = request
+                parts = [part for part in path.split('/') if part]
+
+                if method == 'POST' and len(parts) == 3 and parts[0] == 'exec' and parts[2] == 'start':
+                    await self._start_exec(writer, parts[1], headers)
+                    break
+
+                await self._route(writer, method, parts, payload, headers['query'])
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, writer, method, parts, payload, query=None):
+        query = query or {}
+        if parts == ['_ping']:
+            return await self._write_json(writer, 200, 'OK')
+        if parts == ['version']:
+            return await self._write_json(writer, 200, {'Version': 'fake', 'ApiVersion': '1.41'})
+        if parts == ['info']:
+            states = [self._state(container) for container in self.containers.values()]
+            return await self._write_json(writer, 200, {
+                'Containers': len(states),
+                'ContainersRunning': states.count('running'),
+                'ContainersPaused': states.count('paused'),
+                'ContainersStopped': states.count('created'),
+                'Images': 1,
+                'ServerVersion': 'fake',
+                'NCPU': self.cpus,
+                'MemTotal': self.memory
+            })
+        if method == 'GET' and len(parts) == 3 and parts[0] == 'images' and parts[2] == 'json':
+            return await self._write_json(writer, 200, {'Id': f'sha256:{parts[1]}', 'RepoTags': [parts[1]],
+                                                        'Config': {'Labels': {}}, 'Size': 0})
+
+        if parts == ['containers', 'json']:
+            listing = []
+            for container_id, container in self.containers.items():
+                if query.get('all') not in ('1', 'true', 'True') and not container['running']:
+                    continue
+                listing.append({
+                    'Id': container_id, 'Names': ['/' + container['name']], 'Image': container['image'],
+                    'State': self._state(container), 'Created': container['created'],
+                    'Labels': container['labels'], 'Ports': []
+                })
+            return await self._write_json(writer, 200, listing)
+
+        if method == 'POST' and parts == ['containers', 'create']:
+            container_id = uuid.uuid4().hex + uuid.uuid4().hex
+            self.add_container(container_id, running=False, name=query.get('name'),
+                               image=payload.get('Image', 'fake'), labels=payload.get('Labels'))
+            return await self._write_json(writer, 201, {'Id': container_id, 'Warnings': []})
+
+        if len(parts) >= 2 and parts[0] == 'containers':
+            container_id = self._find(parts[1])
+            if container_id is None:
+                return await self._write_json(writer, 404, {'message': f'No such container: {parts[1]}'})
+            if method == 'GET' and parts[2:] == ['json']:
+                return await self._write_json(writer, 200, self._inspect(container_id))
+            if method == 'DELETE' and len(parts) == 2:
+                del self.containers[container_id]
+                return await self._write_json(writer, 204)
+
+        if len(parts) == 3 and parts[0] == 'containers':
+            container = self.containers.get(self._find(parts[1]))
+
+            if method == 'POST' and parts[2] == 'start':
+                status = 304 if container['running'] else 204
+                container['running'] = True
+                return await self._write_json(writer, status)
+
+            if method == 'POST' and parts[2] == 'stop':
+                container['running'] = False
+                container['paused'] = False
+                return await self._write_json(writer, 204)
+
+            if method == 'POST' and parts[2] in ('pause', 'unpause'):
+                if not container['running']:
+                    return await self._write_json(writer, 409, {'message': f'Container {parts[1]} is not running'})
+                container['paused'] = parts[2] == 'pause'
+                return await self._write_json(writer, 204)
+
+            if method == 'POST' and parts[2] == 'exec':
+                if not container['running']:
+                    return await self._write_json(writer, 409, {'message': f'Container {parts[1]} is not running'})
+                if container['paused']:
+                    return await self._write_json(writer, 409, {
+                        'message': f'Container {parts[1]} is paused, unpause the container before exec'
+                    })
+                exec_id = uuid.uuid4().hex
+                self.execs[exec_id] = {
+                    'ID': exec_id,
+                    'ContainerID': parts[1],
+                    'Cmd': payload.get('Cmd') or [],
+                    'Running': False,
+                    'ExitCode': None,
+                    'Pid': 0
+                }
+                return await self._write_json(writer, 201, {'Id': exec_id})
+
+        if method == 'GET' and len(parts) == 3 and parts[0] == 'exec' and parts[2] == 'json':
+            record = self.execs.get(parts[1])
+            if record is None:
+                return await self._write_json(writer, 404, {'message': f'No such exec instance: {parts[1]}'})
+            return await self._write_json(writer, 200, {key: value for key, value in record.items() if key != 'Cmd'})
+
+        return await self._write_json(writer, 404, {'message': 'page not found'})
+
+    async def _start_exec(self, writer, exec_id, headers):
+        """Run the command and write its output in Docker's multiplexed framing"""
+        record = self.execs.get(exec_id)
+        if record is None:
+            return await self._write_json(writer, 404, {'message': f'No such exec instance: {exec_id}'})
+
+        if headers.get('upgrade'):
+            head = 'HTTP/1.1 101 UPGRADED\r\nConnection: Upgrade\r\nUpgrade: tcp\r\n'
+        else:
+            head = 'HTTP/1.1 200 OK\r\n'
+        writer.write((head + 'Content-Type: application/vnd.docker.raw-stream\r\n\r\n').encode('latin-1'))
+        await writer.drain()
+
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *record['Cmd'], cwd=self.workdir,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+            )
+        except OSError as e:
+            message = f'OCI runtime exec failed: {e}\n'.encode('utf-8')
+            writer.write(bytes([2, 0, 0, 0]) + len(message).to_bytes(4, 'big') + message)
+            record['ExitCode'] = 126
+            return
+
+        record['Running'] = True
+        record['Pid'] = process.pid
+
+        async def pump(stream, stream_id):
+            while True:
+                chunk = await stream.read(32768)
+                if not chunk:
+                    break
+                writer.write(bytes([stream_id, 0, 0, 0]) + len(chunk).to_bytes(4, 'big') + chunk)
+                await writer.drain()
+
+        try:
+            await asyncio.gather(pump(process.stdout, 1), pump(process.stderr, 2))
+            record['ExitCode'] = await process.wait()
+        except (ConnectionError, asyncio.CancelledError):
+            # Client went away: the real daemon keeps running the process, the fake stops it
+            process.kill()
+            record['ExitCode'] = await process.wait()
+        finally:
+            record['Running'] = False
+
+    async def serve(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        self.server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+
+    def close(self):
+        if self.loop and self.server:
+            self.loop.call_soon_threadsafe(self.server.close)
+
+
+def start_server(socket_path, containers=('fake',), workdir=None, cpus=4, memory=8 * 1024 ** 3):
+    """Start the fake daemon on a background loop thread; returns (server, docker_host)"""
+    server = FakeDockerServer(socket_path, workdir, cpus, memory)
+    for container_id in containers:
+        server.add_container(container_id)
+
+    ready = threading.Event()
+
+    def run():
+        server.loop = asyncio.new_event_loop()
+        server.loop.run_until_complete(server.serve())
+        ready.set()
+        server.loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return server, f'unix://{socket_path}'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fake Docker Engine API for tests')
+    parser.add_argument('--socket', default='/tmp/fake-docker.sock')
+    parser.add_argument('--container', action='append', default=[], help='Container ID to accept (repeatable)')
+    parser.add_argument('--workdir', default=None, help='Working directory of exec commands')
+    parser.add_argument('--cpus', type=int, default=4, help='CPUs reported by /info')
+    parser.add_argument('--memory', type=int, default=8 * 1024 ** 3, help='Memory bytes reported by /info')
+    args = parser.parse_args()
+
+    server, docker_host = start_server(args.socket, args.container or ['fake'], args.workdir,
+                                       args.cpus, args.memory)
+    print(f'Fake Docker daemon listening at {docker_host}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.close()
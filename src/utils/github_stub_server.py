@@ -0,0 +1,137 @@
+"""
+GitHub Stand-in Server
+Serves local directories through the subset of the GitHub REST API used by
+repository cloning, so cloning can be exercised offline.
+
+Layout: <root>/<owner>/<repo>/<ref>/... holds the files of each ref.
+
+Usage:
+    python -m src.utils.github_stub_server --root /path/to/repos --port 8765
+    GITHUB_API_URL=http://127.0.0.1:8765 python src/main.py
+"""
+
+import io
+import os
+import json
+import time
+import tarfile
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Extension to GitHub language name, for the /languages endpoint
+LANGUAGE_EXTENSIONS = {
+    '.py': 'Python',
+    '.js': 'JavaScript',
+    '.ts': 'TypeScript',
+    '.java': 'Java',
+    '.go': 'Go',
+    '.rs': 'Rust',
+    '.php': 'PHP',
+    '.cpp': 'C++',
+    '.c': 'C'
+}
+
+
+def build_tarball(ref_dir, prefix):
+    """Pack a directory as a gzipped tarball under a top-level prefix, like GitHub"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+        archive.add(ref_dir, arcname=prefix)
+    return buffer.getvalue()
+
+
+class GitHubStubHandler(BaseHTTPRequestHandler):
+    root = '.'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _repo_dir(self, owner, repo):
+        return os.path.join(self.root, owner, repo)
+
+    def _default_branch(self, repo_dir):
+        refs = sorted(os.listdir(repo_dir))
+        return 'main' if 'main' in refs else refs[0]
+
+    def do_GET(self):
+        parts = [part for part in self.path.split('?', 1)[0].split('/') if part]
+
+        if len(parts) < 3 or parts[0] != 'repos':
+            return self._send_json(404, {'message': 'Not Found'})
+
+        owner, repo = parts[1], parts[2]
+        repo_dir = self._repo_dir(owner, repo)
+        if not os.path.isdir(repo_dir):
+            return self._send_json(404, {'message': 'Not Found'})
+
+        if len(parts) == 3:
+            return self._send_json(200, {
+                'id': int(hashlib.sha1(f'{owner}/{repo}'.encode()).hexdigest()[:8], 16),
+                'name': repo,
+                'full_name': f'{owner}/{repo}',
+                'description': f'Local stand-in for {owner}/{repo}',
+                'default_branch': self._default_branch(repo_dir),
+                'private': False,
+                'url': f'http://{self.headers.get("Host")}/repos/{owner}/{repo}'
+            })
+
+        if len(parts) == 4 and parts[3] == 'languages':
+            counts = Counter()
+            for _, _, files in os.walk(os.path.join(repo_dir, self._default_branch(repo_dir))):
+                for name in files:
+                    language = LANGUAGE_EXTENSIONS.get(os.path.splitext(name)[1])
+                    if language:
+                        counts[language] += 1
+            return self._send_json(200, dict(counts))
+
+        if len(parts) >= 4 and parts[3] == 'tarball':
+            ref = '/'.join(parts[4:]) or self._default_branch(repo_dir)
+            ref_dir = os.path.join(repo_dir, ref)
+            if not os.path.isdir(ref_dir):
+                return self._send_json(404, {'message': 'Not Found'})
+
+            sha = hashlib.sha1(f'{owner}/{repo}@{ref}:{time.time()}'.encode()).hexdigest()[:7]
+            body = build_tarball(ref_dir, f'{owner}-{repo}-{sha}')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-gzip')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        return self._send_json(404, {'message': 'Not Found'})
+
+
+def start_server(root, host='127.0.0.1', port=0):
+    """Start the stand-in server in a background thread; returns (server, base_url)"""
+    handler = type('Handler', (GitHubStubHandler,), {'root': os.path.abspath(root)})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Offline stand-in for the GitHub API')
+    parser.add_argument('--root', required=True, help='Directory laid out as <owner>/<repo>/<ref>/')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    server, base_url = start_server(args.root, args.host, args.port)
+    print(f'GitHub stand-in serving {args.root} at {base_url}')
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
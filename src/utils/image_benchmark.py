@@ -0,0 +1,204 @@
+"""
+Image Startup Benchmark
+Measures the size of every image built from dockerfiles/Dockerfile.* and the latency
+of a cold sandbox: container create, start and the first exec, each on a fresh container.
+
+Results can be saved as JSON and compared against an earlier run to catch regressions;
+the exit status is 1 when any image got slower or bigger than the threshold allows.
+
+Usage:
+    python -m src.utils.image_benchmark --runs 5 --json bench.json
+    python -m src.utils.image_benchmark --build --language python --baseline bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import statistics
+from src.models.languages import LANGUAGES
+from src.models.image_builder import DOCKERFILES_DIR, BuildJob, ImageBuilder
+from src.models.container_manager import managed_labels
+
+# First command run in each sandbox: starts the language runtime without doing any work
+FIRST_EXEC = {
+    'python': ['python', '-c', 'pass'],
+    'nodejs': ['node', '-e', '0'],
+    'java': ['java', '-version'],
+    'cpp': ['g++', '--version'],
+    'go': ['go', 'version'],
+    'rust': ['rustc', '--version'],
+    'php': ['php', '-r', '']
+}
+
+PHASES = ['create', 'start', 'first_exec', 'total']
+
+
+def discover_images(dockerfiles_dir=DOCKERFILES_DIR, languages=None):
+    """(language, variant, dockerfile) of every Dockerfile.<language>[.<variant>]"""
+    images = []
+    for name in sorted(os.listdir(dockerfiles_dir)):
+        parts = name.split('.')
+        if parts[0] != 'Dockerfile' or len(parts) not in (2, 3):
+            continue
+        language = parts[1]
+        variant = parts[2] if len(parts) == 3 else 'minimal'
+        if language in LANGUAGES and (not languages or language in languages):
+            images.append((language, variant, name))
+    return images
+
+
+def summarize(samples):
+    """Median, p90 and min of a list of seconds, in milliseconds"""
+    ordered = sorted(samples)
+    p90 = ordered[min(len(ordered) - 1, int(round(0.9 * (len(ordered) - 1))))]
+    return {
+        'median_ms': round(statistics.median(ordered) * 1000, 1),
+        'p90_ms': round(p90 * 1000, 1),
+        'min_ms': round(ordered[0] * 1000, 1)
+    }
+
+
+def measure_cold_start(client, image, language, memory_limit='256m'):
+    """Seconds spent in each phase of bringing up one fresh sandbox"""
+    name = f'compiler-bench-{language}-{uuid.uuid4().hex[:8]}'
+    command = FIRST_EXEC.get(language, ['true'])
+    container = None
+    try:
+        started = time.perf_counter()
+        container = client.containers.create(
+            image=image, name=name, detach=True, tty=True, stdin_open=True,
+            working_dir='/workspace', mem_limit=memory_limit, labels=managed_labels('bench')
+        )
+        created = time.perf_counter()
+        container.start()
+        running = time.perf_counter()
+        exit_code, output = container.exec_run(command, workdir='/workspace')
+        finished = time.perf_counter()
+        if exit_code != 0:
+            raise RuntimeError(f'{" ".join(command)} exited with {exit_code}: {output[-500:]!r}')
+        return {
+            'create': created - started,
+            'start': running - created,
+            'first_exec': finished - running,
+            'total': finished - started
+        }
+    finally:
+        if container is not None:
+            try:
+                container.remove(force=True)
+            except Exception:
+                pass
+
+
+def benchmark_image(client, language, variant, dockerfile, runs=5):
+    """Size and cold start latency of one image"""
+    spec = LANGUAGES[language]
+    image = spec.image_for(variant)
+    result = {'language': language, 'variant': variant, 'dockerfile': dockerfile, 'image': image}
+
+    try:
+        result['size_mb'] = round(client.images.get(image).attrs.get('Size', 0) / (1024 * 1024), 1)
+    except Exception as e:
+        result['error'] = f'image not available: {e}'
+        return result
+
+    samples = {phase: [] for phase in PHASES}
+    try:
+        for _ in range(runs):
+            for phase, seconds in measure_cold_start(client, image, language, spec.memory_limit).items():
+                samples[phase].append(seconds)
+    except Exception as e:
+        result['error'] = str(e)
+        return result
+
+    result['runs'] = runs
+    result.update({phase: summarize(values) for phase, values in samples.items()})
+    return result
+
+
+def compare(results, baseline, threshold=0.2):
+    """Regressions against a baseline: median total latency or size grown by more than threshold"""
+    previous = {(entry['language'], entry['variant']): entry for entry in baseline.get('results', [])}
+    regressions = []
+    for entry in results:
+        before = previous.get((entry['language'], entry['variant']))
+        if not before or 'error' in entry or 'error' in before:
+            continue
+        checks = [
+            ('total median_ms', before['total']['median_ms'], entry['total']['median_ms']),
+            ('size_mb', before['size_mb'], entry['size_mb'])
+        ]
+        for metric, old, new in checks:
+            if old and new > old * (1 + threshold):
+                regressions.append(
+                    f"{entry['image']}: {metric} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def print_table(results):
+    header = f"{'image':<34} {'size MB':>8} {'create':>8} {'start':>8} {'exec':>8} {'total':>8} {'p90':>8}"
+    print(header)
+    print('-' * len(header))
+    for entry in results:
+        if 'error' in entry:
+            print(f"{entry['image']:<34} {entry['error']}")
+            continue
+        print(
+            f"{entry['image']:<34} {entry['size_mb']:>8} "
+            f"{entry['create']['median_ms']:>8} {entry['start']['median_ms']:>8} "
+            f"{entry['first_exec']['median_ms']:>8} {entry['total']['median_ms']:>8} "
+            f"{entry['total']['p90_ms']:>8}"
+        )
+    print('(latencies are medians in milliseconds)')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Image size and cold start benchmark')
+    parser.add_argument('--language', action='append', default=[], help='Only these languages (repeatable)')
+    parser.add_argument('--variant', action='append', default=[], help='Only these variants (repeatable)')
+    parser.add_argument('--runs', type=int, default=5, help='Cold starts per image')
+    parser.add_argument('--build', action='store_true', help='Build missing or changed images first')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--baseline', help='Compare against results written by an earlier --json run')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed growth before a regression (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    from src.models.container_manager import get_container_manager
+    container_manager = get_container_manager()
+    client = container_manager.client
+
+    images = [
+        image for image in discover_images(languages=args.language)
+        if not args.variant or image[1] in args.variant
+    ]
+
+    if args.build:
+        for variant in sorted({image[1] for image in images}):
+            languages = [language for language, image_variant, _ in images if image_variant == variant]
+            ImageBuilder(container_manager).run(BuildJob(languages, variants=[variant]))
+
+    results = []
+    for language, variant, dockerfile in images:
+        results.append(benchmark_image(client, language, variant, dockerfile, args.runs))
+    print_table(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'created_at': time.time(), 'runs': args.runs, 'results': results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())